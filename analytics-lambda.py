@@ -1,29 +1,102 @@
 import json
 import boto3
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from collections import Counter
+
+from analytics_engine import AnalyticsFrame, ColumnBuilder, DayAggregate, merge_insights
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
 
 dynamodb = boto3.resource('dynamodb', region_name='ap-southeast-1')
 analytics_table = dynamodb.Table('chatbot-analytics')
 
+# date-index-v2 projects only the attributes the dashboard reads; the
+# original date-index (ALL) stays in the template until a later deploy drops it
+ANALYTICS_DATE_INDEX = os.environ.get('ANALYTICS_DATE_INDEX', 'date-index-v2')
+# Concurrent date-index queries, one per day in the range
+QUERY_WORKERS = int(os.environ.get('ANALYTICS_QUERY_WORKERS', '8'))
+DAILY_AGGREGATE_TABLE = os.environ.get('DAILY_AGGREGATE_TABLE', 'chatbot-analytics-daily')
+# A day is closed, and its aggregate cached, this long after its UTC midnight
+CLOSE_GRACE_SECONDS = int(os.environ.get('CLOSE_GRACE_SECONDS', '900'))
+MAX_RANGE_DAYS = 366
+
+class DailyAggregateCache:
+    """Aggregates of closed days, persisted in DynamoDB and memoized per container.
+
+    Every day of a scope shares one partition sorted by date, so the cached
+    part of any range is a single query. A closed day never changes, so
+    entries are never invalidated; bump AGGREGATE_VERSION when the stored
+    shape changes.
+    """
+
+    AGGREGATE_VERSION = 2
+
+    def __init__(self, table, scope='all'):
+        self.table = table
+        self.scope = scope
+        self._memory = {}
+        self._lock = threading.Lock()
+
+    def get_range(self, dates):
+        """Cached aggregates for whichever of dates have one"""
+        with self._lock:
+            missing = [date for date in dates if date not in self._memory]
+        if missing:
+            kwargs = {
+                'KeyConditionExpression': '#scope = :scope AND #date BETWEEN :first AND :last',
+                'ExpressionAttributeNames': {'#scope': 'scope', '#date': 'date'},
+                'ExpressionAttributeValues': {':scope': self.scope, ':first': min(missing), ':last': max(missing)}
+            }
+            loaded = {}
+            while True:
+                response = self.table.query(**kwargs)
+                for item in response['Items']:
+                    if item.get('version') == self.AGGREGATE_VERSION:
+                        loaded[item['date']] = DayAggregate.from_item(item)
+                if 'LastEvaluatedKey' not in response:
+                    break
+                kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+            with self._lock:
+                self._memory.update(loaded)
+        with self._lock:
+            return {date: self._memory[date] for date in dates if date in self._memory}
+
+    def put(self, aggregates):
+        if not aggregates:
+            return
+        with self.table.batch_writer() as batch:
+            for aggregate in aggregates:
+                batch.put_item(Item={'scope': self.scope, 'version': self.AGGREGATE_VERSION, **aggregate.to_item()})
+        with self._lock:
+            self._memory.update((aggregate.date, aggregate) for aggregate in aggregates)
+
+daily_cache = DailyAggregateCache(dynamodb.Table(DAILY_AGGREGATE_TABLE))
+
 def lambda_handler(event, context):
     """Generate analytics dashboard data"""
     try:
         # Get date range (last 7 days by default)
-        end_date = datetime.utcnow()
-        start_date = end_date - timedelta(days=7)
+        params = event.get('queryStringParameters') or event
+        try:
+            days = int(params.get('days', 7))
+        except (TypeError, ValueError):
+            days = 0
+        if not 1 <= days <= MAX_RANGE_DAYS:
+            return {
+                'statusCode': 400,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({'error': f'days must be between 1 and {MAX_RANGE_DAYS}'})
+            }
         
-        # Query analytics data
-        analytics_data = get_analytics_data(start_date, end_date)
-        
-        # Generate insights
-        insights = {
-            'total_conversations': len(analytics_data),
-            'sentiment_distribution': get_sentiment_distribution(analytics_data),
-            'language_distribution': get_language_distribution(analytics_data),
-            'daily_volume': get_daily_volume(analytics_data),
-            'peak_hours': get_peak_hours(analytics_data)
-        }
+        # Generate insights from cached closed days plus the days still open
+        insights = get_dashboard(days)
         
         return {
             'statusCode': 200,
@@ -40,43 +113,102 @@ def lambda_handler(event, context):
             'body': json.dumps({'error': str(e)})
         }
 
-def get_analytics_data(start_date, end_date):
-    """Fetch analytics data from DynamoDB"""
-    items = []
+def date_range(start_date, end_date):
+    """YYYY-MM-DD strings of every day from start_date to end_date inclusive"""
+    dates = []
     current_date = start_date
-    
-    while current_date <= end_date:
-        date_str = current_date.strftime('%Y-%m-%d')
-        response = analytics_table.query(
-            IndexName='date-index',
-            KeyConditionExpression='#date = :date',
-            ExpressionAttributeNames={'#date': 'date'},
-            ExpressionAttributeValues={':date': date_str}
-        )
-        items.extend(response['Items'])
+    while current_date.date() <= end_date.date():
+        dates.append(current_date.strftime('%Y-%m-%d'))
         current_date += timedelta(days=1)
+    return dates
+
+def is_closed(date_str, now):
+    """True once the day ended more than CLOSE_GRACE_SECONDS ago"""
+    day_end = datetime.strptime(date_str, '%Y-%m-%d') + timedelta(days=1)
+    return (now - day_end).total_seconds() >= CLOSE_GRACE_SECONDS
+
+def aggregate_day(date_str):
+    builder = ColumnBuilder()
+    query_day(date_str, builder.add_page)
+    return DayAggregate.from_frame(date_str, builder.frame())
+
+def get_dashboard(days=7, now=None):
+    """Dashboard insights for the last ``days`` days.
+
+    Closed days come from daily_cache; only the days missing from it (the
+    current day, plus any never computed) are queried, concurrently, and the
+    closed ones among them are written back.
+    """
+    now = now or datetime.utcnow()
+    dates = date_range(now - timedelta(days=days), now)
+    try:
+        cached = daily_cache.get_range([date_str for date_str in dates if is_closed(date_str, now)])
+    except Exception as e:
+        logger.error(f"Daily aggregate cache read failed: {e}")
+        cached = {}
+
+    missing = [date_str for date_str in dates if date_str not in cached]
+    computed = []
+    if missing:
+        with ThreadPoolExecutor(max_workers=min(QUERY_WORKERS, len(missing))) as executor:
+            computed = list(executor.map(aggregate_day, missing))
+        try:
+            daily_cache.put([aggregate for aggregate in computed if is_closed(aggregate.date, now)])
+        except Exception as e:
+            logger.error(f"Daily aggregate cache write failed: {e}")
+
+    return merge_insights(list(cached.values()) + computed)
+
+def query_day(date_str, page_fn):
+    """Read one day from date-index-v2 to the last page"""
+    kwargs = {
+        'IndexName': ANALYTICS_DATE_INDEX,
+        'KeyConditionExpression': '#date = :date',
+        'ProjectionExpression': 'session_id, sentiment, #language, #date, #timestamp, latency_ms',
+        'ExpressionAttributeNames': {'#date': 'date', '#language': 'language', '#timestamp': 'timestamp'},
+        'ExpressionAttributeValues': {':date': date_str}
+    }
+    while True:
+        response = analytics_table.query(**kwargs)
+        page_fn(response['Items'])
+        if 'LastEvaluatedKey' not in response:
+            return
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def get_analytics_data(start_date, end_date, page_fn=None):
+    """Fetch analytics data from DynamoDB, querying every day in the range concurrently.
+
+    With page_fn, each page is handed to it as it arrives (from worker
+    threads) and nothing is returned; without it, all items are returned.
+    """
+    items = []
+    if page_fn is None:
+        lock = threading.Lock()
+
+        def page_fn(page):
+            with lock:
+                items.extend(page)
+
+    dates = date_range(start_date, end_date)
+    with ThreadPoolExecutor(max_workers=max(1, min(QUERY_WORKERS, len(dates)))) as executor:
+        futures = [executor.submit(query_day, date_str, page_fn) for date_str in dates]
+        for future in futures:
+            future.result()
     
     return items
 
 def get_sentiment_distribution(data):
     """Calculate sentiment distribution"""
-    sentiments = [item['sentiment'] for item in data]
-    return dict(Counter(sentiments))
+    return AnalyticsFrame.from_items(data).sentiment_distribution()
 
 def get_language_distribution(data):
     """Calculate language distribution"""
-    languages = [item['language'] for item in data]
-    return dict(Counter(languages))
+    return AnalyticsFrame.from_items(data).language_distribution()
 
 def get_daily_volume(data):
     """Calculate daily conversation volume"""
-    dates = [item['date'] for item in data]
-    return dict(Counter(dates))
+    return AnalyticsFrame.from_items(data).daily_volume()
 
 def get_peak_hours(data):
     """Calculate peak usage hours"""
-    hours = []
-    for item in data:
-        timestamp = datetime.fromisoformat(item['timestamp'].replace('Z', '+00:00'))
-        hours.append(timestamp.hour)
-    return dict(Counter(hours))
+    return AnalyticsFrame.from_items(data).peak_hours()
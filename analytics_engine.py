@@ -0,0 +1,344 @@
+"""Columnar aggregation for the analytics dashboard.
+
+Items from the chatbot-analytics table are decoded once into parallel NumPy
+arrays: categorical codes for sentiment and language, int64 UTC epoch
+seconds for the timestamp, 64-bit session hashes and latency in
+milliseconds. Every distribution is then a bincount over those arrays
+instead of another walk over the item dicts; unique sessions and latency
+percentiles come from HyperLogLog and DDSketch sketches (sketches.py).
+"""
+import threading
+from collections import Counter
+from datetime import datetime
+
+import numpy as np
+
+from sketches import DDSketch, HyperLogLog, hash64
+
+SECONDS_PER_DAY = 86400
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+LATENCY_QUANTILES = {'p50': 0.5, 'p90': 0.9, 'p99': 0.99}
+
+_PLACES = {width: 10 ** np.arange(width - 1, -1, -1) for width in (2, 4)}
+
+def _digits(chars, start, width):
+    return chars[:, start:start + width] @ _PLACES[width]
+
+def parse_timestamps(values):
+    """ISO-8601 strings to int64 UTC epoch seconds; naive timestamps are taken as UTC"""
+    values = list(values)
+    if not values:
+        return np.empty(0, dtype=np.int64)
+    # Everything chatbot-lambda.py writes is utcnow().isoformat(), so the
+    # fixed-position digits of YYYY-MM-DDTHH:MM:SS are read straight out of a
+    # byte matrix; explicit offsets other than UTC are rare and converted one by one
+    raw = np.array(values, dtype='S32').view(np.uint8).reshape(len(values), 32)
+    chars = raw[:, :19].astype(np.int32) - ord('0')
+    year, month, day = _digits(chars, 0, 4), _digits(chars, 5, 2), _digits(chars, 8, 2)
+    seconds = days_from_civil(year, month, day) * SECONDS_PER_DAY
+    seconds += _digits(chars, 11, 2) * 3600 + _digits(chars, 14, 2) * 60 + _digits(chars, 17, 2)
+
+    tail = raw[:, 19:]
+    for i in np.flatnonzero(((tail == ord('+')) | (tail == ord('-'))).any(axis=1)):
+        if not values[i].endswith('+00:00'):
+            seconds[i] = int(datetime.fromisoformat(values[i]).timestamp())
+    return seconds
+
+def days_from_civil(year, month, day):
+    """Days since 1970-01-01 for proleptic Gregorian dates, elementwise"""
+    year = year - (month <= 2)
+    era = year // 400
+    year_of_era = year - era * 400
+    day_of_year = (153 * (month + np.where(month > 2, -3, 9)) + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+    return era * 146097 + day_of_era - 719468
+
+class Vocabulary:
+    """Categorical values to small integer codes, in first-seen order"""
+
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+
+    def encode(self, values):
+        codes = self.codes
+        for value in set(values).difference(codes):
+            codes[value] = len(self.values)
+            self.values.append(value)
+        return np.fromiter(map(codes.__getitem__, values), dtype=np.int32, count=len(values))
+
+    def __len__(self):
+        return len(self.values)
+
+class AnalyticsFrame:
+    """Decoded columns for a set of analytics items"""
+
+    def __init__(self, sentiment, language, timestamp, session, latency, sentiments, languages):
+        self.sentiment = sentiment
+        self.language = language
+        self.timestamp = timestamp
+        self.session = session
+        self.latency = latency
+        self.sentiments = sentiments
+        self.languages = languages
+
+    @classmethod
+    def from_items(cls, items):
+        builder = ColumnBuilder()
+        builder.add_page(items)
+        return builder.frame()
+
+    def __len__(self):
+        return len(self.timestamp)
+
+    def _days(self):
+        return self.timestamp // SECONDS_PER_DAY
+
+    def _hours(self):
+        return (self.timestamp % SECONDS_PER_DAY) // 3600
+
+    @staticmethod
+    def _named_counts(codes, names):
+        counts = np.bincount(codes, minlength=len(names))
+        return {names[i]: int(counts[i]) for i in np.flatnonzero(counts)}
+
+    def sentiment_distribution(self):
+        return self._named_counts(self.sentiment, self.sentiments)
+
+    def language_distribution(self):
+        return self._named_counts(self.language, self.languages)
+
+    def daily_volume(self):
+        days, counts = np.unique(self._days(), return_counts=True)
+        labels = days.astype('datetime64[D]').astype(str)
+        return {str(label): int(count) for label, count in zip(labels, counts)}
+
+    def peak_hours(self):
+        counts = np.bincount(self._hours(), minlength=24)
+        return {int(hour): int(counts[hour]) for hour in np.flatnonzero(counts)}
+
+    def hourly_heatmap(self):
+        """7x24 counts, rows Monday..Sunday, columns UTC hour"""
+        weekday = (self._days() + 3) % 7  # 1970-01-01 was a Thursday
+        counts = np.bincount(weekday * 24 + self._hours(), minlength=7 * 24).reshape(7, 24)
+        return {day: counts[i].tolist() for i, day in enumerate(WEEKDAYS)}
+
+    def sentiment_by_language(self):
+        width = len(self.sentiments)
+        counts = np.bincount(self.language * width + self.sentiment,
+                             minlength=len(self.languages) * width).reshape(len(self.languages), width)
+        return {
+            language: {self.sentiments[j]: int(counts[i, j]) for j in np.flatnonzero(counts[i])}
+            for i, language in enumerate(self.languages) if counts[i].any()
+        }
+
+    def session_sketches(self):
+        """HyperLogLog of session hashes, overall and per language"""
+        by_language = {
+            language: HyperLogLog().add_hashes(self.session[self.language == code])
+            for code, language in enumerate(self.languages) if np.any(self.language == code)
+        }
+        return HyperLogLog().add_hashes(self.session), by_language
+
+    def latency_sketches(self):
+        """DDSketch of latency_ms, overall and per language; rows without a latency are skipped"""
+        by_language = {
+            language: DDSketch().add(self.latency[self.language == code])
+            for code, language in enumerate(self.languages) if np.any(self.language == code)
+        }
+        return DDSketch().add(self.latency), by_language
+
+    def daily_sessions(self):
+        days = self._days()
+        return {
+            str(np.datetime64(int(day), 'D')): HyperLogLog().add_hashes(self.session[days == day])
+            for day in np.unique(days)
+        }
+
+    def insights(self):
+        return {
+            'total_conversations': len(self),
+            'sentiment_distribution': self.sentiment_distribution(),
+            'language_distribution': self.language_distribution(),
+            'daily_volume': self.daily_volume(),
+            'peak_hours': self.peak_hours(),
+            'hourly_heatmap': self.hourly_heatmap(),
+            'sentiment_by_language': self.sentiment_by_language(),
+            **sketch_insights(self.session_sketches(), self.latency_sketches(), self.daily_sessions())
+        }
+
+    def subset(self, mask):
+        return AnalyticsFrame(self.sentiment[mask], self.language[mask], self.timestamp[mask],
+                              self.session[mask], self.latency[mask], self.sentiments, self.languages)
+
+def latency_percentiles(sketch):
+    if not sketch.count:
+        return None
+    summary = {name: round(sketch.quantile(q), 1) for name, q in LATENCY_QUANTILES.items()}
+    summary['samples'] = sketch.count
+    return summary
+
+def sketch_insights(sessions, latency, daily_sessions):
+    """Insight fields read from (overall, per-language) sketch pairs and per-day session sketches"""
+    return {
+        'unique_sessions': sessions[0].count(),
+        'unique_sessions_by_language': {language: sketch.count() for language, sketch in sessions[1].items()},
+        'daily_unique_sessions': {date: sketch.count() for date, sketch in sorted(daily_sessions.items())},
+        'latency_percentiles': latency_percentiles(latency[0]),
+        'latency_percentiles_by_language': {
+            language: latency_percentiles(sketch) for language, sketch in latency[1].items() if sketch.count
+        }
+    }
+
+class DayAggregate:
+    """Mergeable counts and sketches for one day of analytics items.
+
+    Hours are enough to rebuild the weekday x hour heatmap, since every item
+    of a day falls on the same weekday.
+    """
+
+    def __init__(self, date, total=0, sentiments=None, languages=None, hours=None, sentiment_by_language=None,
+                 sessions=None, sessions_by_language=None, latency=None, latency_by_language=None):
+        self.date = date
+        self.total = total
+        self.sentiments = sentiments or {}
+        self.languages = languages or {}
+        self.hours = hours or [0] * 24
+        self.sentiment_by_language = sentiment_by_language or {}
+        self.sessions = sessions or HyperLogLog()
+        self.sessions_by_language = sessions_by_language or {}
+        self.latency = latency or DDSketch()
+        self.latency_by_language = latency_by_language or {}
+
+    @classmethod
+    def from_frame(cls, date, frame):
+        sessions, sessions_by_language = frame.session_sketches()
+        latency, latency_by_language = frame.latency_sketches()
+        return cls(
+            date,
+            total=len(frame),
+            sentiments=frame.sentiment_distribution(),
+            languages=frame.language_distribution(),
+            hours=np.bincount(frame._hours(), minlength=24).tolist(),
+            sentiment_by_language=frame.sentiment_by_language(),
+            sessions=sessions,
+            sessions_by_language=sessions_by_language,
+            latency=latency,
+            latency_by_language=latency_by_language
+        )
+
+    @classmethod
+    def from_item(cls, item):
+        """From a stored item, whose numbers come back from DynamoDB as Decimal"""
+        def counts(mapping):
+            return {key: int(value) for key, value in mapping.items()}
+        return cls(
+            item['date'],
+            total=int(item['total']),
+            sentiments=counts(item.get('sentiments', {})),
+            languages=counts(item.get('languages', {})),
+            hours=[int(value) for value in item.get('hours', [0] * 24)],
+            sentiment_by_language={
+                language: counts(sentiments) for language, sentiments in item.get('sentimentByLanguage', {}).items()
+            },
+            sessions=HyperLogLog.from_bytes(item['sessions']),
+            sessions_by_language={
+                language: HyperLogLog.from_bytes(data) for language, data in item.get('sessionsByLanguage', {}).items()
+            },
+            latency=DDSketch.from_bytes(item['latency']),
+            latency_by_language={
+                language: DDSketch.from_bytes(data) for language, data in item.get('latencyByLanguage', {}).items()
+            }
+        )
+
+    def to_item(self):
+        return {
+            'date': self.date,
+            'total': self.total,
+            'sentiments': self.sentiments,
+            'languages': self.languages,
+            'hours': self.hours,
+            'sentimentByLanguage': self.sentiment_by_language,
+            'sessions': self.sessions.to_bytes(),
+            'sessionsByLanguage': {language: sketch.to_bytes() for language, sketch in self.sessions_by_language.items()},
+            'latency': self.latency.to_bytes(),
+            'latencyByLanguage': {language: sketch.to_bytes() for language, sketch in self.latency_by_language.items()}
+        }
+
+    def weekday(self):
+        return datetime.strptime(self.date, '%Y-%m-%d').weekday()
+
+def merge_insights(days):
+    """The AnalyticsFrame.insights() shape, summed from per-day aggregates"""
+    sentiments, languages, by_language = Counter(), Counter(), {}
+    hours = np.zeros(24, dtype=np.int64)
+    heatmap = np.zeros((7, 24), dtype=np.int64)
+    daily_volume = {}
+    # Merged into fresh sketches so cached aggregates are never modified
+    sessions, sessions_by_language, daily_sessions = HyperLogLog(), {}, {}
+    latency, latency_by_language = DDSketch(), {}
+    for day in sorted(days, key=lambda day: day.date):
+        if not day.total:
+            continue
+        daily_volume[day.date] = day.total
+        daily_sessions[day.date] = day.sessions
+        sessions.merge(day.sessions)
+        latency.merge(day.latency)
+        for language, sketch in day.sessions_by_language.items():
+            sessions_by_language.setdefault(language, HyperLogLog()).merge(sketch)
+        for language, sketch in day.latency_by_language.items():
+            latency_by_language.setdefault(language, DDSketch()).merge(sketch)
+        sentiments.update(day.sentiments)
+        languages.update(day.languages)
+        hours += day.hours
+        heatmap[day.weekday()] += day.hours
+        for language, counts in day.sentiment_by_language.items():
+            by_language.setdefault(language, Counter()).update(counts)
+    return {
+        'total_conversations': sum(daily_volume.values()),
+        'sentiment_distribution': dict(sentiments),
+        'language_distribution': dict(languages),
+        'daily_volume': daily_volume,
+        'peak_hours': {int(hour): int(hours[hour]) for hour in np.flatnonzero(hours)},
+        'hourly_heatmap': {day: heatmap[i].tolist() for i, day in enumerate(WEEKDAYS)},
+        'sentiment_by_language': {language: dict(counts) for language, counts in by_language.items()},
+        **sketch_insights((sessions, sessions_by_language), (latency, latency_by_language), daily_sessions)
+    }
+
+class ColumnBuilder:
+    """Accumulates pages of items as column chunks; add_page is thread-safe"""
+
+    def __init__(self):
+        self.sentiments = Vocabulary()
+        self.languages = Vocabulary()
+        self._chunks = []
+        self._lock = threading.Lock()
+
+    def add_page(self, items):
+        if not items:
+            return
+        timestamps = parse_timestamps(item['timestamp'] for item in items)
+        sessions = hash64([item.get('session_id', '') for item in items])
+        # Rows written before latency_ms was recorded give None, which becomes NaN and is skipped by the sketches
+        latency = np.array([item.get('latency_ms') for item in items], dtype=np.float64)
+        sentiments = [item['sentiment'] for item in items]
+        languages = [item['language'] for item in items]
+        with self._lock:
+            self._chunks.append((self.sentiments.encode(sentiments), self.languages.encode(languages),
+                                 timestamps, sessions, latency))
+
+    def frame(self):
+        with self._lock:
+            chunks = list(self._chunks)
+        if chunks:
+            sentiment, language, timestamp, session, latency = (np.concatenate(column) for column in zip(*chunks))
+        else:
+            sentiment = language = np.empty(0, dtype=np.int32)
+            timestamp = np.empty(0, dtype=np.int64)
+            session = np.empty(0, dtype=np.uint64)
+            latency = np.empty(0, dtype=np.float64)
+        return AnalyticsFrame(sentiment, language, timestamp, session, latency,
+                              list(self.sentiments.values), list(self.languages.values))
+
+    def insights(self):
+        return self.frame().insights()
@@ -0,0 +1,64 @@
+"""Build the product index the chat handlers search.
+
+Merges the StyleCo products (Products.csv or Products.json) with the shop
+catalog, either the sample catalog in scripts/seed_products.py or a scan of
+the live table, into the record list lambda/product_search.py indexes at
+cold start:
+
+    python build_product_index.py --source json_files --out lambda/product_index.json
+    python build_product_index.py --source json_files --catalog-table prod-shop-catalog
+"""
+import argparse
+import json
+import os
+import sys
+
+import boto3
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.join(ROOT, 'lambda'), os.path.join(ROOT, 'scripts')]
+
+from product_search import FACETS, ProductSearch, from_catalog, from_styleco
+from styleco_import import source_rows
+
+def catalog_items(table_name=None, region='ap-southeast-1'):
+    """Shop catalog items from the live table, or the sample catalog when no table is given"""
+    if table_name is None:
+        from seed_products import products
+        return products
+    table = boto3.resource('dynamodb', region_name=region).Table(table_name)
+    items, kwargs = [], {}
+    while True:
+        response = table.scan(**kwargs)
+        items.extend(response.get('Items', []))
+        if 'LastEvaluatedKey' not in response:
+            return items
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def build(source_dir, out, table_name=None, region='ap-southeast-1'):
+    records = []
+    rows = source_rows(source_dir, 'Products')
+    if rows is None:
+        print(f"⚠️ Warning: no Products.csv or Products.json in {source_dir}, indexing the catalog only")
+    else:
+        records.extend(from_styleco(row) for row in rows)
+    records.extend(from_catalog(item) for item in catalog_items(table_name, region))
+
+    search = ProductSearch(records)
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump({'products': search.records}, f, separators=(',', ':'))
+    values = ', '.join(f"{len(search.bitmaps[facet])} {facet}" for facet in FACETS)
+    print(f"✅ {len(search.records)} products ({values}, {len(search.tags)} tags) written to {out}")
+    return search
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build the chatbot product search index')
+    parser.add_argument('--source', default='json_files', help='directory with Products.csv or Products.json')
+    parser.add_argument('--out', default=os.path.join('lambda', 'product_index.json'))
+    parser.add_argument('--catalog-table', default=None, help='scan this catalog table instead of the sample catalog')
+    parser.add_argument('--region', default='ap-southeast-1')
+    args = parser.parse_args(argv)
+    build(args.source, args.out, args.catalog_table, args.region)
+
+if __name__ == '__main__':
+    main()
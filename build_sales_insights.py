@@ -0,0 +1,122 @@
+"""Precompute the sales insights the chat handlers answer from.
+
+The full build runs vectorized over the columnar store (styleco_store.py):
+units and revenue per month and product, and revenue per payment method,
+are bincounts over composite codes. "Bought with" counts the customers
+who bought each pair of products, from the distinct (customer, product)
+purchases grouped into baskets, so only pairs that occur are
+materialized. The result is the compact JSON that
+lambda/sales_insights.py loads.
+
+New sales can be folded into an existing file without a rebuild:
+
+    python build_sales_insights.py build --store styleco_store --out lambda/sales_insights.json
+    python build_sales_insights.py refresh --cache lambda/sales_insights.json --sales new_sales.csv
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lambda'))
+
+from sales_insights import STATE_VERSION, SalesInsights
+from styleco_import import coerce, read_csv, read_json
+from styleco_store import RetailStore
+
+def compute_state(store):
+    """The SalesInsights state for every sale in the store"""
+    sales, products = store['Sales'], store['Products']
+    product_rows = store.join('Sales', 'ProductID', 'Products')
+    known = product_rows >= 0
+    product_rows = product_rows[known]
+    units = sales.column('QuantityPurchased')[known].astype(np.float64)
+    revenue = sales.column('TotalAmount')[known]
+    month_values, month_codes = np.unique(sales.column('Date')[known].astype('datetime64[M]'), return_inverse=True)
+
+    n_products = len(products)
+    cell = month_codes * n_products + product_rows
+    shape = len(month_values) * n_products
+    unit_totals = np.bincount(cell, weights=units, minlength=shape).reshape(-1, n_products)
+    revenue_totals = np.bincount(cell, weights=revenue, minlength=shape).reshape(-1, n_products)
+    counts = np.bincount(cell, minlength=shape).reshape(-1, n_products)
+
+    product_ids = products.decode('ProductID')
+    monthly = {}
+    for m, month in enumerate(month_values):
+        sold = np.flatnonzero(counts[m])
+        monthly[str(month)] = {str(product_ids[p]): [int(unit_totals[m, p]), round(float(revenue_totals[m, p]), 2)]
+                               for p in sold}
+
+    method_codes = sales.column('PaymentMethod')[known]
+    methods = sales.vocabularies['PaymentMethod']
+    paid = method_codes >= 0
+    payment_counts = np.bincount(method_codes[paid], minlength=len(methods))
+    payment_revenue = np.bincount(method_codes[paid], weights=revenue[paid], minlength=len(methods))
+    payments = {str(method): [int(count), round(float(total), 2)]
+                for method, count, total in zip(methods, payment_counts, payment_revenue) if count}
+
+    customer_codes = sales.column('CustomerID')[known]
+    customers = sales.vocabularies['CustomerID']
+    with_customer = customer_codes >= 0
+    # One key per distinct (customer, product), sorted, so each customer's
+    # basket is a contiguous run. Every ordered pair of distinct products in
+    # a basket is one "bought together". Counting the pair keys gives the
+    # same numbers as a dense incidence matrix product. Memory grows with
+    # the pairs that occur, not with customers x products + products^2.
+    bought = np.unique(customer_codes[with_customer].astype(np.int64) * n_products + product_rows[with_customer])
+    buyer, item = bought // n_products, bought % n_products
+    _, basket_start, basket_size = np.unique(buyer, return_index=True, return_counts=True)
+    item_start = np.repeat(basket_start, basket_size)
+    item_size = np.repeat(basket_size, basket_size)
+    first = np.repeat(np.arange(len(bought)), item_size)
+    offset = np.arange(len(first)) - np.repeat(np.cumsum(item_size) - item_size, item_size)
+    second = np.repeat(item_start, item_size) + offset
+    distinct = first != second
+    pair_keys, together = np.unique(item[first[distinct]] * n_products + item[second[distinct]], return_counts=True)
+    pairs = {}
+    for key, count in zip(pair_keys, together):
+        p, o = divmod(int(key), n_products)
+        pairs.setdefault(str(product_ids[p]), {})[str(product_ids[o])] = int(count)
+    baskets = {}
+    for c, p in zip(buyer, item):
+        baskets.setdefault(str(customers[c]), []).append(str(product_ids[p]))
+
+    names, categories, subcategories = (products.decode(column) for column in ('ProductName', 'Category', 'Subcategory'))
+    return {
+        'version': STATE_VERSION,
+        'products': {str(product_ids[p]): {'name': str(names[p]), 'category': str(categories[p]),
+                                           'subcategory': str(subcategories[p])} for p in range(n_products)},
+        'monthly': monthly,
+        'payments': payments,
+        'baskets': baskets,
+        'pairs': pairs,
+        'sales': int(np.count_nonzero(known))
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build or refresh the chatbot sales insights cache')
+    commands = parser.add_subparsers(dest='command', required=True)
+    build_parser = commands.add_parser('build', help='full vectorized build from a columnar store')
+    build_parser.add_argument('--store', default='styleco_store')
+    build_parser.add_argument('--out', default=os.path.join('lambda', 'sales_insights.json'))
+    refresh_parser = commands.add_parser('refresh', help='fold new sales (CSV or JSON) into an existing cache')
+    refresh_parser.add_argument('--cache', default=os.path.join('lambda', 'sales_insights.json'))
+    refresh_parser.add_argument('--sales', required=True)
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        insights = SalesInsights(compute_state(RetailStore.open(args.store)))
+        insights.save(args.out)
+        print(f"✅ {insights.sales} sales over {len(insights.months())} months written to {args.out}")
+        return
+
+    insights = SalesInsights.load(args.cache)
+    rows = read_csv(args.sales) if args.sales.lower().endswith('.csv') else read_json(args.sales)
+    added = insights.add_sales(coerce(row, 'Sales') for row in rows)
+    insights.save(args.cache)
+    print(f"✅ Added {added} sales to {args.cache} ({insights.sales} in total)")
+
+if __name__ == '__main__':
+    main()
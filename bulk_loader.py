@@ -0,0 +1,332 @@
+"""Load the StyleCo datasets into DynamoDB in parallel, within provisioned capacity.
+
+Every dataset loads at the same time, each with its own pool of workers.
+Rows are streamed from the source (see styleco_import.py), cut into chunks
+and written with BatchWriteItem. Each table's request rate adapts to
+throttling: it rises steadily while writes succeed and halves when
+DynamoDB throttles or leaves items unprocessed. Completed chunks are
+recorded in a checkpoint file, so a failed or interrupted load resumes
+where it stopped.
+
+    python bulk_loader.py --source "StyleCo Data" --workers 4 --checkpoint bulk_load.checkpoint.json
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+from boto3.dynamodb.types import TypeSerializer
+from botocore.exceptions import ClientError
+
+from styleco_import import DATASETS, source_rows, typed_items
+
+BATCH_ITEMS = 25
+CHUNK_ITEMS = 500
+THROTTLE_CODES = {'ProvisionedThroughputExceededException', 'ThrottlingException', 'RequestLimitExceeded'}
+RETRYABLE_CODES = THROTTLE_CODES | {'InternalServerError', 'InternalServerException', 'ServiceUnavailable'}
+
+class AdaptiveRate:
+    """Token bucket whose rate (items per second) follows throttling.
+
+    Every successful request raises the rate by ``growth`` (at least
+    ``increase`` items/s) up to max_rate, and every throttled one multiplies
+    it by ``decrease`` down to min_rate, so it settles just under what the
+    table accepts. A request may take more tokens than are available; later
+    requests then wait off the debt.
+    """
+
+    def __init__(self, rate, min_rate=1.0, max_rate=1000.0, increase=1.0, growth=0.05, decrease=0.5,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.rate = float(rate)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.growth = growth
+        self.decrease = decrease
+        self.clock = clock
+        self.sleep = sleep
+        self._tokens = self.rate
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self, items):
+        while True:
+            with self._lock:
+                now = self.clock()
+                self._tokens = min(self.rate, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens > 0:
+                    self._tokens -= items
+                    return
+                wait = -self._tokens / self.rate + 0.001
+            self.sleep(wait)
+
+    def succeeded(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + max(self.increase, self.rate * self.growth))
+
+    def throttled(self):
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            self._tokens = min(self._tokens, 0.0)
+
+class Checkpoint:
+    """Completed chunk numbers per dataset, saved atomically after each chunk.
+
+    The file records the source directory and chunk size; resuming with
+    different ones would map chunk numbers to different rows, so it is
+    refused.
+    """
+
+    def __init__(self, path, source, chunk_items):
+        self.path = path
+        self._lock = threading.Lock()
+        self.state = {'source': os.path.abspath(source), 'chunkItems': chunk_items, 'datasets': {}}
+        if path and os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            if (saved['source'], saved['chunkItems']) != (self.state['source'], chunk_items):
+                raise ValueError(f"{path} is for {saved['source']} in chunks of {saved['chunkItems']}; "
+                                 f"delete it to start over")
+            self.state = saved
+
+    def _dataset(self, dataset):
+        return self.state['datasets'].setdefault(dataset, {'chunks': [], 'complete': False})
+
+    def is_complete(self, dataset):
+        with self._lock:
+            return self._dataset(dataset)['complete']
+
+    def done_chunks(self, dataset):
+        with self._lock:
+            return set(self._dataset(dataset)['chunks'])
+
+    def mark_chunk(self, dataset, chunk):
+        with self._lock:
+            self._dataset(dataset)['chunks'].append(chunk)
+            self._save()
+
+    def mark_complete(self, dataset):
+        with self._lock:
+            state = self._dataset(dataset)
+            state['complete'], state['chunks'] = True, []
+            self._save()
+
+    def _save(self):
+        if not self.path:
+            return
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f)
+        os.replace(tmp, self.path)
+
+class TableStats:
+    def __init__(self, table_name):
+        self.table_name = table_name
+        self.items = 0
+        self.skipped_chunks = 0
+        self.requests = 0
+        self.throttled = 0
+        self.capacity_units = 0.0
+        self.started = time.monotonic()
+        self.finished = None
+        self._lock = threading.Lock()
+
+    def record(self, items, capacity_units, throttled):
+        with self._lock:
+            self.items += items
+            self.requests += 1
+            self.capacity_units += capacity_units
+            self.throttled += throttled
+
+    def summary(self, rate=None):
+        elapsed = max((self.finished or time.monotonic()) - self.started, 1e-9)
+        line = (f"{self.table_name}: {self.items:,} items, {self.items / elapsed:,.1f} items/s, "
+                f"{self.capacity_units:,.1f} WCU ({self.capacity_units / elapsed:,.1f}/s), "
+                f"{self.throttled} throttled")
+        return line + (f", rate {rate:,.1f}/s" if rate is not None else '')
+
+def chunked(iterable, size):
+    chunk = []
+    for value in iterable:
+        chunk.append(value)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+class TableLoader:
+    """Load one dataset's rows into one table with a pool of workers"""
+
+    def __init__(self, client, dataset, table_name, rate, checkpoint, workers=4, max_attempts=10,
+                 base_delay=0.05, max_delay=5.0, chunk_items=CHUNK_ITEMS, sleep=time.sleep):
+        self.client = client
+        self.dataset = dataset
+        self.table_name = table_name
+        self.key = DATASETS[dataset]['key']
+        self.rate = rate
+        self.checkpoint = checkpoint
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.chunk_items = chunk_items
+        self.sleep = sleep
+        self.stats = TableStats(table_name)
+        self._serializer = TypeSerializer()
+
+    def run(self, rows):
+        done = self.checkpoint.done_chunks(self.dataset)
+        import_stats = {'read': 0, 'written': 0, 'skipped': 0}
+        # Bound the chunks in flight so memory stays flat on large sources
+        slots = threading.BoundedSemaphore(self.workers * 2)
+        failed = threading.Event()
+        futures = []
+
+        def load(number, items):
+            try:
+                self._load_chunk(number, items)
+            except Exception:
+                failed.set()
+                raise
+            finally:
+                slots.release()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for number, items in enumerate(chunked(typed_items(rows, self.dataset, import_stats), self.chunk_items)):
+                if number in done:
+                    self.stats.skipped_chunks += 1
+                    continue
+                slots.acquire()
+                if failed.is_set():
+                    # Stop reading; chunks already in flight finish and are checkpointed
+                    slots.release()
+                    break
+                futures.append(executor.submit(load, number, items))
+        errors = [future.exception() for future in futures if future.exception() is not None]
+        self.stats.finished = time.monotonic()
+        if errors:
+            raise errors[0]
+        self.checkpoint.mark_complete(self.dataset)
+        return self.stats
+
+    def _load_chunk(self, number, items):
+        # BatchWriteItem rejects duplicate keys in one request; the last row wins
+        unique = {item[self.key]: item for item in items}
+        requests = [{'PutRequest': {'Item': {name: self._serializer.serialize(value) for name, value in item.items()}}}
+                    for item in unique.values()]
+        for batch in chunked(requests, BATCH_ITEMS):
+            self._write_batch(batch)
+        self.checkpoint.mark_chunk(self.dataset, number)
+
+    def _backoff(self, attempt):
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _write_batch(self, pending):
+        attempt = 0
+        while pending:
+            self.rate.acquire(len(pending))
+            try:
+                response = self.client.batch_write_item(
+                    RequestItems={self.table_name: pending},
+                    ReturnConsumedCapacity='TOTAL'
+                )
+            except ClientError as e:
+                code = e.response.get('Error', {}).get('Code')
+                if code not in RETRYABLE_CODES:
+                    raise
+                throttled = code in THROTTLE_CODES
+                if throttled:
+                    self.rate.throttled()
+                self.stats.record(0, 0.0, int(throttled))
+                attempt += 1
+                if attempt >= self.max_attempts:
+                    raise
+                self.sleep(self._backoff(attempt))
+                continue
+
+            unprocessed = response.get('UnprocessedItems', {}).get(self.table_name, [])
+            units = sum(c.get('CapacityUnits', 0) for c in response.get('ConsumedCapacity', []))
+            self.stats.record(len(pending) - len(unprocessed), units, int(bool(unprocessed)))
+            if not unprocessed:
+                self.rate.succeeded()
+                return
+            self.rate.throttled()
+            # Progress resets the attempt budget; only a stuck batch gives up
+            attempt = 0 if len(unprocessed) < len(pending) else attempt + 1
+            if attempt >= self.max_attempts:
+                raise RuntimeError(f"{len(unprocessed)} items still unprocessed in {self.table_name} "
+                                   f"after {self.max_attempts} attempts")
+            self.sleep(self._backoff(attempt))
+            pending = unprocessed
+
+def report(loaders, stop, interval):
+    while not stop.wait(interval):
+        for loader in loaders:
+            if loader.stats.finished is None:
+                print(f"⏳ {loader.stats.summary(loader.rate.rate)}", flush=True)
+
+def load_all(client, source_dir, datasets, checkpoint_path=None, workers=4, initial_rate=5.0, max_rate=1000.0,
+             table_prefix='', report_every=5.0, chunk_items=CHUNK_ITEMS):
+    """Load datasets concurrently; returns {dataset: TableStats}"""
+    checkpoint = Checkpoint(checkpoint_path, source_dir, chunk_items)
+    jobs = []
+    for dataset in datasets:
+        spec = DATASETS[dataset]
+        if checkpoint.is_complete(dataset):
+            print(f"✅ {dataset} already loaded according to {checkpoint_path}, skipping...")
+            continue
+        rows = source_rows(source_dir, dataset)
+        if rows is None:
+            print(f"⚠️ Warning: neither {spec['csv']} nor {spec['json']} found in {source_dir}, skipping...")
+            continue
+        rate = AdaptiveRate(initial_rate, max_rate=max_rate)
+        loader = TableLoader(client, dataset, table_prefix + spec['table'], rate, checkpoint, workers,
+                             chunk_items=chunk_items)
+        jobs.append((loader, rows))
+
+    stop = threading.Event()
+    reporter = threading.Thread(target=report, args=([loader for loader, _ in jobs], stop, report_every), daemon=True)
+    reporter.start()
+    results, failures = {}, {}
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, len(jobs))) as executor:
+            futures = {loader.dataset: (loader, executor.submit(loader.run, rows)) for loader, rows in jobs}
+            for dataset, (loader, future) in futures.items():
+                try:
+                    results[dataset] = future.result()
+                    print(f"✅ {loader.stats.summary()}")
+                except Exception as e:
+                    failures[dataset] = e
+                    print(f"❌ {dataset} failed after {loader.stats.items:,} items: {e}")
+    finally:
+        stop.set()
+    if failures:
+        raise RuntimeError(f"{len(failures)} dataset(s) failed ({', '.join(failures)}); "
+                           f"rerun with the same checkpoint to resume")
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Parallel, resumable bulk load of the StyleCo datasets')
+    parser.add_argument('--source', required=True, help='directory with the CSV exports or their JSON copies')
+    parser.add_argument('--datasets', nargs='+', choices=list(DATASETS), default=list(DATASETS))
+    parser.add_argument('--workers', type=int, default=4, help='concurrent BatchWriteItem workers per table')
+    parser.add_argument('--rate', type=float, default=5.0, help='initial items/second per table (create_tables.py provisions 5 WCU)')
+    parser.add_argument('--max-rate', type=float, default=1000.0)
+    parser.add_argument('--checkpoint', default='bulk_load.checkpoint.json')
+    parser.add_argument('--report-every', type=float, default=5.0, help='seconds between progress lines')
+    parser.add_argument('--table-prefix', default='')
+    parser.add_argument('--region', default='ap-southeast-1')
+    args = parser.parse_args(argv)
+
+    client = boto3.client('dynamodb', region_name=args.region)
+    load_all(client, args.source, args.datasets, args.checkpoint, args.workers, args.rate, args.max_rate,
+             args.table_prefix, args.report_every)
+
+if __name__ == '__main__':
+    main()
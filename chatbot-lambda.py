@@ -1,7 +1,13 @@
 import json
 import boto3
 import logging
+import os
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
+from decimal import Decimal
+from itertools import count
 import uuid
 
 # Initialize AWS clients
@@ -18,13 +24,137 @@ logger.setLevel(logging.INFO)
 sessions_table = dynamodb.Table('chatbot-sessions')
 analytics_table = dynamodb.Table('chatbot-analytics')
 
+HISTORY_TURNS = 5
+
+class SessionCache:
+    """Per-container cache of the last HISTORY_TURNS conversations of each session.
+
+    Entries are filled from DynamoDB on a miss and kept current by
+    store_session, so consecutive turns served by this container skip the
+    query. Each entry carries a version that is handed to the client as
+    part of history_token; a token from another container, or an older
+    version, means turns were stored elsewhere and the entry is reloaded.
+    A request without a token proves nothing about the entry, so it is only
+    served from entries loaded or written in the last tokenless_ttl_seconds.
+    Eviction is LRU by session count and by bytes of conversation text.
+    """
+
+    def __init__(self, max_sessions=1000, max_bytes=4 * 1024 * 1024, ttl_seconds=900,
+                 tokenless_ttl_seconds=30, clock=time.monotonic):
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.tokenless_ttl_seconds = tokenless_ttl_seconds
+        self.clock = clock
+        self.container_id = uuid.uuid4().hex[:12]
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._versions = count(1)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _size(session_id, history):
+        return len(session_id) + sum(len(turn.encode('utf-8')) for turn in history)
+
+    def _remove(self, session_id):
+        entry = self._entries.pop(session_id)
+        self._bytes -= entry['bytes']
+
+    def _store(self, session_id, history):
+        if session_id in self._entries:
+            self._remove(session_id)
+        now = self.clock()
+        entry = {
+            'history': history,
+            'bytes': self._size(session_id, history),
+            'stored': now,
+            'expires': now + self.ttl_seconds,
+            'version': next(self._versions)
+        }
+        self._entries[session_id] = entry
+        self._bytes += entry['bytes']
+        while self._entries and (len(self._entries) > self.max_sessions or self._bytes > self.max_bytes):
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+        return entry
+
+    def get(self, session_id, token=None):
+        """Cached history, newest first, or None when DynamoDB must be queried"""
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            now = self.clock()
+            if entry['expires'] < now:
+                self._remove(session_id)
+                self.misses += 1
+                return None
+            if token is None and now - entry['stored'] > self.tokenless_ttl_seconds:
+                self._remove(session_id)
+                self.stale += 1
+                return None
+            if token is not None and token != self._token(entry):
+                self._remove(session_id)
+                self.stale += 1
+                return None
+            self._entries.move_to_end(session_id)
+            self.hits += 1
+            return list(entry['history'])
+
+    def fill(self, session_id, history):
+        with self._lock:
+            self._store(session_id, list(history)[:HISTORY_TURNS])
+
+    def append(self, session_id, conversation):
+        """Write-through of a stored turn; sessions not held here stay uncached"""
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None:
+                self._store(session_id, ([conversation] + entry['history'])[:HISTORY_TURNS])
+
+    def token(self, session_id):
+        with self._lock:
+            entry = self._entries.get(session_id)
+            return self._token(entry) if entry else None
+
+    def _token(self, entry):
+        return f"{self.container_id}.{entry['version']}"
+
+    def stats(self):
+        lookups = self.hits + self.misses + self.stale
+        return {
+            'sessions': len(self._entries),
+            'bytes': self._bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'stale': self.stale,
+            'evictions': self.evictions,
+            'hitRate': round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+session_cache = SessionCache(
+    max_sessions=int(os.environ.get('SESSION_CACHE_SESSIONS', '1000')),
+    max_bytes=int(os.environ.get('SESSION_CACHE_BYTES', str(4 * 1024 * 1024))),
+    ttl_seconds=float(os.environ.get('SESSION_CACHE_TTL', '900')),
+    tokenless_ttl_seconds=float(os.environ.get('SESSION_CACHE_TOKENLESS_TTL', '30'))
+)
+SESSION_CACHE_LOG_EVERY = 100
+_requests_served = count(1)
+
 def lambda_handler(event, context):
+    started = time.perf_counter()
     try:
         # Parse request
         body = json.loads(event['body']) if event.get('body') else {}
         user_message = body.get('message', '')
         session_id = body.get('session_id', str(uuid.uuid4()))
         language = body.get('language', 'en')
+        history_token = body.get('history_token')
         
         # Detect sentiment
         sentiment = detect_sentiment(user_message)
@@ -34,15 +164,19 @@ def lambda_handler(event, context):
             user_message = translate_text(user_message, language, 'en')
         
         # Get AI response from Bedrock
-        ai_response = get_bedrock_response(user_message, session_id)
+        ai_response = get_bedrock_response(user_message, session_id, history_token)
         
         # Translate response back
         if language != 'en':
             ai_response = translate_text(ai_response, 'en', language)
+        latency_ms = (time.perf_counter() - started) * 1000
         
         # Store session and analytics
         store_session(session_id, user_message, ai_response, sentiment)
-        store_analytics(session_id, sentiment, language)
+        store_analytics(session_id, sentiment, language, latency_ms)
+        
+        if next(_requests_served) % SESSION_CACHE_LOG_EVERY == 0:
+            logger.info(f"Session cache: {json.dumps(session_cache.stats())}")
         
         return {
             'statusCode': 200,
@@ -53,6 +187,7 @@ def lambda_handler(event, context):
             'body': json.dumps({
                 'response': ai_response,
                 'session_id': session_id,
+                'history_token': session_cache.token(session_id),
                 'sentiment': sentiment,
                 'timestamp': datetime.utcnow().isoformat()
             })
@@ -65,11 +200,11 @@ def lambda_handler(event, context):
             'body': json.dumps({'error': 'Internal server error'})
         }
 
-def get_bedrock_response(message, session_id):
+def get_bedrock_response(message, session_id, history_token=None):
     """Get response from AWS Bedrock"""
     try:
         # Get conversation history
-        history = get_session_history(session_id)
+        history = get_session_history(session_id, history_token)
         
         prompt = f"""You are a helpful customer service chatbot for a retail business. 
         Provide accurate, friendly responses to customer inquiries.
@@ -115,45 +250,55 @@ def translate_text(text, source_lang, target_lang):
     except:
         return text
 
-def get_session_history(session_id):
-    """Get conversation history from DynamoDB"""
+def get_session_history(session_id, history_token=None):
+    """Get conversation history, from the session cache when this container has it"""
+    history = session_cache.get(session_id, history_token)
+    if history is not None:
+        return history
     try:
+        # Consistent, so a turn another container has just stored is included
         response = sessions_table.query(
             KeyConditionExpression='session_id = :sid',
             ExpressionAttributeValues={':sid': session_id},
-            Limit=5,
-            ScanIndexForward=False
+            Limit=HISTORY_TURNS,
+            ScanIndexForward=False,
+            ConsistentRead=True
         )
-        return [item['conversation'] for item in response['Items']]
+        history = [item['conversation'] for item in response['Items']]
+        session_cache.fill(session_id, history)
+        return history
     except:
         return []
 
 def store_session(session_id, user_msg, bot_response, sentiment):
     """Store conversation in DynamoDB"""
+    conversation = f"User: {user_msg}\nBot: {bot_response}"
     try:
         sessions_table.put_item(
             Item={
                 'session_id': session_id,
                 'timestamp': datetime.utcnow().isoformat(),
-                'conversation': f"User: {user_msg}\nBot: {bot_response}",
+                'conversation': conversation,
                 'sentiment': sentiment
             }
         )
+        session_cache.append(session_id, conversation)
     except Exception as e:
         logger.error(f"Session storage error: {str(e)}")
 
-def store_analytics(session_id, sentiment, language):
-    """Store analytics data"""
+def store_analytics(session_id, sentiment, language, latency_ms=None):
+    """Store analytics data; latency_ms is the time taken to produce the response"""
     try:
-        analytics_table.put_item(
-            Item={
-                'id': str(uuid.uuid4()),
-                'session_id': session_id,
-                'timestamp': datetime.utcnow().isoformat(),
-                'sentiment': sentiment,
-                'language': language,
-                'date': datetime.utcnow().strftime('%Y-%m-%d')
-            }
-        )
+        item = {
+            'id': str(uuid.uuid4()),
+            'session_id': session_id,
+            'timestamp': datetime.utcnow().isoformat(),
+            'sentiment': sentiment,
+            'language': language,
+            'date': datetime.utcnow().strftime('%Y-%m-%d')
+        }
+        if latency_ms is not None:
+            item['latency_ms'] = Decimal(str(round(latency_ms, 1)))
+        analytics_table.put_item(Item=item)
     except Exception as e:
         logger.error(f"Analytics storage error: {str(e)}")
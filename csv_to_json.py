@@ -1,37 +1,22 @@
-import csv
-import json
 import os
 
+from styleco_import import DATASETS, source_rows, tee_json
+
 # Absolute path to your CSVs (inside WSL)
 CSV_FOLDER = "/mnt/c/Users/NAJWA/Downloads/StyleCo Data/StyleCo Data"
 JSON_FOLDER = "/mnt/c/Users/NAJWA/aws hackathon/json_files"
 
+# Optional: styleco_import.py reads the CSVs directly (and can write these
+# files itself with --json-dir). Rows are streamed, not held in memory.
 os.makedirs(JSON_FOLDER, exist_ok=True)
 
-table_mapping = {
-    "Customers": "Customers.csv",
-    "Products": "Products.csv",
-    "Sales": "Sales.csv",
-    "Shops": "ShopInfo.csv",
-    "Suppliers": "Suppliers.csv"
-}
-
-def csv_to_json(csv_file, json_file):
-    data = []
-    with open(csv_file, mode="r", encoding="utf-8-sig") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            data.append(row)
-
-    with open(json_file, mode="w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4)
-
-for table, csv_filename in table_mapping.items():
-    csv_path = os.path.join(CSV_FOLDER, csv_filename)
-    json_path = os.path.join(JSON_FOLDER, f"{table}.json")
+for dataset, spec in DATASETS.items():
+    csv_path = os.path.join(CSV_FOLDER, spec["csv"])
+    json_path = os.path.join(JSON_FOLDER, spec["json"])
 
     if os.path.exists(csv_path):
-        print(f"Converting {csv_filename} → {json_path}")
-        csv_to_json(csv_path, json_path)
+        print(f"Converting {spec['csv']} → {json_path}")
+        for _ in tee_json(source_rows(CSV_FOLDER, dataset), json_path):
+            pass
     else:
-        print(f"⚠️ Warning: {csv_filename} not found in {CSV_FOLDER}, skipping...")
+        print(f"⚠️ Warning: {spec['csv']} not found in {CSV_FOLDER}, skipping...")
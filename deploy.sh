@@ -10,6 +10,17 @@ STACK_NAME="${ENVIRONMENT}-chatbot-stack"
 
 echo "Deploying chatbot to environment: $ENVIRONMENT in region: $REGION"
 
+# A shop catalog created outside the stack must be imported first, or the
+# deploy fails with AlreadyExists (see "Adopting an existing shop catalog" in the README)
+CATALOG_TABLE="${ENVIRONMENT}-shop-catalog"
+if aws dynamodb describe-table --table-name $CATALOG_TABLE --region $REGION \
+        --profile awsisb_IsbUsersPS-162343471173 > /dev/null 2>&1 \
+    && ! aws cloudformation describe-stack-resource --stack-name $STACK_NAME --logical-resource-id ShopCatalogTable \
+        --region $REGION --profile awsisb_IsbUsersPS-162343471173 > /dev/null 2>&1; then
+    echo "$CATALOG_TABLE exists but is not part of $STACK_NAME; import it into the stack before deploying"
+    exit 1
+fi
+
 # Deploy CloudFormation stack
 echo "Deploying infrastructure..."
 aws cloudformation deploy \
@@ -36,17 +47,45 @@ FAQ_TABLE=$(aws cloudformation describe-stacks \
     --region $REGION \
     --profile awsisb_IsbUsersPS-162343471173)
 
+ROLLUP_TABLE=$(aws cloudformation describe-stacks \
+    --stack-name $STACK_NAME \
+    --query 'Stacks[0].Outputs[?OutputKey==`RollupTableName`].OutputValue' \
+    --output text \
+    --region $REGION \
+    --profile awsisb_IsbUsersPS-162343471173)
+
+CHAT_HISTORY_STREAM_ARN=$(aws cloudformation describe-stacks \
+    --stack-name $STACK_NAME \
+    --query 'Stacks[0].Outputs[?OutputKey==`ChatHistoryStreamArn`].OutputValue' \
+    --output text \
+    --region $REGION \
+    --profile awsisb_IsbUsersPS-162343471173)
+
 # Package Lambda functions
 echo "Packaging Lambda functions..."
 mkdir -p build
 cd lambda
 
 # Package chatbot handler
-zip -r ../build/chatbot-handler.zip chatbot_handler.py
-zip -r ../build/analytics-handler.zip analytics_handler.py
+zip -r ../build/chatbot-handler.zip chatbot_handler.py chat_pipeline.py chatbot_core.py single_flight.py history_codec.py metric_publisher.py event_publisher.py sales_insights.py product_search.py stock_availability.py
+# Sales insights and the product index are optional; build them with build_sales_insights.py and build_product_index.py
+for data in sales_insights.json product_index.json; do
+    if [ -f "$data" ]; then
+        zip ../build/chatbot-handler.zip "$data"
+    fi
+done
+zip -r ../build/analytics-handler.zip analytics_handler.py analytics_query.py history_codec.py history_archive.py parallel_scan.py rollups.py metric_publisher.py
+zip -r ../build/rollup-handler.zip rollup_handler.py rollups.py history_codec.py
 
 cd ..
 
+# Package dashboard handler; the python3.9 runtime has no NumPy, so the manylinux wheel goes into the zip
+rm -rf build/dashboard-handler build/dashboard-handler.zip
+pip3 install --quiet --platform manylinux2014_x86_64 --implementation cp --python-version 3.9 \
+    --only-binary=:all: --target build/dashboard-handler $(grep '^numpy==' requirements.txt)
+cp analytics-lambda.py analytics_engine.py sketches.py build/dashboard-handler/
+(cd build/dashboard-handler && zip -qr ../dashboard-handler.zip . -x 'bin/*')
+
 # Deploy Lambda functions
 echo "Deploying Lambda functions..."
 
@@ -57,7 +96,7 @@ aws lambda create-function \
     --role $(aws iam get-role --role-name "${ENVIRONMENT}-chatbot-LambdaExecutionRole" --query 'Role.Arn' --output text --profile awsisb_IsbUsersPS-162343471173) \
     --handler chatbot_handler.lambda_handler \
     --zip-file fileb://build/chatbot-handler.zip \
-    --environment Variables="{CHAT_HISTORY_TABLE=$CHAT_HISTORY_TABLE,FAQ_TABLE=$FAQ_TABLE,EVENT_BUS_NAME=${ENVIRONMENT}-chatbot-events}" \
+    --environment Variables="{CHAT_HISTORY_TABLE=$CHAT_HISTORY_TABLE,FAQ_TABLE=$FAQ_TABLE,EVENT_BUS_NAME=${ENVIRONMENT}-chatbot-events,CATALOG_TABLE=$CATALOG_TABLE,STOCK_INDEX=stock-hour-index}" \
     --timeout 30 \
     --region $REGION \
     --profile awsisb_IsbUsersPS-162343471173 \
@@ -74,7 +113,7 @@ aws lambda create-function \
     --role $(aws iam get-role --role-name "${ENVIRONMENT}-chatbot-LambdaExecutionRole" --query 'Role.Arn' --output text --profile awsisb_IsbUsersPS-162343471173) \
     --handler analytics_handler.lambda_handler \
     --zip-file fileb://build/analytics-handler.zip \
-    --environment Variables="{CHAT_HISTORY_TABLE=$CHAT_HISTORY_TABLE}" \
+    --environment Variables="{CHAT_HISTORY_TABLE=$CHAT_HISTORY_TABLE,ROLLUP_TABLE=$ROLLUP_TABLE,HOUR_BUCKET_INDEX=hour-bucket-index}" \
     --timeout 60 \
     --region $REGION \
     --profile awsisb_IsbUsersPS-162343471173 \
@@ -84,6 +123,51 @@ aws lambda create-function \
         --region $REGION \
         --profile awsisb_IsbUsersPS-162343471173
 
+# Dashboard handler (analytics-lambda.py), packaged with NumPy
+aws lambda create-function \
+    --function-name "${ENVIRONMENT}-dashboard-handler" \
+    --runtime python3.9 \
+    --role $(aws iam get-role --role-name "${ENVIRONMENT}-chatbot-LambdaExecutionRole" --query 'Role.Arn' --output text --profile awsisb_IsbUsersPS-162343471173) \
+    --handler analytics-lambda.lambda_handler \
+    --zip-file fileb://build/dashboard-handler.zip \
+    --environment Variables="{ANALYTICS_DATE_INDEX=date-index-v2}" \
+    --timeout 60 \
+    --memory-size 512 \
+    --region $REGION \
+    --profile awsisb_IsbUsersPS-162343471173 \
+    || aws lambda update-function-code \
+        --function-name "${ENVIRONMENT}-dashboard-handler" \
+        --zip-file fileb://build/dashboard-handler.zip \
+        --region $REGION \
+        --profile awsisb_IsbUsersPS-162343471173
+
+# Rollup handler, fed by the chat-history table stream
+aws lambda create-function \
+    --function-name "${ENVIRONMENT}-rollup-handler" \
+    --runtime python3.9 \
+    --role $(aws iam get-role --role-name "${ENVIRONMENT}-chatbot-LambdaExecutionRole" --query 'Role.Arn' --output text --profile awsisb_IsbUsersPS-162343471173) \
+    --handler rollup_handler.lambda_handler \
+    --zip-file fileb://build/rollup-handler.zip \
+    --environment Variables="{ROLLUP_TABLE=$ROLLUP_TABLE}" \
+    --timeout 60 \
+    --region $REGION \
+    --profile awsisb_IsbUsersPS-162343471173 \
+    || aws lambda update-function-code \
+        --function-name "${ENVIRONMENT}-rollup-handler" \
+        --zip-file fileb://build/rollup-handler.zip \
+        --region $REGION \
+        --profile awsisb_IsbUsersPS-162343471173
+
+aws lambda create-event-source-mapping \
+    --function-name "${ENVIRONMENT}-rollup-handler" \
+    --event-source-arn $CHAT_HISTORY_STREAM_ARN \
+    --starting-position LATEST \
+    --batch-size 500 \
+    --maximum-batching-window-in-seconds 5 \
+    --region $REGION \
+    --profile awsisb_IsbUsersPS-162343471173 \
+    || echo "Stream mapping for ${ENVIRONMENT}-rollup-handler already exists"
+
 # Seed FAQ data
 echo "Seeding FAQ data..."
 python3 scripts/seed_faq.py
@@ -91,3 +175,4 @@ python3 scripts/seed_faq.py
 echo "Deployment completed successfully!"
 echo "Chat History Table: $CHAT_HISTORY_TABLE"
 echo "FAQ Table: $FAQ_TABLE"
+echo "Rollup Table: $ROLLUP_TABLE"
@@ -2,9 +2,16 @@ import json
 import boto3
 import logging
 import os
+import threading
+from collections import Counter
 from datetime import datetime, timedelta
 from typing import Dict, List
 
+from analytics_query import QueryCache, handle_request
+from history_archive import HistoryArchive, HistoryReader
+from metric_publisher import MetricPublisher
+from rollups import METRIC_ATTRIBUTES, RollupStore, counters_for, metrics_from_counters
+
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
@@ -12,10 +19,28 @@ dynamodb = boto3.resource('dynamodb')
 cloudwatch = boto3.client('cloudwatch')
 
 CHAT_HISTORY_TABLE = os.environ['CHAT_HISTORY_TABLE']
+HISTORY_ARCHIVE_DIR = os.environ.get('HISTORY_ARCHIVE_DIR')
+ROLLUP_TABLE = os.environ.get('ROLLUP_TABLE')
+SCAN_SEGMENTS = int(os.environ.get('SCAN_SEGMENTS', '4'))
+HOUR_BUCKET_INDEX = os.environ.get('HOUR_BUCKET_INDEX')
+HOUR_QUERY_WORKERS = int(os.environ.get('HOUR_QUERY_WORKERS', '8'))
+# 'api' batches put_metric_data; 'emf' writes embedded-metric log lines instead
+METRICS_MODE = os.environ.get('METRICS_MODE', 'api')
+
+CORS_HEADERS = {
+    'Content-Type': 'application/json',
+    'Access-Control-Allow-Origin': '*'
+}
+
+# Responses of the range/granularity query API, shared by every request served by this container
+query_cache = QueryCache(int(os.environ.get('QUERY_CACHE_SIZE', '128')))
 
 class AnalyticsService:
     def __init__(self):
         self.chat_table = dynamodb.Table(CHAT_HISTORY_TABLE)
+        archive = HistoryArchive(HISTORY_ARCHIVE_DIR) if HISTORY_ARCHIVE_DIR else None
+        self.history = HistoryReader(self.chat_table, archive, HOUR_BUCKET_INDEX, HOUR_QUERY_WORKERS)
+        self.rollups = RollupStore(dynamodb.Table(ROLLUP_TABLE)) if ROLLUP_TABLE else None
     
     def get_chat_metrics(self, hours: int = 24) -> Dict:
         """Get chat metrics for the specified time period"""
@@ -24,94 +49,57 @@ class AnalyticsService:
             start_time = end_time - timedelta(hours=hours)
             start_timestamp = int(start_time.timestamp())
             
-            # Scan for recent chats (in production, use GSI for better performance)
-            response = self.chat_table.scan(
-                FilterExpression='#ts >= :start_time',
-                ExpressionAttributeNames={'#ts': 'timestamp'},
-                ExpressionAttributeValues={':start_time': start_timestamp}
-            )
-            
-            items = response['Items']
+            # Pre-aggregated buckets from the stream rollup, when deployed
+            if self.rollups is not None:
+                counters = self.rollups.totals(start_timestamp, int(end_time.timestamp()))
+                return metrics_from_counters(counters, hours)
             
-            # Calculate metrics
-            total_chats = len(items)
-            sentiment_counts = {'POSITIVE': 0, 'NEGATIVE': 0, 'NEUTRAL': 0, 'MIXED': 0}
-            language_counts = {}
-            faq_usage = 0
-            
-            for item in items:
-                metadata = item.get('metadata', {})
-                
-                # Sentiment analysis
-                sentiment = metadata.get('sentiment', {}).get('sentiment', 'NEUTRAL')
-                sentiment_counts[sentiment] = sentiment_counts.get(sentiment, 0) + 1
-                
-                # Language distribution
-                lang = metadata.get('detectedLanguage', 'en')
-                language_counts[lang] = language_counts.get(lang, 0) + 1
-                
-                # FAQ usage
-                if metadata.get('usedFAQ', False):
-                    faq_usage += 1
-            
-            return {
-                'totalChats': total_chats,
-                'sentimentDistribution': sentiment_counts,
-                'languageDistribution': language_counts,
-                'faqUsageRate': (faq_usage / total_chats * 100) if total_chats > 0 else 0,
-                'timeRange': f'{hours} hours'
-            }
+            # Parallel queries of the hour-bucket index (or a parallel segmented
+            # scan without one), plus archived segments when HISTORY_ARCHIVE_DIR
+            # is set; pages are folded as they arrive
+            counters = Counter()
+            lock = threading.Lock()
+
+            def fold_page(items):
+                page = Counter()
+                for item in items:
+                    page.update(counters_for(item))
+                with lock:
+                    counters.update(page)
+
+            self.history.for_each_page(start_timestamp, int(end_time.timestamp()), fold_page,
+                                       projection=METRIC_ATTRIBUTES, segments=SCAN_SEGMENTS)
+            return metrics_from_counters(counters, hours)
             
         except Exception as e:
             logger.error(f"Failed to get chat metrics: {e}")
             return {}
     
     def publish_metrics_to_cloudwatch(self, metrics: Dict):
-        """Publish metrics to CloudWatch"""
+        """Publish metrics to CloudWatch, batched into one request per namespace"""
         try:
-            # Total chats
-            cloudwatch.put_metric_data(
-                Namespace='Chatbot/Analytics',
-                MetricData=[
-                    {
-                        'MetricName': 'TotalChats',
-                        'Value': metrics.get('totalChats', 0),
-                        'Unit': 'Count'
-                    }
-                ]
-            )
-            
-            # Sentiment metrics
-            sentiment_dist = metrics.get('sentimentDistribution', {})
-            for sentiment, count in sentiment_dist.items():
-                cloudwatch.put_metric_data(
-                    Namespace='Chatbot/Sentiment',
-                    MetricData=[
-                        {
-                            'MetricName': f'{sentiment}Sentiment',
-                            'Value': count,
-                            'Unit': 'Count'
-                        }
-                    ]
-                )
-            
-            # FAQ usage rate
-            cloudwatch.put_metric_data(
-                Namespace='Chatbot/Performance',
-                MetricData=[
-                    {
-                        'MetricName': 'FAQUsageRate',
-                        'Value': metrics.get('faqUsageRate', 0),
-                        'Unit': 'Percent'
-                    }
-                ]
-            )
-            
+            publisher = MetricPublisher(cloudwatch, mode=METRICS_MODE)
+
+            publisher.count('Chatbot/Analytics', 'TotalChats', metrics.get('totalChats', 0))
+            for dimension, key in (('Language', 'languageDistribution'),
+                                   ('Route', 'routeDistribution'),
+                                   ('Handler', 'handlerDistribution')):
+                for value, count in metrics.get(key, {}).items():
+                    publisher.count('Chatbot/Analytics', 'Chats', count, dimensions={dimension: value})
+
+            for sentiment, count in metrics.get('sentimentDistribution', {}).items():
+                publisher.count('Chatbot/Sentiment', f'{sentiment}Sentiment', count)
+
+            publisher.count('Chatbot/Performance', 'FAQUsageRate', metrics.get('faqUsageRate', 0), unit='Percent')
+            publisher.flush()
+
         except Exception as e:
             logger.error(f"Failed to publish metrics: {e}")
 
 def lambda_handler(event, context):
-    """Analytics Lambda handler"""
+    """Analytics Lambda handler: the query API behind API Gateway, or a scheduled metrics run"""
+    if 'httpMethod' in event or 'requestContext' in event:
+        return query_handler(event)
     try:
         analytics = AnalyticsService()
         
@@ -138,3 +126,22 @@ def lambda_handler(event, context):
             'statusCode': 500,
             'body': json.dumps({'error': 'Failed to generate analytics'})
         }
+
+def query_handler(event):
+    """GET ?start=&end=&granularity=minute|hour|day&group_by=&metrics=, served from rollups"""
+    try:
+        if not ROLLUP_TABLE:
+            return {
+                'statusCode': 501,
+                'headers': dict(CORS_HEADERS),
+                'body': json.dumps({'error': 'Analytics queries need ROLLUP_TABLE'})
+            }
+        store = RollupStore(dynamodb.Table(ROLLUP_TABLE))
+        return handle_request(event, store, query_cache, CORS_HEADERS)
+    except Exception as e:
+        logger.error(f"Analytics query error: {e}")
+        return {
+            'statusCode': 500,
+            'headers': dict(CORS_HEADERS),
+            'body': json.dumps({'error': 'Failed to run analytics query'})
+        }
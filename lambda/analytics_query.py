@@ -0,0 +1,217 @@
+import hashlib
+import json
+import threading
+import time
+from collections import Counter, OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Tuple
+
+from rollups import GRANULARITIES, MINUTE_RETENTION_SECONDS, RollupStore, bucket_counters, bucket_start
+
+# group_by dimension -> counter name prefix in the rollup items
+GROUP_PREFIXES = {
+    'language': 'lang_',
+    'sentiment': 'sent_',
+    'route': 'route_',
+    'handler': 'handler_'
+}
+METRICS = ('total', 'faq', 'faqRate')
+DEFAULT_METRICS = ('total',)
+MAX_POINTS = 1500
+# Rollups trail the history table by the stream batching window; a range
+# ending this long ago is treated as final and cached for longer
+SETTLE_SECONDS = 120
+OPEN_TTL_SECONDS = 30
+CLOSED_TTL_SECONDS = 3600
+
+class QueryError(ValueError):
+    """An invalid query; the message is returned to the caller with a 400"""
+
+class AnalyticsQuery:
+    """A validated, bucket-aligned analytics query"""
+
+    def __init__(self, start: int, end: int, granularity: str, group_by: Tuple[str, ...], metrics: Tuple[str, ...]):
+        self.start = start
+        self.end = end
+        self.granularity = granularity
+        self.group_by = group_by
+        self.metrics = metrics
+
+    def key(self) -> str:
+        return json.dumps([self.start, self.end, self.granularity, self.group_by, self.metrics])
+
+    def points(self) -> List[int]:
+        width = GRANULARITIES[self.granularity]
+        return list(range(self.start, self.end + 1, width))
+
+def _parse_time(value: str, name: str) -> int:
+    """Epoch seconds, or ISO-8601 (naive values are UTC)"""
+    value = value.strip()
+    try:
+        return int(float(value))
+    except ValueError:
+        pass
+    try:
+        moment = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        raise QueryError(f"{name} must be epoch seconds or ISO-8601, got {value!r}")
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp())
+
+def _parse_list(value: Optional[str], allowed, name: str) -> Tuple[str, ...]:
+    if not value:
+        return ()
+    items = tuple(dict.fromkeys(part.strip() for part in value.split(',') if part.strip()))
+    unknown = [item for item in items if item not in allowed]
+    if unknown:
+        raise QueryError(f"Unknown {name} {', '.join(unknown)}; expected any of {', '.join(allowed)}")
+    return items
+
+def parse_query(params: Dict[str, Any], now: Optional[int] = None) -> AnalyticsQuery:
+    """Validate query-string parameters.
+
+    start/end default to the last 24 hours and granularity to hour. Both
+    ends are aligned down to their bucket, and the bucket holding end is
+    included.
+    """
+    now = int(time.time()) if now is None else now
+    granularity = params.get('granularity') or 'hour'
+    if granularity not in GRANULARITIES:
+        raise QueryError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+    end = _parse_time(params['end'], 'end') if params.get('end') else now
+    start = _parse_time(params['start'], 'start') if params.get('start') else end - 86400
+    end = min(end, now)
+    if start > end:
+        raise QueryError('start must not be after end')
+    if granularity == 'minute' and start < now - MINUTE_RETENTION_SECONDS:
+        raise QueryError(f'minute granularity covers only the last {MINUTE_RETENTION_SECONDS // 86400} days')
+
+    start, end = bucket_start(start, granularity), bucket_start(end, granularity)
+    if (end - start) // GRANULARITIES[granularity] + 1 > MAX_POINTS:
+        raise QueryError(f'Range has more than {MAX_POINTS} {granularity} buckets; use a coarser granularity')
+
+    group_by = _parse_list(params.get('group_by'), tuple(GROUP_PREFIXES), 'group_by')
+    metrics = _parse_list(params.get('metrics'), METRICS, 'metrics') or DEFAULT_METRICS
+    return AnalyticsQuery(start, end, granularity, group_by, metrics)
+
+def _summarize(counters: Counter, query: AnalyticsQuery) -> Dict[str, Any]:
+    total = counters.get('total', 0)
+    summary: Dict[str, Any] = {}
+    if 'total' in query.metrics:
+        summary['total'] = total
+    if 'faq' in query.metrics:
+        summary['faq'] = counters.get('faq', 0)
+    if 'faqRate' in query.metrics:
+        summary['faqRate'] = round(counters.get('faq', 0) / total * 100, 2) if total else 0
+    for dimension in query.group_by:
+        prefix = GROUP_PREFIXES[dimension]
+        summary[dimension] = {
+            name[len(prefix):]: value for name, value in sorted(counters.items())
+            if name.startswith(prefix) and value
+        }
+    return summary
+
+def run_query(store: RollupStore, query: AnalyticsQuery) -> Dict[str, Any]:
+    """One point per bucket in the range (empty buckets included) plus range totals"""
+    by_bucket: Dict[int, Counter] = {}
+    for item in store.buckets(query.granularity, query.start, query.end):
+        by_bucket[int(item['sk'])] = bucket_counters(item)
+
+    totals = Counter()
+    series = []
+    for start in query.points():
+        counters = by_bucket.get(start, Counter())
+        totals.update(counters)
+        series.append({'start': start, **_summarize(counters, query)})
+
+    return {
+        'start': query.start,
+        'end': query.end + GRANULARITIES[query.granularity],
+        'granularity': query.granularity,
+        'groupBy': list(query.group_by),
+        'metrics': list(query.metrics),
+        'series': series,
+        'totals': _summarize(totals, query)
+    }
+
+class QueryCache:
+    """Per-container LRU of serialized query responses and their ETags.
+
+    Ranges that ended more than SETTLE_SECONDS ago no longer change and are
+    kept for CLOSED_TTL_SECONDS; ranges that include recent buckets for
+    OPEN_TTL_SECONDS, about as long as the rollup stream takes to catch up.
+    """
+
+    def __init__(self, max_entries: int = 128):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[str, Tuple[float, str, str, int]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Tuple[str, str, int]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1:]
+
+    def put(self, key: str, body: str, etag: str, ttl: int):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, body, etag, ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+def ttl_for(query: AnalyticsQuery, now: int) -> int:
+    range_end = query.end + GRANULARITIES[query.granularity]
+    return CLOSED_TTL_SECONDS if range_end + SETTLE_SECONDS <= now else OPEN_TTL_SECONDS
+
+def etag_for(body: str) -> str:
+    return '"' + hashlib.sha1(body.encode('utf-8')).hexdigest()[:20] + '"'
+
+def _strip_weak(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith('W/') else tag
+
+def _header(headers: Optional[Dict[str, str]], name: str) -> Optional[str]:
+    for key, value in (headers or {}).items():
+        if key.lower() == name:
+            return value
+    return None
+
+def handle_request(event: Dict[str, Any], store: RollupStore, cache: QueryCache,
+                   cors_headers: Dict[str, str], now: Optional[int] = None) -> Dict[str, Any]:
+    """API Gateway proxy request -> response, honoring If-None-Match"""
+    now = int(time.time()) if now is None else now
+    try:
+        query = parse_query(event.get('queryStringParameters') or {}, now)
+    except QueryError as e:
+        return {'statusCode': 400, 'headers': dict(cors_headers), 'body': json.dumps({'error': str(e)})}
+
+    cached = cache.get(query.key())
+    if cached is None:
+        body = json.dumps(run_query(store, query), separators=(',', ':'))
+        etag, ttl = etag_for(body), ttl_for(query, now)
+        cache.put(query.key(), body, etag, ttl)
+    else:
+        body, etag, ttl = cached
+
+    headers = dict(cors_headers)
+    headers.update({
+        'ETag': etag,
+        'Cache-Control': f'private, max-age={ttl}',
+        'Access-Control-Expose-Headers': 'ETag'
+    })
+    if_none_match = _header(event.get('headers'), 'if-none-match')
+    if if_none_match and etag in (_strip_weak(tag) for tag in if_none_match.split(',')):
+        return {'statusCode': 304, 'headers': headers, 'body': ''}
+    return {'statusCode': 200, 'headers': headers, 'body': body}
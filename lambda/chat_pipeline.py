@@ -0,0 +1,436 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Any, Callable, List, Optional
+
+from chatbot_core import ChatbotService, json_response
+from event_publisher import EventPublisher
+from metric_publisher import MetricPublisher
+from product_search import ProductSearch
+from sales_insights import SalesInsights
+from stock_availability import StockAvailability
+from single_flight import normalize_key
+
+logger = logging.getLogger()
+
+class ChatContext:
+    """State threaded through the stages of one chat request"""
+
+    def __init__(self, event: Dict[str, Any], aws_context, service: ChatbotService, handler: str):
+        self.event = event
+        self.aws_context = aws_context
+        self.service = service
+        self.handler = handler
+
+        self.message = ''
+        self.session_id = None
+        self.user_language = 'en'
+        self.detected_language = 'en'
+        self.english_message = ''
+        self.sentiment: Dict[str, Any] = {'sentiment': 'NEUTRAL', 'confidence': {}}
+        self.faq_answer: Optional[str] = None
+        self.faq_item: Optional[Dict[str, Any]] = None
+        self.route: Optional[str] = None
+        self.bot_response = ''
+        self.final_response = ''
+        self.metadata: Dict[str, Any] = {}
+        self.now = datetime.now()
+
+        self.timings: Dict[str, float] = {}
+        self.response: Optional[Dict[str, Any]] = None
+        self.short_circuited = False
+
+    def finish(self, response: Dict[str, Any]):
+        """Return this response immediately; no further stages run"""
+        self.response = response
+
+    def short_circuit(self):
+        """Skip the remaining stages except those marked always"""
+        self.short_circuited = True
+
+class Stage:
+    """One step of the chat pipeline.
+
+    Stages marked ``always`` (persistence, events, the final response) still
+    run after an earlier stage short-circuits, so answered requests are
+    recorded no matter which stage produced the answer.
+    """
+    name = 'stage'
+    always = False
+
+    def __call__(self, ctx: ChatContext):
+        raise NotImplementedError
+
+class Pipeline:
+    def __init__(self, stages: List[Stage], handler: str):
+        self.stages = stages
+        self.handler = handler
+
+    def run(self, ctx: ChatContext) -> Dict[str, Any]:
+        """Run stages in order and return the Lambda response"""
+        for stage in self.stages:
+            if ctx.response is not None:
+                break
+            if ctx.short_circuited and not stage.always:
+                continue
+            start = time.perf_counter()
+            stage(ctx)
+            ctx.timings[stage.name] = (time.perf_counter() - start) * 1000
+        return ctx.response
+
+    def handle(self, event, aws_context, service: ChatbotService) -> Dict[str, Any]:
+        """Lambda entry point shared by the chat handlers"""
+        try:
+            return self.run(ChatContext(event, aws_context, service, self.handler))
+        except Exception as e:
+            logger.error(f"Handler error: {e}")
+            return json_response(500, {'error': 'Internal server error'})
+
+class ResponseCache:
+    """Per-container LRU of deterministic answers with a TTL"""
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 300):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+def _cache_key(ctx: ChatContext):
+    return (normalize_key(ctx.message, fold_case=True), ctx.user_language)
+
+class ParseRequest(Stage):
+    name = 'parse'
+
+    def __call__(self, ctx):
+        body = json.loads(ctx.event.get('body') or '{}')
+        ctx.message = body.get('message', '')
+        ctx.session_id = body.get('sessionId', ctx.aws_context.aws_request_id)
+        ctx.user_language = body.get('language', 'en')
+
+        if not ctx.message:
+            ctx.finish(json_response(400, {'error': 'Message is required'}))
+
+class CacheLookup(Stage):
+    """Serve repeated questions from the response cache"""
+    name = 'cache'
+
+    def __init__(self, cache: ResponseCache):
+        self.cache = cache
+
+    def __call__(self, ctx):
+        cached = self.cache.get(_cache_key(ctx))
+        if cached is None:
+            return
+        ctx.detected_language = cached['detectedLanguage']
+        ctx.sentiment = cached['sentiment']
+        ctx.faq_item = cached['faqItem']
+        ctx.faq_answer = ctx.faq_item['answer']
+        ctx.final_response = cached['response']
+        ctx.route = 'faq'
+        ctx.short_circuit()
+
+class CacheFill(Stage):
+    """Remember FAQ answers; generated answers are not deterministic"""
+    name = 'cache_fill'
+
+    def __init__(self, cache: ResponseCache):
+        self.cache = cache
+
+    def __call__(self, ctx):
+        if ctx.route != 'faq':
+            return
+        self.cache.put(_cache_key(ctx), {
+            'detectedLanguage': ctx.detected_language,
+            'sentiment': ctx.sentiment,
+            'faqItem': ctx.faq_item,
+            'response': ctx.final_response
+        })
+
+class DetectLanguage(Stage):
+    name = 'detect'
+
+    def __call__(self, ctx):
+        ctx.detected_language = ctx.service.detect_language(ctx.message)
+
+class TranslateIn(Stage):
+    """Translate to English for processing"""
+    name = 'translate'
+
+    def __call__(self, ctx):
+        ctx.english_message = ctx.service.translate_text(ctx.message, ctx.detected_language, 'en')
+
+class AnalyzeSentiment(Stage):
+    name = 'sentiment'
+
+    def __call__(self, ctx):
+        ctx.sentiment = ctx.service.analyze_sentiment(ctx.english_message)
+
+class CheckStock(Stage):
+    """Answer "is X in stock?" from the container's stock snapshot"""
+    name = 'stock'
+
+    def __init__(self, stock: StockAvailability):
+        self.stock = stock
+
+    def __call__(self, ctx):
+        try:
+            answer = self.stock.answer(ctx.english_message)
+        except Exception as e:
+            logger.error(f"Stock check failed: {e}")
+            return
+        if answer:
+            ctx.route = 'stock'
+            ctx.bot_response = answer
+
+class AnswerSalesInsight(Stage):
+    """Answer "what's trending?" and "what do people buy with X?" from precomputed sales data.
+
+    Runs after RetrieveFAQ, like SearchProducts, so an FAQ match wins.
+    """
+    name = 'insight'
+
+    def __init__(self, insights: SalesInsights):
+        self.insights = insights
+
+    def __call__(self, ctx):
+        if ctx.route is not None or ctx.faq_item is not None:
+            return
+        try:
+            answer = self.insights.answer(ctx.english_message)
+        except Exception as e:
+            logger.error(f"Sales insight failed: {e}")
+            return
+        if answer:
+            ctx.route = 'insight'
+            ctx.bot_response = answer
+
+class SearchProducts(Stage):
+    """Answer attribute-filtered product questions ("black cotton kids shirt size M") from the product index.
+
+    Runs after RetrieveFAQ: a service question that names a product
+    ("size chart for women") is the FAQ's to answer.
+    """
+    name = 'search'
+
+    def __init__(self, search: ProductSearch):
+        self.search = search
+
+    def __call__(self, ctx):
+        if ctx.route is not None or ctx.faq_item is not None:
+            return
+        try:
+            answer = self.search.answer(ctx.english_message)
+        except Exception as e:
+            logger.error(f"Product search failed: {e}")
+            return
+        if answer:
+            ctx.route = 'search'
+            ctx.bot_response = answer
+
+class RetrieveFAQ(Stage):
+    name = 'retrieve'
+
+    def __call__(self, ctx):
+        if ctx.route is not None:
+            return
+        ctx.faq_item = ctx.service.search_faq_item(ctx.english_message, ctx.user_language)
+        ctx.faq_answer = ctx.faq_item['answer'] if ctx.faq_item else None
+
+class Route(Stage):
+    """Pick the generator: the FAQ answer when one matched, else the default.
+
+    A route chosen by an earlier stage (a stock, insight or search answer) is kept.
+    """
+    name = 'route'
+
+    def __init__(self, default: str):
+        self.default = default
+
+    def __call__(self, ctx):
+        if ctx.route is None:
+            ctx.route = 'faq' if ctx.faq_answer else self.default
+
+class Generate(Stage):
+    name = 'generate'
+
+    def __init__(self, generators: Dict[str, Callable[[ChatContext], str]]):
+        answered = lambda ctx: ctx.bot_response
+        self.generators = {'faq': lambda ctx: ctx.faq_answer, 'stock': answered, 'insight': answered, 'search': answered}
+        self.generators.update(generators)
+
+    def __call__(self, ctx):
+        ctx.bot_response = self.generators[ctx.route](ctx)
+
+class TranslateOut(Stage):
+    """Translate response back to user's language"""
+    name = 'translate_out'
+
+    def __call__(self, ctx):
+        ctx.final_response = ctx.service.translate_text(ctx.bot_response, 'en', ctx.user_language)
+
+class BuildMetadata(Stage):
+    name = 'metadata'
+    always = True
+
+    def __init__(self, extra: Optional[Dict[str, Any]] = None):
+        self.extra = extra or {}
+
+    def __call__(self, ctx):
+        ctx.metadata = {
+            'detectedLanguage': ctx.detected_language,
+            'userLanguage': ctx.user_language,
+            'sentiment': ctx.sentiment,
+            'usedFAQ': ctx.route == 'faq',
+            'usedBedrock': ctx.route == 'llm',
+            'route': ctx.route,
+            'handler': ctx.handler,
+            **self.extra,
+            'timestamp': ctx.now.isoformat()
+        }
+
+class PersistHistory(Stage):
+    name = 'persist'
+    always = True
+
+    def __call__(self, ctx):
+        try:
+            ctx.service.save_chat_history(
+                ctx.session_id,
+                int(ctx.now.timestamp()),
+                ctx.message,
+                ctx.final_response,
+                ctx.metadata,
+                faq_item=ctx.faq_item if ctx.route == 'faq' else None
+            )
+        except Exception as e:
+            logger.error(f"Failed to save chat history: {e}")
+
+class PublishEvent(Stage):
+    """Publish the chat.interaction analytics event.
+
+    Entries go through the container's EventPublisher when one is given,
+    so requests can share PutEvents calls; otherwise each request sends
+    its own.
+    """
+    name = 'publish'
+    always = True
+
+    def __init__(self, extra: Optional[Dict[str, Any]] = None, publisher: Optional[EventPublisher] = None):
+        self.extra = extra or {}
+        self.publisher = publisher
+
+    def __call__(self, ctx):
+        try:
+            publisher = self.publisher or EventPublisher(ctx.service.events, ctx.service.event_bus_name)
+            publisher.add('chat.interaction', {
+                'sessionId': ctx.session_id,
+                'sentiment': ctx.sentiment['sentiment'],
+                'language': ctx.detected_language,
+                'usedFAQ': ctx.metadata['usedFAQ'],
+                'usedBedrock': ctx.metadata['usedBedrock'],
+                **self.extra
+            })
+            publisher.flush_if_due()
+        except Exception as e:
+            logger.error(f"Failed to publish event: {e}")
+
+class RecordMetrics(Stage):
+    """Emit per-request latency and chat counts by handler and route.
+
+    Meant for an EMF-mode publisher: flushing writes a log line, not an
+    API call, so doing it on every request costs nothing extra.
+    """
+    name = 'metrics'
+    always = True
+
+    def __init__(self, publisher: MetricPublisher):
+        self.publisher = publisher
+
+    def __call__(self, ctx):
+        try:
+            dimensions = {'Handler': ctx.handler, 'Route': ctx.route or 'none'}
+            self.publisher.observe('Chatbot/Performance', 'Latency', sum(ctx.timings.values()),
+                                   dimensions=dimensions)
+            self.publisher.count('Chatbot/Analytics', 'Chats', dimensions=dimensions)
+            self.publisher.flush()
+        except Exception as e:
+            logger.error(f"Failed to record metrics: {e}")
+
+class Respond(Stage):
+    name = 'respond'
+    always = True
+
+    def __call__(self, ctx):
+        ctx.finish(json_response(200, {
+            'response': ctx.final_response,
+            'sessionId': ctx.session_id,
+            'metadata': ctx.metadata
+        }))
+
+def standard_stages(default_route: str, generators: Dict[str, Callable[[ChatContext], str]],
+                    cache: Optional[ResponseCache] = None,
+                    metadata_extra: Optional[Dict[str, Any]] = None,
+                    event_extra: Optional[Dict[str, Any]] = None,
+                    metrics: Optional[MetricPublisher] = None,
+                    events: Optional[EventPublisher] = None,
+                    insights: Optional[SalesInsights] = None,
+                    search: Optional[ProductSearch] = None,
+                    stock: Optional[StockAvailability] = None) -> List[Stage]:
+    """The stage list every chat handler uses, parameterized by its generators"""
+    stages: List[Stage] = [ParseRequest()]
+    if cache is not None:
+        stages.append(CacheLookup(cache))
+    stages += [
+        DetectLanguage(),
+        TranslateIn(),
+        AnalyzeSentiment(),
+    ]
+    if stock is not None:
+        stages.append(CheckStock(stock))
+    stages.append(RetrieveFAQ())
+    if insights is not None:
+        stages.append(AnswerSalesInsight(insights))
+    if search is not None:
+        stages.append(SearchProducts(search))
+    stages += [
+        Route(default_route),
+        Generate(generators),
+        TranslateOut(),
+    ]
+    if cache is not None:
+        stages.append(CacheFill(cache))
+    stages += [
+        BuildMetadata(metadata_extra),
+        PersistHistory(),
+        PublishEvent(event_extra, events),
+    ]
+    if metrics is not None:
+        stages.append(RecordMetrics(metrics))
+    stages.append(Respond())
+    return stages
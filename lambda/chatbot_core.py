@@ -0,0 +1,260 @@
+import json
+import logging
+import re
+from decimal import Decimal
+from functools import lru_cache
+from typing import Dict, Any, Optional
+
+from history_codec import HOUR_BUCKET_ATTRIBUTE, encode_record, hour_bucket
+from single_flight import SingleFlight, normalize_key
+
+logger = logging.getLogger()
+
+FAQ_CATEGORIES = ['general', 'shipping', 'returns', 'payment', 'products', 'account']
+# Words every kind of question shares; an FAQ match needs one of the others
+FAQ_STOPWORDS = {
+    'a', 'an', 'the', 'i', 'me', 'my', 'you', 'your', 'we', 'our', 'it', 'is', 'are', 'be', 'do', 'does', 'can',
+    'will', 'have', 'has', 'there', 'this', 'that', 'what', 'how', 'any', 'some', 'for', 'to', 'of', 'on', 'in',
+    'at', 'or', 'and', 'as', 'if', 'with', 'need', 'want', 'get', 'please', 'show', 'looking', 'item', 'product',
+    'buy', 'now', 'people', 'customer', 'usually', 'most', 'also', 'else', 'together',
+    'anda', 'apakah', 'adakah', 'bagaimana', 'apa', 'yang', 'di', 'ada', 'kami', 'saya'
+}
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+def _content_words(text: str) -> set:
+    """Words of two or more letters with plural -s dropped, less FAQ_STOPWORDS"""
+    words = set()
+    for word in _WORD_RE.findall(text.lower()):
+        if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        if len(word) > 1 and word not in FAQ_STOPWORDS:
+            words.add(word)
+    return words
+
+@lru_cache(maxsize=4096)
+def _question_words(question: str) -> frozenset:
+    # FAQ questions repeat on every search; tokenize each once per container
+    return frozenset(_content_words(question))
+
+CORS_HEADERS = {
+    'Content-Type': 'application/json',
+    'Access-Control-Allow-Origin': '*'
+}
+
+def convert_floats_to_decimal(obj):
+    """Convert float values to Decimal for DynamoDB"""
+    if isinstance(obj, float):
+        return Decimal(str(obj))
+    elif isinstance(obj, dict):
+        return {k: convert_floats_to_decimal(v) for k, v in obj.items()}
+    elif isinstance(obj, list):
+        return [convert_floats_to_decimal(v) for v in obj]
+    return obj
+
+def _serialize_number(value) -> Dict[str, str]:
+    return {'N': str(value)}
+
+def _serialize_float(value: float) -> Dict[str, str]:
+    if value != value or value in (float('inf'), float('-inf')):
+        raise TypeError(f"DynamoDB does not support {value} numbers")
+    text = repr(value)
+    if 'e' in text:
+        # Match the plain notation Decimal(str(value)) used to store
+        text = str(Decimal(text))
+    return {'N': text}
+
+def _serialize_map(value: Dict[str, Any]) -> Dict[str, Any]:
+    return {'M': {k: _serialize(v) for k, v in value.items()}}
+
+def _serialize_list(value) -> Dict[str, Any]:
+    return {'L': [_serialize(v) for v in value]}
+
+_SERIALIZERS = {
+    str: lambda v: {'S': v},
+    bool: lambda v: {'BOOL': v},
+    int: _serialize_number,
+    float: _serialize_float,
+    Decimal: _serialize_number,
+    dict: _serialize_map,
+    list: _serialize_list,
+    tuple: _serialize_list,
+    type(None): lambda v: {'NULL': True},
+    bytes: lambda v: {'B': v},
+}
+
+def _serialize(value) -> Dict[str, Any]:
+    serializer = _SERIALIZERS.get(type(value))
+    if serializer is None:
+        # Subclasses (OrderedDict, IntEnum, ...) miss the exact-type table
+        for base, candidate in _SERIALIZERS.items():
+            if isinstance(value, base) and base is not bool:
+                serializer = candidate
+                break
+        else:
+            raise TypeError(f"Unsupported type for DynamoDB: {type(value).__name__}")
+    return serializer(value)
+
+def serialize_item(item: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Convert a handler item straight to DynamoDB wire format for the low-level client.
+
+    Floats are written with their shortest repr, which is what
+    convert_floats_to_decimal produced via Decimal(str(f)), without building
+    an intermediate copy or going through boto3's TypeSerializer.
+    """
+    return {k: _serialize(v) for k, v in item.items()}
+
+def json_response(status_code: int, body: Dict[str, Any]) -> Dict[str, Any]:
+    """Build an API Gateway proxy response"""
+    return {
+        'statusCode': status_code,
+        'headers': dict(CORS_HEADERS),
+        'body': json.dumps(body)
+    }
+
+class ChatbotService:
+    """AWS-backed operations shared by every chat handler.
+
+    Clients are passed in rather than created here so each handler keeps
+    control of regions, and so tools can swap in stand-in backends.
+    """
+
+    def __init__(self, dynamodb, comprehend, translate, events, chat_table_name: str,
+                 faq_table_name: str, event_bus_name: str, bedrock=None,
+                 inflight: Optional[SingleFlight] = None, single_flight_timeout: float = 20,
+                 dynamodb_client=None, history_format: str = 'compact'):
+        self.chat_table = dynamodb.Table(chat_table_name)
+        self.chat_table_name = chat_table_name
+        self.dynamodb_client = dynamodb_client
+        self.faq_table = dynamodb.Table(faq_table_name)
+        self.comprehend = comprehend
+        self.translate = translate
+        self.events = events
+        self.event_bus_name = event_bus_name
+        self.bedrock = bedrock
+        self.inflight = inflight or SingleFlight()
+        self.single_flight_timeout = single_flight_timeout
+        self.history_format = history_format
+
+    def detect_language(self, text: str) -> str:
+        """Detect language of input text"""
+        try:
+            response = self.comprehend.detect_dominant_language(Text=text)
+            return response['Languages'][0]['LanguageCode']
+        except Exception as e:
+            logger.error(f"Language detection failed: {e}")
+            return 'en'
+
+    def translate_text(self, text: str, source_lang: str, target_lang: str) -> str:
+        """Translate text between languages"""
+        if source_lang == target_lang:
+            return text
+
+        def call():
+            response = self.translate.translate_text(
+                Text=text,
+                SourceLanguageCode=source_lang,
+                TargetLanguageCode=target_lang
+            )
+            return response['TranslatedText']
+
+        try:
+            key = ('translate', source_lang, target_lang, normalize_key(text))
+            return self.inflight.do(key, call, timeout=self.single_flight_timeout)
+        except Exception as e:
+            logger.error(f"Translation failed: {e}")
+            return text
+
+    def analyze_sentiment(self, text: str) -> Dict[str, Any]:
+        """Analyze sentiment and emotion"""
+        try:
+            response = self.comprehend.detect_sentiment(
+                Text=text,
+                LanguageCode='en'
+            )
+            return {
+                'sentiment': response['Sentiment'],
+                'confidence': response['SentimentScore']
+            }
+        except Exception as e:
+            logger.error(f"Sentiment analysis failed: {e}")
+            return {'sentiment': 'NEUTRAL', 'confidence': {}}
+
+    def save_chat_item(self, item: Dict[str, Any]):
+        """Write a chat-history item, via the low-level client when one is configured"""
+        if self.dynamodb_client is not None:
+            self.dynamodb_client.put_item(TableName=self.chat_table_name, Item=serialize_item(item))
+        else:
+            self.chat_table.put_item(Item=convert_floats_to_decimal(item))
+
+    def save_chat_history(self, session_id: str, timestamp: int, user_message: str,
+                          bot_response: str, metadata: Dict[str, Any],
+                          faq_item: Optional[Dict[str, Any]] = None):
+        """Record one exchange in the configured history format (compact or legacy)"""
+        if self.history_format == 'legacy':
+            item = {
+                'sessionId': session_id,
+                'timestamp': timestamp,
+                HOUR_BUCKET_ATTRIBUTE: hour_bucket(timestamp),
+                'userMessage': user_message,
+                'botResponse': bot_response,
+                'metadata': metadata
+            }
+        else:
+            item = encode_record(session_id, timestamp, user_message, bot_response, metadata, faq_item)
+        self.save_chat_item(item)
+
+    def search_faq(self, query: str, user_language: str = 'en') -> Optional[str]:
+        """Answer text of the best FAQ match"""
+        item = self.search_faq_item(query, user_language)
+        return item['answer'] if item else None
+
+    def search_faq_item(self, query: str, user_language: str = 'en') -> Optional[Dict[str, Any]]:
+        """First FAQ, across all categories, whose question shares a whole non-stopword word with the query"""
+        try:
+            words = _content_words(query)
+            if not words:
+                return None
+            for category in FAQ_CATEGORIES:
+                try:
+                    response = self.faq_table.query(
+                        KeyConditionExpression='category = :cat',
+                        ExpressionAttributeValues={':cat': category}
+                    )
+
+                    for item in response['Items']:
+                        if not words.isdisjoint(_question_words(item['question'])):
+                            return item
+                except Exception:
+                    continue
+
+            return None
+        except Exception as e:
+            logger.error(f"FAQ search failed: {e}")
+            return None
+
+    def invoke_model(self, key, model_id: str, body: str, parse) -> str:
+        """Invoke a Bedrock model, sharing the call with identical in-flight requests"""
+        def call():
+            response = self.bedrock.invoke_model(
+                modelId=model_id,
+                body=body,
+                contentType='application/json'
+            )
+            return parse(json.loads(response['body'].read()))
+
+        return self.inflight.do(key, call, timeout=self.single_flight_timeout)
+
+    def generate_smart_response(self, message: str, sentiment: str = 'NEUTRAL') -> str:
+        """Fallback intelligent responses"""
+        message_lower = message.lower()
+
+        if any(word in message_lower for word in ['hello', 'hi', 'hey']):
+            return "Hello! Welcome to our store. How can I help you today?"
+
+        if any(word in message_lower for word in ['thank', 'thanks']):
+            return "You're very welcome! Is there anything else I can help you with?"
+
+        if any(word in message_lower for word in ['product', 'item', 'buy']):
+            return "I'd be happy to help you with product information. You can browse our catalog on our website or visit one of our stores."
+
+        return "Thank you for your message. I'm here to help with any questions about our store, products, or services. What can I assist you with?"
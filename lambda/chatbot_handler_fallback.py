@@ -1,10 +1,15 @@
-import json
 import boto3
 import logging
 import os
-from datetime import datetime
-from typing import Dict, Any, Optional
-from decimal import Decimal
+
+from chat_pipeline import Pipeline, ResponseCache, standard_stages
+from chatbot_core import ChatbotService as BaseChatbotService
+from event_publisher import EventPublisher
+from metric_publisher import MetricPublisher
+from product_search import load_search
+from sales_insights import load_insights
+from stock_availability import StockAvailability
+from single_flight import SingleFlight
 
 # Configure logging
 logger = logging.getLogger()
@@ -14,92 +19,61 @@ logger.setLevel(logging.INFO)
 comprehend = boto3.client('comprehend', region_name='ap-southeast-1')
 translate = boto3.client('translate', region_name='ap-southeast-1')
 dynamodb = boto3.resource('dynamodb')
+dynamodb_client = boto3.client('dynamodb')
 events = boto3.client('events', region_name='ap-southeast-1')
 
 # Environment variables
 CHAT_HISTORY_TABLE = os.environ['CHAT_HISTORY_TABLE']
 FAQ_TABLE = os.environ['FAQ_TABLE']
 EVENT_BUS_NAME = os.environ['EVENT_BUS_NAME']
+SINGLE_FLIGHT_TIMEOUT = float(os.environ.get('SINGLE_FLIGHT_TIMEOUT', '20'))
+RESPONSE_CACHE_SIZE = int(os.environ.get('RESPONSE_CACHE_SIZE', '256'))
+RESPONSE_CACHE_TTL = float(os.environ.get('RESPONSE_CACHE_TTL', '300'))
+HISTORY_FORMAT = os.environ.get('HISTORY_FORMAT', 'compact')
+# 'emf' logs per-request latency and chat counts as embedded metrics
+METRICS_MODE = os.environ.get('METRICS_MODE', 'off')
+# How long chat.interaction events may wait for later requests to share a
+# PutEvents call; 0 sends each request's event before it returns
+EVENT_BATCH_SECONDS = float(os.environ.get('EVENT_BATCH_SECONDS', '0'))
+# Precomputed by build_sales_insights.py / build_product_index.py and shipped in the deployment package
+SALES_INSIGHTS_PATH = os.environ.get('SALES_INSIGHTS_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sales_insights.json'))
+PRODUCT_INDEX_PATH = os.environ.get('PRODUCT_INDEX_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'product_index.json'))
+# Stock snapshot of the shop catalog, refreshed by delta every STOCK_REFRESH_SECONDS
+# and reloaded in full every STOCK_FULL_RELOAD_EVERY deltas to drop deleted products;
+# STOCK_STRICT re-reads low-stock items with a consistent GetItem
+CATALOG_TABLE = os.environ.get('CATALOG_TABLE')
+STOCK_INDEX = os.environ.get('STOCK_INDEX')
+STOCK_REFRESH_SECONDS = float(os.environ.get('STOCK_REFRESH_SECONDS', '30'))
+STOCK_STRICT = os.environ.get('STOCK_STRICT', 'false').lower() == 'true'
+LOW_STOCK_THRESHOLD = int(os.environ.get('LOW_STOCK_THRESHOLD', '5'))
+STOCK_FULL_RELOAD_EVERY = int(os.environ.get('STOCK_FULL_RELOAD_EVERY', '20'))
 
-def convert_floats_to_decimal(obj):
-    """Convert float values to Decimal for DynamoDB"""
-    if isinstance(obj, float):
-        return Decimal(str(obj))
-    elif isinstance(obj, dict):
-        return {k: convert_floats_to_decimal(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [convert_floats_to_decimal(v) for v in obj]
-    return obj
+# Shared by every request served by this container
+inflight = SingleFlight()
+response_cache = ResponseCache(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL)
+metrics = MetricPublisher(mode='emf') if METRICS_MODE == 'emf' else None
+event_publisher = EventPublisher(events, EVENT_BUS_NAME, max_delay_seconds=EVENT_BATCH_SECONDS)
+insights = load_insights(SALES_INSIGHTS_PATH)
+product_search = load_search(PRODUCT_INDEX_PATH)
+stock = StockAvailability(dynamodb.Table(CATALOG_TABLE), STOCK_INDEX, STOCK_REFRESH_SECONDS,
+                          LOW_STOCK_THRESHOLD, STOCK_STRICT,
+                          full_reload_every=STOCK_FULL_RELOAD_EVERY) if CATALOG_TABLE else None
 
-class ChatbotService:
+class ChatbotService(BaseChatbotService):
     def __init__(self):
-        self.chat_table = dynamodb.Table(CHAT_HISTORY_TABLE)
-        self.faq_table = dynamodb.Table(FAQ_TABLE)
-    
-    def detect_language(self, text: str) -> str:
-        """Detect language of input text"""
-        try:
-            response = comprehend.detect_dominant_language(Text=text)
-            return response['Languages'][0]['LanguageCode']
-        except Exception as e:
-            logger.error(f"Language detection failed: {e}")
-            return 'en'
-    
-    def translate_text(self, text: str, source_lang: str, target_lang: str) -> str:
-        """Translate text between languages"""
-        if source_lang == target_lang:
-            return text
-        
-        try:
-            response = translate.translate_text(
-                Text=text,
-                SourceLanguageCode=source_lang,
-                TargetLanguageCode=target_lang
-            )
-            return response['TranslatedText']
-        except Exception as e:
-            logger.error(f"Translation failed: {e}")
-            return text
-    
-    def analyze_sentiment(self, text: str) -> Dict[str, Any]:
-        """Analyze sentiment and emotion"""
-        try:
-            response = comprehend.detect_sentiment(
-                Text=text,
-                LanguageCode='en'
-            )
-            return {
-                'sentiment': response['Sentiment'],
-                'confidence': response['SentimentScore']
-            }
-        except Exception as e:
-            logger.error(f"Sentiment analysis failed: {e}")
-            return {'sentiment': 'NEUTRAL', 'confidence': {}}
-    
-    def search_faq(self, query: str) -> Optional[str]:
-        """Search FAQ database across all categories"""
-        try:
-            # Scan all FAQ categories
-            categories = ['general', 'shipping', 'returns', 'payment', 'products', 'account']
-            
-            query_lower = query.lower()
-            for category in categories:
-                try:
-                    response = self.faq_table.query(
-                        KeyConditionExpression='category = :cat',
-                        ExpressionAttributeValues={':cat': category}
-                    )
-                    
-                    for item in response['Items']:
-                        if any(word in item['question'].lower() for word in query_lower.split()):
-                            return item['answer']
-                except Exception:
-                    continue
-            
-            return None
-        except Exception as e:
-            logger.error(f"FAQ search failed: {e}")
-            return None
+        super().__init__(
+            dynamodb=dynamodb,
+            comprehend=comprehend,
+            translate=translate,
+            events=events,
+            chat_table_name=CHAT_HISTORY_TABLE,
+            faq_table_name=FAQ_TABLE,
+            event_bus_name=EVENT_BUS_NAME,
+            inflight=inflight,
+            single_flight_timeout=SINGLE_FLIGHT_TIMEOUT,
+            dynamodb_client=dynamodb_client,
+            history_format=HISTORY_FORMAT
+        )
     
     def generate_smart_response(self, message: str, sentiment: str) -> str:
         """Generate intelligent responses without Bedrock"""
@@ -132,117 +106,24 @@ class ChatbotService:
         # Default intelligent response
         return "Thank you for your message. While I don't have a specific answer for that question, our customer service team would be happy to help you. You can contact them through our website or visit one of our store locations."
 
+pipeline = Pipeline(
+    standard_stages(
+        default_route='smart',
+        generators={
+            'smart': lambda ctx: ctx.service.generate_smart_response(
+                ctx.english_message, ctx.sentiment['sentiment']
+            )
+        },
+        cache=response_cache,
+        metrics=metrics,
+        events=event_publisher,
+        insights=insights,
+        search=product_search,
+        stock=stock
+    ),
+    handler='fallback'
+)
+
 def lambda_handler(event, context):
     """Main Lambda handler with Bedrock fallback"""
-    try:
-        chatbot = ChatbotService()
-        
-        # Parse request
-        body = json.loads(event.get('body', '{}'))
-        user_message = body.get('message', '')
-        session_id = body.get('sessionId', context.aws_request_id)
-        user_language = body.get('language', 'en')
-        
-        if not user_message:
-            return {
-                'statusCode': 400,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps({'error': 'Message is required'})
-            }
-        
-        # Detect language
-        detected_language = chatbot.detect_language(user_message)
-        
-        # Translate to English for processing
-        english_message = chatbot.translate_text(user_message, detected_language, 'en')
-        
-        # Analyze sentiment
-        sentiment_data = chatbot.analyze_sentiment(english_message)
-        
-        # Search FAQ first
-        faq_response = chatbot.search_faq(english_message)
-        
-        # Generate response
-        if faq_response:
-            bot_response = faq_response
-            used_faq = True
-        else:
-            bot_response = chatbot.generate_smart_response(english_message, sentiment_data['sentiment'])
-            used_faq = False
-        
-        # Translate response back to user's language
-        final_response = chatbot.translate_text(bot_response, 'en', user_language)
-        
-        # Prepare metadata
-        metadata = {
-            'detectedLanguage': detected_language,
-            'userLanguage': user_language,
-            'sentiment': sentiment_data,
-            'usedFAQ': used_faq,
-            'usedBedrock': False,
-            'timestamp': datetime.now().isoformat()
-        }
-        
-        # Save chat history
-        try:
-            timestamp = int(datetime.now().timestamp())
-            metadata_decimal = convert_floats_to_decimal(metadata)
-            
-            chatbot.chat_table.put_item(
-                Item={
-                    'sessionId': session_id,
-                    'timestamp': timestamp,
-                    'userMessage': user_message,
-                    'botResponse': final_response,
-                    'metadata': metadata_decimal
-                }
-            )
-        except Exception as e:
-            logger.error(f"Failed to save chat history: {e}")
-        
-        # Publish analytics event
-        try:
-            events.put_events(
-                Entries=[
-                    {
-                        'Source': 'chatbot.service',
-                        'DetailType': 'chat.interaction',
-                        'Detail': json.dumps({
-                            'sessionId': session_id,
-                            'sentiment': sentiment_data['sentiment'],
-                            'language': detected_language,
-                            'usedFAQ': used_faq
-                        }),
-                        'EventBusName': EVENT_BUS_NAME
-                    }
-                ]
-            )
-        except Exception as e:
-            logger.error(f"Failed to publish event: {e}")
-        
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps({
-                'response': final_response,
-                'sessionId': session_id,
-                'metadata': metadata
-            })
-        }
-        
-    except Exception as e:
-        logger.error(f"Handler error: {e}")
-        return {
-            'statusCode': 500,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps({'error': 'Internal server error'})
-        }
+    return pipeline.handle(event, context, ChatbotService())
@@ -0,0 +1,140 @@
+import json
+import logging
+import threading
+import time
+from typing import Dict, Any, Callable, List, Optional
+
+logger = logging.getLogger()
+
+# PutEvents accepts up to 10 entries and 256 KB per request. An entry's size
+# is the UTF-8 length of its Source, DetailType, Detail and Resources, plus
+# 14 bytes when Time is set (counted always, to stay on the safe side).
+MAX_ENTRIES_PER_REQUEST = 10
+MAX_REQUEST_BYTES = 256 * 1024
+TIME_BYTES = 14
+
+def entry_size(entry: Dict[str, Any]) -> int:
+    size = TIME_BYTES
+    for key in ('Source', 'DetailType', 'Detail'):
+        size += len(entry.get(key, '').encode('utf-8'))
+    return size + sum(len(resource.encode('utf-8')) for resource in entry.get('Resources', []))
+
+class EventPublisher:
+    """Buffer EventBridge entries and send them with as few PutEvents calls as possible.
+
+    add() queues an entry and sends a request as soon as
+    MAX_ENTRIES_PER_REQUEST entries are waiting. flush() sends everything,
+    packing requests up to the entry and byte limits. Entries PutEvents
+    reports as failed are retried on their own, with exponential backoff,
+    up to max_attempts sends in total; entries that still fail are logged
+    and dropped. Safe to share between threads.
+
+    In a Lambda handler, call flush_if_due() at the end of each request:
+    with max_delay_seconds=0 every request is flushed before it returns;
+    a larger value lets entries from consecutive requests share a call,
+    at the cost of losing them if the container is reclaimed meanwhile.
+    Batch tools can use the publisher as a context manager to flush on exit.
+    """
+
+    def __init__(self, events, event_bus_name: str, source: str = 'chatbot.service',
+                 max_attempts: int = 3, backoff_seconds: float = 0.05, max_delay_seconds: float = 0.0,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.events = events
+        self.event_bus_name = event_bus_name
+        self.source = source
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self.sleep = sleep
+        self._buffer: List[Dict[str, Any]] = []
+        self._oldest: Optional[float] = None
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.published = 0
+        self.failed = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
+
+    def add(self, detail_type: str, detail: Dict[str, Any]):
+        entry = {
+            'Source': self.source,
+            'DetailType': detail_type,
+            'Detail': json.dumps(detail, default=str),
+            'EventBusName': self.event_bus_name
+        }
+        if entry_size(entry) > MAX_REQUEST_BYTES:
+            logger.error(f"Dropping {detail_type} event of {entry_size(entry)} bytes; PutEvents allows {MAX_REQUEST_BYTES}")
+            with self._lock:
+                self.failed += 1
+            return
+        with self._lock:
+            if not self._buffer:
+                self._oldest = time.monotonic()
+            self._buffer.append(entry)
+            full = len(self._buffer) >= MAX_ENTRIES_PER_REQUEST
+        if full:
+            self.flush()
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._buffer)
+
+    def flush_if_due(self) -> int:
+        """Flush when the oldest buffered entry has waited max_delay_seconds"""
+        with self._lock:
+            due = self._buffer and time.monotonic() - self._oldest >= self.max_delay_seconds
+        return self.flush() if due else 0
+
+    def flush(self) -> int:
+        """Send everything buffered; returns the number of entries published"""
+        with self._lock:
+            entries, self._buffer, self._oldest = self._buffer, [], None
+        published = 0
+        for batch in _batches(entries):
+            published += self._send(batch)
+        return published
+
+    def _send(self, batch: List[Dict[str, Any]]) -> int:
+        published = 0
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                response = self.events.put_events(Entries=batch)
+                failed = [entry for entry, result in zip(batch, response.get('Entries', [])) if result.get('ErrorCode')]
+                if response.get('FailedEntryCount', 0) and not failed:
+                    failed = batch  # counts without per-entry results; resend all
+                error = f"{len(failed)} entries failed"
+            except Exception as e:
+                failed, error = batch, str(e)
+            with self._lock:
+                self.requests += 1
+            published += len(batch) - len(failed)
+            if not failed:
+                break
+            if attempt < self.max_attempts:
+                self.sleep(self.backoff_seconds * 2 ** (attempt - 1))
+            batch = failed
+        else:
+            logger.error(f"Failed to publish {len(batch)} events after {self.max_attempts} attempts: {error}")
+            with self._lock:
+                self.failed += len(batch)
+        with self._lock:
+            self.published += published
+        return published
+
+def _batches(entries: List[Dict[str, Any]]):
+    """Split entries into requests within the entry-count and payload-size limits"""
+    batch: List[Dict[str, Any]] = []
+    size = 0
+    for entry in entries:
+        size_of_entry = entry_size(entry)
+        if batch and (len(batch) >= MAX_ENTRIES_PER_REQUEST or size + size_of_entry > MAX_REQUEST_BYTES):
+            yield batch
+            batch, size = [], 0
+        batch.append(entry)
+        size += size_of_entry
+    if batch:
+        yield batch
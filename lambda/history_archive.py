@@ -0,0 +1,407 @@
+import base64
+import bisect
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Dict, Any, Callable, Iterator, List, Optional, Tuple
+
+from history_codec import HOUR_BUCKET_ATTRIBUTE, decode_record, hour_bucket
+from parallel_scan import parallel_query, parallel_scan
+
+logger = logging.getLogger()
+
+# Archive layout
+#
+#   <root>/watermark.json                    {"archivedBefore": <epoch>}
+#   <root>/date=YYYY-MM-DD/<name>.ndjson.gz  chat-history items, one JSON per line
+#   <root>/date=YYYY-MM-DD/<name>.idx.json   block index of that segment
+#
+# Segments hold one UTC day each, sorted by (sessionId, timestamp). The gzip
+# file is a series of independent members ("blocks") of roughly BLOCK_BYTES
+# uncompressed, so a session lookup decompresses only the blocks the index
+# points at. Items keep the attribute layout they had in the table (legacy or
+# compact), with numbers as Decimal and Binary attributes as {"$b": base64}.
+
+SEGMENT_FORMAT = 1
+BLOCK_BYTES = 64 * 1024
+WATERMARK_FILE = 'watermark.json'
+ARCHIVE_PAGE_ITEMS = 1000
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (bytes, bytearray)) or hasattr(value, 'value'):
+        return {'$b': base64.b64encode(bytes(getattr(value, 'value', value))).decode('ascii')}
+    if isinstance(value, set):
+        return sorted(value)
+    raise TypeError(f"Cannot archive {type(value).__name__}")
+
+def _json_object(obj):
+    if len(obj) == 1 and '$b' in obj:
+        return base64.b64decode(obj['$b'])
+    return obj
+
+def encode_line(item: Dict[str, Any]) -> bytes:
+    return json.dumps(item, default=_json_default, separators=(',', ':'), ensure_ascii=False).encode('utf-8') + b'\n'
+
+def decode_line(line: bytes) -> Dict[str, Any]:
+    return json.loads(line, parse_float=Decimal, parse_int=Decimal, object_hook=_json_object)
+
+def partition_of(timestamp) -> str:
+    return datetime.fromtimestamp(int(timestamp), timezone.utc).strftime('%Y-%m-%d')
+
+def day_start(day: str) -> int:
+    return int(datetime.strptime(day, '%Y-%m-%d').replace(tzinfo=timezone.utc).timestamp())
+
+class SegmentWriter:
+    """Write one day's items into a gzip segment and its block index"""
+
+    def __init__(self, root: str, block_bytes: int = BLOCK_BYTES):
+        self.root = root
+        self.block_bytes = block_bytes
+
+    def write(self, day: str, items: List[Dict[str, Any]]) -> Dict[str, Any]:
+        items = sorted(items, key=lambda i: (i['sessionId'], int(i['timestamp'])))
+        directory = os.path.join(self.root, f'date={day}')
+        os.makedirs(directory, exist_ok=True)
+
+        blocks = []
+        chunks = []
+        offset = 0
+        buffer: List[bytes] = []
+        block_items: List[Dict[str, Any]] = []
+
+        def flush():
+            nonlocal offset
+            data = gzip.compress(b''.join(buffer), 6)
+            chunks.append(data)
+            timestamps = [int(i['timestamp']) for i in block_items]
+            blocks.append({
+                'offset': offset,
+                'length': len(data),
+                'count': len(block_items),
+                'firstSession': block_items[0]['sessionId'],
+                'lastSession': block_items[-1]['sessionId'],
+                'minTs': min(timestamps),
+                'maxTs': max(timestamps)
+            })
+            offset += len(data)
+            buffer.clear()
+            block_items.clear()
+
+        size = 0
+        for item in items:
+            line = encode_line(item)
+            buffer.append(line)
+            block_items.append(item)
+            size += len(line)
+            if size >= self.block_bytes:
+                flush()
+                size = 0
+        if buffer:
+            flush()
+
+        digest = hashlib.sha1(b''.join(chunks)).hexdigest()[:10]
+        name = f"{blocks[0]['minTs'] if blocks else 0}-{digest}"
+        index = {
+            'format': SEGMENT_FORMAT,
+            'segment': f'{name}.ndjson.gz',
+            'count': len(items),
+            'minTs': min((b['minTs'] for b in blocks), default=None),
+            'maxTs': max((b['maxTs'] for b in blocks), default=None),
+            'blocks': blocks
+        }
+
+        # Data first, index last: a segment without an index is never read
+        self._write_atomic(os.path.join(directory, index['segment']), b''.join(chunks))
+        self._write_atomic(os.path.join(directory, f'{name}.idx.json'),
+                           json.dumps(index, separators=(',', ':')).encode('utf-8'))
+        return index
+
+    @staticmethod
+    def _write_atomic(path: str, data: bytes):
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+class Segment:
+    def __init__(self, directory: str, index: Dict[str, Any]):
+        self.path = os.path.join(directory, index['segment'])
+        self.index = index
+        self.blocks = index['blocks']
+        self._first_sessions = [b['firstSession'] for b in self.blocks]
+
+    def overlaps(self, start: int, end: int) -> bool:
+        return self.index['count'] > 0 and self.index['minTs'] <= end and self.index['maxTs'] >= start
+
+    def _blocks_for(self, start: int, end: int, session_id: Optional[str]):
+        if session_id is None:
+            candidates = self.blocks
+        else:
+            # Blocks are sorted by session, and a session may span several
+            first = max(bisect.bisect_left(self._first_sessions, session_id) - 1, 0)
+            last = bisect.bisect_right(self._first_sessions, session_id)
+            candidates = [b for b in self.blocks[first:last] if b['lastSession'] >= session_id]
+        return [b for b in candidates if b['minTs'] <= end and b['maxTs'] >= start]
+
+    def items(self, start: int, end: int, session_id: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        blocks = self._blocks_for(start, end, session_id)
+        if not blocks:
+            return
+        with open(self.path, 'rb') as f:
+            for block in blocks:
+                f.seek(block['offset'])
+                for line in gzip.decompress(f.read(block['length'])).splitlines():
+                    item = decode_line(line)
+                    if session_id is not None and item['sessionId'] != session_id:
+                        continue
+                    if start <= item['timestamp'] <= end:
+                        yield item
+
+class HistoryArchive:
+    """Read side of the local segment store"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def watermark(self) -> int:
+        """Everything older than this epoch has been archived"""
+        path = os.path.join(self.root, WATERMARK_FILE)
+        if not os.path.exists(path):
+            return 0
+        with open(path) as f:
+            return int(json.load(f)['archivedBefore'])
+
+    def set_watermark(self, archived_before: int):
+        os.makedirs(self.root, exist_ok=True)
+        SegmentWriter._write_atomic(os.path.join(self.root, WATERMARK_FILE),
+                                    json.dumps({'archivedBefore': archived_before}).encode('utf-8'))
+
+    def partitions(self, start: int, end: int) -> List[str]:
+        if not os.path.isdir(self.root):
+            return []
+        first, last = partition_of(max(start, 0)), partition_of(end)
+        days = sorted(name[5:] for name in os.listdir(self.root) if name.startswith('date='))
+        return [day for day in days if first <= day <= last]
+
+    def segments(self, day: str) -> List[Segment]:
+        directory = os.path.join(self.root, f'date={day}')
+        segments = []
+        for name in sorted(os.listdir(directory)):
+            if name.endswith('.idx.json'):
+                with open(os.path.join(directory, name)) as f:
+                    segments.append(Segment(directory, json.load(f)))
+        return segments
+
+    def items(self, start: int, end: int, session_id: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Archived items in [start, end], each once even if a day was archived twice"""
+        for day in self.partitions(start, end):
+            seen = set()
+            for segment in self.segments(day):
+                if not segment.overlaps(start, end):
+                    continue
+                for item in segment.items(start, end, session_id):
+                    key = (item['sessionId'], item['timestamp'])
+                    if key not in seen:
+                        seen.add(key)
+                        yield item
+
+class HistoryReader:
+    """One view over the hot chat-history table and the archived segments.
+
+    Rows older than the archive watermark are read from segments, newer
+    rows from the table, so a row that is archived but not yet deleted from
+    the table is still returned once.
+    """
+
+    def __init__(self, chat_table, archive: Optional[HistoryArchive] = None,
+                 bucket_index: Optional[str] = None, query_workers: int = 8):
+        self.chat_table = chat_table
+        self.archive = archive
+        self.bucket_index = bucket_index
+        self.query_workers = query_workers
+
+    def _split(self, start: int, end: int) -> Tuple[int, int]:
+        watermark = self.archive.watermark() if self.archive else 0
+        return watermark, max(start, watermark)
+
+    def items(self, start: int, end: int, session_id: Optional[str] = None,
+              projection: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+        """Raw chat-history items with start <= timestamp <= end"""
+        watermark, hot_start = self._split(start, end)
+        if self.archive and start < watermark:
+            yield from self.archive.items(start, min(end, watermark - 1), session_id)
+        if hot_start <= end:
+            yield from self._hot_items(hot_start, end, session_id, projection)
+
+    def records(self, start: int, end: int, session_id: Optional[str] = None,
+                faq_resolver=None) -> Iterator[Dict[str, Any]]:
+        """Items decoded to the legacy record shape"""
+        for item in self.items(start, end, session_id):
+            yield decode_record(item, faq_resolver)
+
+    def for_each_page(self, start: int, end: int, page_fn: Callable[[List[Dict[str, Any]]], None],
+                      projection: Optional[List[str]] = None, segments: int = 1) -> Dict[str, int]:
+        """Hand every item in [start, end] to page_fn a page at a time.
+
+        With a bucket_index the table is read by parallel queries, one per
+        hour bucket in range, so the cost follows the window rather than the
+        table size; otherwise by a parallel segmented scan. Either way page_fn
+        is called from several threads. Archived items are passed in the
+        calling thread, in pages of ARCHIVE_PAGE_ITEMS.
+        """
+        watermark, hot_start = self._split(start, end)
+        stats = {'pages': 0, 'scanned': 0, 'count': 0}
+        if self.archive and start < watermark:
+            page: List[Dict[str, Any]] = []
+            for item in self.archive.items(start, min(end, watermark - 1)):
+                page.append(item)
+                if len(page) >= ARCHIVE_PAGE_ITEMS:
+                    page_fn(page)
+                    stats['pages'] += 1
+                    stats['count'] += len(page)
+                    page = []
+            if page:
+                page_fn(page)
+                stats['pages'] += 1
+                stats['count'] += len(page)
+        if hot_start <= end:
+            if self.bucket_index:
+                hot = parallel_query(self.chat_table, page_fn,
+                                     self._bucket_queries(hot_start, end, projection),
+                                     self.query_workers)
+            else:
+                hot = parallel_scan(self.chat_table, page_fn, segments,
+                                    **self._hot_kwargs(hot_start, end, None, projection))
+            for key in stats:
+                stats[key] += hot[key]
+        return stats
+
+    def _bucket_queries(self, start: int, end: int,
+                        projection: Optional[List[str]]) -> List[Dict[str, Any]]:
+        queries = []
+        hour = start - start % 3600
+        while hour <= end:
+            kwargs = self._hot_kwargs(max(start, hour), min(end, hour + 3599), None, projection,
+                                      bucket=hour_bucket(hour))
+            kwargs['IndexName'] = self.bucket_index
+            queries.append(kwargs)
+            hour += 3600
+        return queries
+
+    @staticmethod
+    def _hot_kwargs(start: int, end: int, session_id: Optional[str],
+                    projection: Optional[List[str]], bucket: Optional[str] = None) -> Dict[str, Any]:
+        names = {'#ts': 'timestamp'}
+        kwargs: Dict[str, Any] = {}
+        if projection:
+            placeholders: Dict[str, str] = {}
+            paths = []
+            for path in projection:
+                parts = []
+                for part in path.split('.'):
+                    if part not in placeholders:
+                        placeholders[part] = f'#p{len(placeholders)}'
+                        names[placeholders[part]] = part
+                    parts.append(placeholders[part])
+                paths.append('.'.join(parts))
+            kwargs['ProjectionExpression'] = ', '.join(paths)
+        if bucket is not None:
+            names['#hb'] = HOUR_BUCKET_ATTRIBUTE
+            kwargs.update(
+                KeyConditionExpression='#hb = :hb AND #ts BETWEEN :start AND :end',
+                ExpressionAttributeValues={':hb': bucket, ':start': start, ':end': end}
+            )
+        elif session_id is not None:
+            names['#sid'] = 'sessionId'
+            kwargs.update(
+                KeyConditionExpression='#sid = :sid AND #ts BETWEEN :start AND :end',
+                ExpressionAttributeValues={':sid': session_id, ':start': start, ':end': end}
+            )
+        else:
+            kwargs.update(
+                FilterExpression='#ts BETWEEN :start AND :end',
+                ExpressionAttributeValues={':start': start, ':end': end}
+            )
+        kwargs['ExpressionAttributeNames'] = names
+        return kwargs
+
+    def _hot_items(self, start: int, end: int, session_id: Optional[str],
+                   projection: Optional[List[str]]) -> Iterator[Dict[str, Any]]:
+        kwargs = self._hot_kwargs(start, end, session_id, projection)
+        operation = self.chat_table.query if session_id is not None else self.chat_table.scan
+        while True:
+            response = operation(**kwargs)
+            yield from response['Items']
+            if 'LastEvaluatedKey' not in response:
+                break
+            kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def archive_cutoff(days: int, now: Optional[datetime] = None) -> int:
+    """Start of the UTC day ``days`` days ago, so only whole days are archived"""
+    now = now or datetime.now(timezone.utc)
+    day = (now - timedelta(days=days)).strftime('%Y-%m-%d')
+    return day_start(day)
+
+def archive_history(chat_table, archive: HistoryArchive, days: int, delete: bool = True,
+                    now: Optional[datetime] = None, spill_dir: Optional[str] = None) -> Dict[str, Any]:
+    """Move chat-history rows older than ``days`` days from the table into segments.
+
+    The scan spills rows to one file per day under spill_dir (the system
+    temp directory, /tmp on Lambda) rather than holding them in memory.
+    Days are then archived oldest first: each is written as a segment, its
+    rows deleted and the watermark moved past it before the next one is
+    read, so a run that times out keeps the days it finished and a repeat
+    picks up the rest.
+    """
+    cutoff = archive_cutoff(days, now)
+    kwargs: Dict[str, Any] = {
+        'FilterExpression': '#ts < :cutoff',
+        'ExpressionAttributeNames': {'#ts': 'timestamp'},
+        'ExpressionAttributeValues': {':cutoff': cutoff}
+    }
+    writer = SegmentWriter(archive.root)
+    stats = {'cutoff': cutoff, 'days': 0, 'items': 0, 'deleted': 0, 'bytes': 0}
+    with tempfile.TemporaryDirectory(prefix='history-archive-', dir=spill_dir) as spill:
+        counts: Dict[str, int] = {}
+        while True:
+            response = chat_table.scan(**kwargs)
+            page: Dict[str, List[bytes]] = {}
+            for item in response['Items']:
+                page.setdefault(partition_of(item['timestamp']), []).append(encode_line(item))
+            for day, lines in page.items():
+                with open(os.path.join(spill, f'{day}.ndjson'), 'ab') as f:
+                    f.writelines(lines)
+                counts[day] = counts.get(day, 0) + len(lines)
+            if 'LastEvaluatedKey' not in response:
+                break
+            kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+        for day in sorted(counts):
+            path = os.path.join(spill, f'{day}.ndjson')
+            with open(path, 'rb') as f:
+                items = [decode_line(line) for line in f]
+            os.remove(path)
+            index = writer.write(day, items)
+            stats['days'] += 1
+            stats['items'] += len(items)
+            stats['bytes'] += sum(b['length'] for b in index['blocks'])
+            logger.info(f"Archived {len(items)} items for {day} into {index['segment']}")
+            if delete:
+                with chat_table.batch_writer() as batch:
+                    for item in items:
+                        batch.delete_item(Key={'sessionId': item['sessionId'], 'timestamp': item['timestamp']})
+                        stats['deleted'] += 1
+            archive.set_watermark(max(min(day_start(day) + 86400, cutoff), archive.watermark()))
+
+    if cutoff > archive.watermark():
+        archive.set_watermark(cutoff)
+    return stats
@@ -0,0 +1,166 @@
+import zlib
+from datetime import datetime, timezone
+from typing import Dict, Any, Callable, Optional
+
+# Chat-history record formats
+#
+# Legacy (v1), as first written by the handlers:
+#   sessionId, timestamp, userMessage, botResponse,
+#   metadata: {detectedLanguage, userLanguage, sentiment: {sentiment, confidence},
+#              usedFAQ, usedBedrock, route, handler, model, region, timestamp}
+#
+# Compact (v2):
+#   sessionId, timestamp  table keys, unchanged
+#   v    format version (2)
+#   u    user message         | uz  zlib-compressed user message (Binary)
+#   b    bot response         | bz  zlib-compressed bot response (Binary)
+#                             | f   FAQ reference "category#question" when the
+#                                   reply is the FAQ answer verbatim
+#   l    detected language
+#   ul   user language, omitted when equal to l
+#   s    sentiment code (P/N/U/M)
+#   sc   score of the detected sentiment
+#   r    route (faq/llm/smart)
+#   h    handler name
+#
+# Both formats also carry hb, the UTC hour "yyyy-mm-dd-hh" of the timestamp,
+# which is the partition key of the hour-bucket GSI used by analytics.
+#
+# usedFAQ/usedBedrock are derived from the route, model/region from the
+# handler, and the ISO timestamp from the numeric sort key.
+
+COMPACT_VERSION = 2
+COMPRESS_THRESHOLD = 512
+
+SENTIMENT_CODES = {'POSITIVE': 'P', 'NEGATIVE': 'N', 'NEUTRAL': 'U', 'MIXED': 'M'}
+SENTIMENT_NAMES = {code: name for name, code in SENTIMENT_CODES.items()}
+
+HANDLER_METADATA = {
+    'llama': {'model': 'meta.llama3-8b-instruct-v1:0', 'region': 'us-east-1'},
+}
+
+HOUR_BUCKET_ATTRIBUTE = 'hb'
+
+def hour_bucket(timestamp) -> str:
+    return datetime.fromtimestamp(int(timestamp), timezone.utc).strftime('%Y-%m-%d-%H')
+
+def faq_reference(faq_item: Dict[str, Any]) -> str:
+    return f"{faq_item['category']}#{faq_item['question']}"
+
+def _binary(value) -> bytes:
+    # boto3 returns Binary wrappers from the resource API and stream images
+    return bytes(getattr(value, 'value', value))
+
+def _put_text(record: Dict[str, Any], key: str, text: str, threshold: int):
+    data = text.encode('utf-8')
+    if threshold and len(data) > threshold:
+        compressed = zlib.compress(data, 6)
+        if len(compressed) < len(data):
+            record[key + 'z'] = compressed
+            return
+    record[key] = text
+
+def _get_text(item: Dict[str, Any], key: str) -> Optional[str]:
+    if key in item:
+        return item[key]
+    if key + 'z' in item:
+        return zlib.decompress(_binary(item[key + 'z'])).decode('utf-8')
+    return None
+
+def encode_record(session_id: str, timestamp: int, user_message: str, bot_response: str,
+                  metadata: Dict[str, Any], faq_item: Optional[Dict[str, Any]] = None,
+                  compress_threshold: int = COMPRESS_THRESHOLD) -> Dict[str, Any]:
+    """Build a compact (v2) chat-history item from what the handlers produce"""
+    sentiment = metadata.get('sentiment', {})
+    label = sentiment.get('sentiment', 'NEUTRAL')
+    record: Dict[str, Any] = {
+        'sessionId': session_id,
+        'timestamp': timestamp,
+        HOUR_BUCKET_ATTRIBUTE: hour_bucket(timestamp),
+        'v': COMPACT_VERSION,
+        'l': metadata.get('detectedLanguage', 'en'),
+        's': SENTIMENT_CODES.get(label, label),
+    }
+    score = sentiment.get('confidence', {}).get(label.capitalize())
+    if score is not None:
+        record['sc'] = round(score, 4)
+    if metadata.get('userLanguage', record['l']) != record['l']:
+        record['ul'] = metadata['userLanguage']
+    if metadata.get('route'):
+        record['r'] = metadata['route']
+    if metadata.get('handler'):
+        record['h'] = metadata['handler']
+
+    _put_text(record, 'u', user_message, compress_threshold)
+    if faq_item is not None and faq_item.get('answer') == bot_response:
+        record['f'] = faq_reference(faq_item)
+    else:
+        _put_text(record, 'b', bot_response, compress_threshold)
+    return record
+
+def is_compact(item: Dict[str, Any]) -> bool:
+    return 'v' in item
+
+def decode_metadata(item: Dict[str, Any]) -> Dict[str, Any]:
+    """The legacy-shaped metadata map of either record format, without touching the texts"""
+    if not is_compact(item):
+        return item.get('metadata', {})
+
+    label = SENTIMENT_NAMES.get(item.get('s'), item.get('s', 'NEUTRAL'))
+    route = item.get('r')
+    used_faq = route == 'faq' if route else 'f' in item
+    metadata = {
+        'detectedLanguage': item.get('l', 'en'),
+        'userLanguage': item.get('ul', item.get('l', 'en')),
+        'sentiment': {
+            'sentiment': label,
+            'confidence': {label.capitalize(): item['sc']} if 'sc' in item else {}
+        },
+        'usedFAQ': used_faq,
+        'usedBedrock': route == 'llm',
+        'timestamp': datetime.fromtimestamp(int(item['timestamp'])).isoformat()
+    }
+    if route:
+        metadata['route'] = route
+    if item.get('h'):
+        metadata['handler'] = item['h']
+        metadata.update(HANDLER_METADATA.get(item['h'], {}))
+    return metadata
+
+def decode_record(item: Dict[str, Any],
+                  faq_resolver: Optional[Callable[[str], Optional[str]]] = None) -> Dict[str, Any]:
+    """Return any chat-history item in the legacy shape.
+
+    faq_resolver maps an FAQ reference to its answer text; without one, or
+    when the FAQ has since been removed, botResponse is None and the
+    reference is kept under faqRef.
+    """
+    if not is_compact(item):
+        return item
+
+    record = {
+        'sessionId': item['sessionId'],
+        'timestamp': item['timestamp'],
+        'userMessage': _get_text(item, 'u'),
+        'botResponse': _get_text(item, 'b'),
+        'metadata': decode_metadata(item),
+    }
+    if 'f' in item:
+        record['faqRef'] = item['f']
+        if faq_resolver is not None:
+            record['botResponse'] = faq_resolver(item['f'])
+    return record
+
+class FAQResolver:
+    """Resolve FAQ references with one GetItem per distinct reference"""
+
+    def __init__(self, faq_table):
+        self.faq_table = faq_table
+        self._answers: Dict[str, Optional[str]] = {}
+
+    def __call__(self, reference: str) -> Optional[str]:
+        if reference not in self._answers:
+            category, _, question = reference.partition('#')
+            response = self.faq_table.get_item(Key={'category': category, 'question': question})
+            self._answers[reference] = response.get('Item', {}).get('answer')
+        return self._answers[reference]
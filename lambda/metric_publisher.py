@@ -0,0 +1,148 @@
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+logger = logging.getLogger()
+
+# PutMetricData accepts up to 1000 datums and 1 MB per request, one namespace
+# per request. EMF allows 100 metrics per log event, and all metrics in an
+# event share its dimension values.
+MAX_DATUMS_PER_REQUEST = 1000
+MAX_REQUEST_BYTES = 1000 * 1000
+MAX_EMF_METRICS = 100
+
+_Key = Tuple[str, str, Tuple[Tuple[str, str], ...], str]
+
+class MetricPublisher:
+    """Accumulate metric datums and publish them in as few calls as possible.
+
+    count() sums into one datum per metric and dimension set; observe()
+    keeps samples, published as a statistic set (SampleCount/Sum/Min/Max)
+    when there is more than one. mode='api' flushes with batched
+    put_metric_data, one request per namespace per MAX_DATUMS_PER_REQUEST.
+    mode='emf' writes CloudWatch Embedded Metric Format lines to the log
+    instead and makes no API calls. Safe to share between threads: flush()
+    swaps the buffers out under the lock and publishes outside it.
+    """
+
+    def __init__(self, cloudwatch=None, mode: str = 'api', default_dimensions: Optional[Dict[str, str]] = None,
+                 emit: Callable[[str], None] = print):
+        if mode not in ('api', 'emf', 'off'):
+            raise ValueError(f"Unknown metrics mode {mode!r}")
+        self.cloudwatch = cloudwatch
+        self.mode = mode
+        self.default_dimensions = default_dimensions or {}
+        self.emit = emit
+        self._counts: Dict[_Key, float] = {}
+        self._samples: Dict[_Key, List[float]] = {}
+        self._lock = threading.Lock()
+        self.requests = 0
+
+    def _key(self, namespace: str, name: str, dimensions: Optional[Dict[str, str]], unit: str) -> _Key:
+        merged = dict(self.default_dimensions)
+        merged.update(dimensions or {})
+        return namespace, name, tuple(sorted((k, str(v)) for k, v in merged.items())), unit
+
+    def count(self, namespace: str, name: str, value: float = 1, unit: str = 'Count',
+              dimensions: Optional[Dict[str, str]] = None):
+        key = self._key(namespace, name, dimensions, unit)
+        with self._lock:
+            self._counts[key] = self._counts.get(key, 0) + value
+
+    def observe(self, namespace: str, name: str, value: float, unit: str = 'Milliseconds',
+                dimensions: Optional[Dict[str, str]] = None):
+        key = self._key(namespace, name, dimensions, unit)
+        with self._lock:
+            self._samples.setdefault(key, []).append(value)
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._counts) + len(self._samples)
+
+    def _datums(self, counts: Dict[_Key, float], samples: Dict[_Key, List[float]]) -> Dict[str, List[Dict[str, Any]]]:
+        timestamp = datetime.now(timezone.utc)
+        by_namespace: Dict[str, List[Dict[str, Any]]] = {}
+        for (namespace, name, dimensions, unit), value in counts.items():
+            datum = {'MetricName': name, 'Value': value, 'Unit': unit, 'Timestamp': timestamp}
+            if dimensions:
+                datum['Dimensions'] = [{'Name': k, 'Value': v} for k, v in dimensions]
+            by_namespace.setdefault(namespace, []).append(datum)
+        for (namespace, name, dimensions, unit), values in samples.items():
+            datum = {'MetricName': name, 'Unit': unit, 'Timestamp': timestamp}
+            if len(values) == 1:
+                datum['Value'] = values[0]
+            else:
+                datum['StatisticValues'] = {
+                    'SampleCount': len(values),
+                    'Sum': sum(values),
+                    'Minimum': min(values),
+                    'Maximum': max(values)
+                }
+            if dimensions:
+                datum['Dimensions'] = [{'Name': k, 'Value': v} for k, v in dimensions]
+            by_namespace.setdefault(namespace, []).append(datum)
+        return by_namespace
+
+    def flush(self) -> int:
+        """Publish everything accumulated; returns the number of API requests made"""
+        with self._lock:
+            counts, samples, self._counts, self._samples = self._counts, self._samples, {}, {}
+        if self.mode == 'off' or not (counts or samples):
+            return 0
+        if self.mode == 'emf':
+            self._flush_emf(counts, samples)
+            return 0
+
+        requests = 0
+        for namespace, datums in self._datums(counts, samples).items():
+            for batch in _batches(datums):
+                try:
+                    self.cloudwatch.put_metric_data(Namespace=namespace, MetricData=batch)
+                    requests += 1
+                except Exception as e:
+                    logger.error(f"Failed to publish {len(batch)} metrics to {namespace}: {e}")
+        with self._lock:
+            self.requests += requests
+        return requests
+
+    def _flush_emf(self, counts: Dict[_Key, float], samples: Dict[_Key, List[float]]):
+        groups: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], List[Tuple[str, str, Any]]] = {}
+        for (namespace, name, dimensions, unit), value in counts.items():
+            groups.setdefault((namespace, dimensions), []).append((name, unit, value))
+        for (namespace, name, dimensions, unit), values in samples.items():
+            groups.setdefault((namespace, dimensions), []).append((name, unit, values if len(values) > 1 else values[0]))
+
+        timestamp = int(time.time() * 1000)
+        for (namespace, dimensions), metrics in groups.items():
+            for start in range(0, len(metrics), MAX_EMF_METRICS):
+                chunk = metrics[start:start + MAX_EMF_METRICS]
+                event: Dict[str, Any] = {
+                    '_aws': {
+                        'Timestamp': timestamp,
+                        'CloudWatchMetrics': [{
+                            'Namespace': namespace,
+                            'Dimensions': [[k for k, _ in dimensions]],
+                            'Metrics': [{'Name': name, 'Unit': unit} for name, unit, _ in chunk]
+                        }]
+                    }
+                }
+                event.update(dict(dimensions))
+                event.update({name: value for name, _, value in chunk})
+                self.emit(json.dumps(event, default=str))
+
+def _batches(datums: List[Dict[str, Any]]):
+    """Split datums into requests within the datum-count and payload-size limits"""
+    batch: List[Dict[str, Any]] = []
+    size = 0
+    for datum in datums:
+        datum_size = len(json.dumps(datum, default=str))
+        if batch and (len(batch) >= MAX_DATUMS_PER_REQUEST or size + datum_size > MAX_REQUEST_BYTES):
+            yield batch
+            batch, size = [], 0
+        batch.append(datum)
+        size += datum_size
+    if batch:
+        yield batch
@@ -0,0 +1,75 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, List, Optional
+
+def scan_segment(table, segment: int, total_segments: int,
+                 page_fn: Callable[[List[Dict[str, Any]]], None], **scan_kwargs) -> Dict[str, int]:
+    """Scan one segment to the end, handing each page to page_fn as it arrives"""
+    kwargs = dict(scan_kwargs)
+    if total_segments > 1:
+        kwargs.update(Segment=segment, TotalSegments=total_segments)
+    stats = {'pages': 0, 'scanned': 0, 'count': 0}
+    while True:
+        response = table.scan(**kwargs)
+        page_fn(response.get('Items', []))
+        stats['pages'] += 1
+        stats['scanned'] += response.get('ScannedCount', 0)
+        stats['count'] += response.get('Count', 0)
+        if 'LastEvaluatedKey' not in response:
+            return stats
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def parallel_scan(table, page_fn: Callable[[List[Dict[str, Any]]], None], total_segments: int = 4,
+                  max_workers: Optional[int] = None, **scan_kwargs) -> Dict[str, int]:
+    """Scan a whole table as total_segments parallel segments, following pagination.
+
+    page_fn is called from the worker threads, once per page, so it must be
+    thread-safe; folding each page locally and merging under a lock keeps
+    the lock off the per-item path. Returns page/scanned/count totals. If a
+    segment fails, its exception is raised once the other segments finish.
+    """
+    if total_segments <= 1:
+        return scan_segment(table, 0, 1, page_fn, **scan_kwargs)
+
+    with ThreadPoolExecutor(max_workers=max_workers or total_segments) as executor:
+        futures = [
+            executor.submit(scan_segment, table, segment, total_segments, page_fn, **scan_kwargs)
+            for segment in range(total_segments)
+        ]
+        results = [future.result() for future in futures]
+
+    totals = {'pages': 0, 'scanned': 0, 'count': 0}
+    for result in results:
+        for key in totals:
+            totals[key] += result[key]
+    return totals
+
+def query_all(table, page_fn: Callable[[List[Dict[str, Any]]], None], **query_kwargs) -> Dict[str, int]:
+    """Run one query to the last page, handing each page to page_fn"""
+    kwargs = dict(query_kwargs)
+    stats = {'pages': 0, 'scanned': 0, 'count': 0}
+    while True:
+        response = table.query(**kwargs)
+        page_fn(response.get('Items', []))
+        stats['pages'] += 1
+        stats['scanned'] += response.get('ScannedCount', 0)
+        stats['count'] += response.get('Count', 0)
+        if 'LastEvaluatedKey' not in response:
+            return stats
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def parallel_query(table, page_fn: Callable[[List[Dict[str, Any]]], None],
+                   queries: List[Dict[str, Any]], max_workers: int = 8) -> Dict[str, int]:
+    """Run independent queries (e.g. one per index partition) on a thread pool.
+
+    Same page_fn contract and totals as parallel_scan.
+    """
+    totals = {'pages': 0, 'scanned': 0, 'count': 0}
+    if not queries:
+        return totals
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(queries))) as executor:
+        futures = [executor.submit(query_all, table, page_fn, **kwargs) for kwargs in queries]
+        results = [future.result() for future in futures]
+    for result in results:
+        for key in totals:
+            totals[key] += result[key]
+    return totals
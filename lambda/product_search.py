@@ -0,0 +1,354 @@
+import json
+import logging
+import os
+import re
+from bisect import bisect_left, bisect_right
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger()
+
+# Facets in the order they are shown as follow-up suggestions
+FACETS = ['category', 'subcategory', 'brand', 'size', 'color', 'material']
+# Products.json column -> facet
+STYLECO_COLUMNS = {
+    'Category': 'category', 'Subcategory': 'subcategory', 'Brand': 'brand',
+    'Size': 'size', 'Color': 'color', 'Material': 'material'
+}
+MAX_SUGGESTED_VALUES = 4
+
+# Extra ways customers name facet values, keyed by the normalized value
+SYNONYMS = {
+    'category': {'kids': ['kid', 'kids', 'child', 'children', 'childrens', 'boys', 'girls'],
+                 'men': ['men', 'mens', 'man', 'male'],
+                 'women': ['women', 'womens', 'woman', 'ladies', 'female']},
+    'size': {'xs': ['xs', 'extra small'], 's': ['small'], 'm': ['medium'], 'l': ['large'],
+             'xl': ['xl', 'extra large'], 'xxl': ['xxl', '2xl']},
+    'color': {'grey': ['grey', 'gray']}
+}
+# Single-letter sizes only count right after the word "size"
+_SIZE_AFTER_WORD_RE = re.compile(r"\bsize\s+(xxl|xl|xs|s|m|l)\b")
+_PRICE_BETWEEN_RE = re.compile(r"\bbetween\s+\$?(\d+(?:\.\d+)?)\s+and\s+\$?(\d+(?:\.\d+)?)|\$(\d+(?:\.\d+)?)\s*(?:-|to)\s*\$?(\d+(?:\.\d+)?)")
+_PRICE_MAX_RE = re.compile(r"\b(?:under|below|less than|cheaper than|up to|max(?:imum)?|no more than)\s+\$?(\d+(?:\.\d+)?)")
+_PRICE_MIN_RE = re.compile(r"\b(?:over|above|more than|at least|from)\s+\$?(\d+(?:\.\d+)?)")
+# Phrases that ask for products; bare "any" only counts at the start ("any black shirts?")
+_SEARCH_INTENT_RE = re.compile(r"\b(?:show me|looking for|look for|do you (?:have|sell|carry|stock)|got any|search(?:ing)? for|"
+                               r"find me|recommend|suggest|i (?:want|need) (?:a|an|some)|shopping for)\b|^\s*(?:any|some)\b")
+# Words a product search may contain besides filters and prices; any other
+# word ("size chart", "gift wrapping", "receipt") means the message asks
+# for something else and is left to the FAQ or the generator
+_FILLER_WORDS = {
+    'a', 'an', 'the', 'i', 'im', 'me', 'my', 'we', 'you', 'your', 'do', 'does', 'is', 'are', 'there', 'have', 'has',
+    'any', 'some', 'got', 'show', 'find', 'search', 'searching', 'look', 'looking', 'for', 'want', 'need', 'like',
+    'sell', 'carry', 'stock', 'recommend', 'suggest', 'shopping', 'please', 'in', 'on', 'of', 'with', 'and', 'or',
+    'item', 'items', 'product', 'products', 'something', 'anything', 'what', 'which', 'size', 'color', 'colour'
+}
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+def _normalize(text: str) -> str:
+    return re.sub(r"['’]", '', text.lower())
+
+def _bit_count(bits: int) -> int:
+    return bin(bits).count('1')
+
+def _rows(bits: int) -> List[int]:
+    rows = []
+    while bits:
+        low = bits & -bits
+        rows.append(low.bit_length() - 1)
+        bits ^= low
+    return rows
+
+def from_styleco(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Search record for a Products.json row"""
+    record = {'id': row['ProductID'], 'name': row.get('ProductName') or row['ProductID'],
+              'price': float(row['Price']) if row.get('Price') not in (None, '') else None, 'tags': []}
+    for column, facet in STYLECO_COLUMNS.items():
+        if row.get(column):
+            record[facet] = row[column]
+    return record
+
+def from_catalog(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Search record for a prod-shop-catalog item (scripts/seed_products.py shape)"""
+    record = {'id': item['productId'], 'name': item.get('name') or item['productId'],
+              'price': float(item['price']) if item.get('price') is not None else None,
+              'tags': list(item.get('tags', []))}
+    for facet in ('category', 'brand'):
+        if item.get(facet):
+            record[facet] = item[facet]
+    return record
+
+class Query:
+    """Facet filters pulled out of a message: values are ORed within a facet,
+    facets, tags and the price range are ANDed"""
+
+    def __init__(self, facets: Optional[Dict[str, List[str]]] = None, tags: Optional[List[str]] = None,
+                 min_price: Optional[float] = None, max_price: Optional[float] = None):
+        self.facets = facets or {}
+        self.tags = tags or []
+        self.min_price = min_price
+        self.max_price = max_price
+        # (start, end) of the normalized message text the filters came from
+        self.spans: List[Tuple[int, int]] = []
+
+    def __bool__(self):
+        return bool(self.facets or self.tags or self.min_price is not None or self.max_price is not None)
+
+    def constraints(self) -> int:
+        return len(self.facets) + len(self.tags) + (self.min_price is not None or self.max_price is not None)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'facets': self.facets, 'tags': self.tags, 'minPrice': self.min_price, 'maxPrice': self.max_price}
+
+class SearchResult:
+    def __init__(self, product_ids: List[str], total: int, facet_counts: Dict[str, List[Tuple[str, int]]]):
+        self.product_ids = product_ids
+        self.total = total
+        self.facet_counts = facet_counts
+
+class ProductSearch:
+    """Attribute search over the product catalog with one bitmap per facet value.
+
+    Bit i of a bitmap is product row i, so a conjunctive filter is a few
+    integer ANDs and a facet count is a popcount. Prices are kept sorted
+    with a prefix bitmap per position: a price range is
+    prefix[hi] & ~prefix[lo], two bisects and one AND-NOT. Catalog tags are
+    indexed too, and a tag naming a facet value ("cotton", "black") also
+    counts as that value for products that lack the attribute.
+    """
+
+    def __init__(self, records: Iterable[Dict[str, Any]]):
+        self.records: List[Dict[str, Any]] = []
+        self.ids: Dict[str, int] = {}
+        for record in records:
+            if record['id'] in self.ids:
+                continue
+            self.ids[record['id']] = len(self.records)
+            self.records.append(record)
+        self.all = (1 << len(self.records)) - 1
+
+        self.labels: Dict[str, Dict[str, str]] = {facet: {} for facet in FACETS}
+        self.bitmaps: Dict[str, Dict[str, int]] = {facet: {} for facet in FACETS}
+        self.tags: Dict[str, int] = {}
+        priced = []
+        for row, record in enumerate(self.records):
+            bit = 1 << row
+            for facet in FACETS:
+                if record.get(facet):
+                    value = _normalize(record[facet])
+                    self.labels[facet].setdefault(value, record[facet])
+                    self.bitmaps[facet][value] = self.bitmaps[facet].get(value, 0) | bit
+            for tag in record.get('tags', []):
+                tag = _normalize(tag)
+                self.tags[tag] = self.tags.get(tag, 0) | bit
+            if record.get('price') is not None:
+                priced.append((record['price'], row))
+        for facet in FACETS:
+            for value in self.bitmaps[facet]:
+                self.bitmaps[facet][value] |= self.tags.get(value, 0)
+
+        priced.sort()
+        self.prices = [price for price, _ in priced]
+        self.price_prefix = [0]
+        for _, row in priced:
+            self.price_prefix.append(self.price_prefix[-1] | (1 << row))
+        self._compile_vocabulary()
+
+    @classmethod
+    def load(cls, path: str) -> 'ProductSearch':
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f)['products'])
+
+    def _compile_vocabulary(self):
+        """One regex per phrase that names a facet value or tag"""
+        phrases: List[Tuple[str, str, str]] = []
+        for facet in FACETS:
+            synonyms = SYNONYMS.get(facet, {})
+            for value in self.bitmaps[facet]:
+                if facet == 'size' and len(value) == 1:
+                    names = synonyms.get(value, [])
+                else:
+                    names = synonyms.get(value, [value])
+                for name in names:
+                    phrases.append((name, facet, value))
+        for tag in self.tags:
+            phrases.append((tag, 'tags', tag))
+        self._phrases = []
+        for name, facet, value in phrases:
+            # Accept singular and plural forms of words (shirt/shirts, dress/dresses)
+            forms = {name}
+            if name.endswith(('sses', 'ches', 'shes', 'xes')):
+                forms.add(name[:-2])
+            elif name.endswith('s') and not name.endswith('ss'):
+                forms.add(name[:-1])
+            elif name[-1:].isalpha() and len(name) > 2:
+                forms |= {name + 's', name + 'es'}
+            alternatives = '|'.join(re.escape(form) for form in sorted(forms, key=len, reverse=True))
+            pattern = re.compile(rf"(?<![\w&-])(?:{alternatives})(?![\w&-])")
+            self._phrases.append((pattern, facet, value))
+
+    def parse(self, message: str) -> Query:
+        """Facet values, tags and a price range mentioned in a chat message.
+
+        Overlapping mentions resolve to the longest one, so "t-shirt"
+        is a tag rather than the Shirts subcategory.
+        """
+        text = _normalize(message)
+        matches = []
+        for pattern, facet, value in self._phrases:
+            for match in pattern.finditer(text):
+                matches.append((match.start(), match.end(), facet, value))
+        for match in _SIZE_AFTER_WORD_RE.finditer(text):
+            if match.group(1) in self.bitmaps['size']:
+                matches.append((match.start(), match.end(), 'size', match.group(1)))
+        taken = []
+        query = Query()
+        for start, end, facet, value in sorted(matches, key=lambda m: (-(m[1] - m[0]), m[0])):
+            if any(start < other_end and other_start < end for other_start, other_end in taken):
+                continue
+            taken.append((start, end))
+            values = query.tags if facet == 'tags' else query.facets.setdefault(facet, [])
+            if value not in values:
+                values.append(value)
+
+        between = _PRICE_BETWEEN_RE.search(text)
+        if between:
+            low, high = [float(v) for v in between.groups() if v is not None]
+            query.min_price, query.max_price = min(low, high), max(low, high)
+            taken.append(between.span())
+        else:
+            most, least = _PRICE_MAX_RE.search(text), _PRICE_MIN_RE.search(text)
+            query.max_price = float(most.group(1)) if most else None
+            query.min_price = float(least.group(1)) if least else None
+            taken.extend(match.span() for match in (most, least) if match)
+        query.spans = sorted(taken)
+        return query
+
+    @staticmethod
+    def unexplained(message: str, query: Query) -> List[str]:
+        """Words of message that are neither part of a filter nor _FILLER_WORDS"""
+        text = _normalize(message)
+        for start, end in query.spans:
+            text = text[:start] + ' ' * (end - start) + text[end:]
+        return [word for word in _WORD_RE.findall(text) if word not in _FILLER_WORDS]
+
+    def price_bits(self, min_price: Optional[float] = None, max_price: Optional[float] = None) -> int:
+        low = bisect_left(self.prices, min_price) if min_price is not None else 0
+        high = bisect_right(self.prices, max_price) if max_price is not None else len(self.prices)
+        if high <= low:
+            return 0
+        return self.price_prefix[high] & ~self.price_prefix[low]
+
+    def _facet_bits(self, facet: str, values: List[str]) -> int:
+        bits = 0
+        for value in values:
+            bits |= self.bitmaps[facet].get(value, 0)
+        return bits
+
+    def matching(self, query: Query, skip: Iterable[str] = ()) -> int:
+        """Bitmap of the products matching query, ignoring the facets, tags or 'price' named in skip"""
+        bits = self.all
+        for facet, values in query.facets.items():
+            if facet not in skip:
+                bits &= self._facet_bits(facet, values)
+        for tag in query.tags:
+            if tag not in skip:
+                bits &= self.tags.get(tag, 0)
+        if 'price' not in skip and (query.min_price is not None or query.max_price is not None):
+            bits &= self.price_bits(query.min_price, query.max_price)
+        return bits
+
+    def facet_counts(self, bits: int, facets: Iterable[str] = FACETS) -> Dict[str, List[Tuple[str, int]]]:
+        """Matching products per value of each facet, most first; facets with a single value are left out"""
+        counts = {}
+        for facet in facets:
+            values = [(self.labels[facet].get(value, value), _bit_count(bits & value_bits))
+                      for value, value_bits in self.bitmaps[facet].items()]
+            values = sorted((v for v in values if v[1]), key=lambda v: (-v[1], v[0]))
+            if len(values) > 1:
+                counts[facet] = values
+        return counts
+
+    def search(self, query: Query, limit: int = 5, skip: Iterable[str] = ()) -> SearchResult:
+        """Matching products (cheapest first) and facet counts for refining the query"""
+        bits = self.matching(query, skip)
+        rows = sorted(_rows(bits), key=lambda row: (self.records[row].get('price') is None,
+                                                    self.records[row].get('price') or 0, row))
+        open_facets = [facet for facet in FACETS if facet not in query.facets]
+        return SearchResult([self.records[row]['id'] for row in rows[:limit]], len(rows),
+                            self.facet_counts(bits, open_facets))
+
+    def relax(self, query: Query) -> Tuple[List[str], int]:
+        """Constraints to drop for a query with no matches, and the matches left.
+
+        Greedy: each step drops the constraint whose removal leaves the
+        most products, until something matches.
+        """
+        remaining = list(query.facets) + list(query.tags)
+        if query.min_price is not None or query.max_price is not None:
+            remaining.append('price')
+        dropped: List[str] = []
+        while remaining:
+            count, name = max((_bit_count(self.matching(query, skip=dropped + [name])), name) for name in remaining)
+            dropped.append(name)
+            remaining.remove(name)
+            if count:
+                return dropped, count
+        return dropped, 0
+
+    def answer(self, message: str) -> Optional[str]:
+        """A product list with refinement suggestions, or None when the message is not a product search.
+
+        Every word must be a filter, a price or a filler word, so a service
+        question that names a product ("a size chart for women") is left
+        alone, and fewer than three filters need an explicit ask.
+        """
+        text = _normalize(message)
+        query = self.parse(message)
+        if not query or self.unexplained(message, query):
+            return None
+        if query.constraints() < 3 and not _SEARCH_INTENT_RE.search(text):
+            return None
+        result = self.search(query, limit=3)
+        if not result.total:
+            dropped, count = self.relax(query)
+            if not count or len(dropped) == query.constraints():
+                return "We don't carry anything matching that right now."
+            filters = ' and '.join(self._describe(query, name) for name in dropped)
+            relaxed = self.search(query, limit=3, skip=dropped)
+            items = ', '.join(self._describe_product(product_id) for product_id in relaxed.product_ids)
+            more = f" and {count - len(relaxed.product_ids)} more" if count > len(relaxed.product_ids) else ''
+            return (f"We don't have an exact match. Without the {filters} "
+                    f"{'filter' if len(dropped) == 1 else 'filters'} there {'is 1 option' if count == 1 else f'are {count} options'}: "
+                    f"{items}{more}.")
+        items = ', '.join(self._describe_product(product_id) for product_id in result.product_ids)
+        reply = f"We found {result.total} matching {'item' if result.total == 1 else 'items'}: {items}."
+        if result.total > len(result.product_ids):
+            for facet, values in result.facet_counts.items():
+                shown = ', '.join(f"{label} ({count})" for label, count in values[:MAX_SUGGESTED_VALUES])
+                reply += f" Narrow it down by {facet}: {shown}."
+                break
+        return reply
+
+    def _describe(self, query: Query, name: str) -> str:
+        if name == 'price':
+            return 'price'
+        if name == 'size':
+            return 'size ' + ' / '.join(self.labels[name].get(value, value) for value in query.facets[name])
+        if name in query.facets:
+            return ' / '.join(self.labels[name].get(value, value) for value in query.facets[name])
+        return f"'{name}'"
+
+    def _describe_product(self, product_id: str) -> str:
+        record = self.records[self.ids[product_id]]
+        price = f" (${record['price']:.2f})" if record.get('price') is not None else ''
+        return f"{record['name']}{price}"
+
+def load_search(path: Optional[str]) -> Optional[ProductSearch]:
+    """The product index at path, or None when it is not configured or cannot be read"""
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        return ProductSearch.load(path)
+    except Exception as e:
+        logger.error(f"Failed to load product index from {path}: {e}")
+        return None
@@ -0,0 +1,72 @@
+import json
+import boto3
+import logging
+import os
+from typing import Dict, Any, List, Optional, Tuple
+
+from boto3.dynamodb.types import TypeDeserializer
+
+from rollups import RollupStore, batch_id, fold
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+dynamodb = boto3.resource('dynamodb')
+
+ROLLUP_TABLE = os.environ['ROLLUP_TABLE']
+
+deserializer = TypeDeserializer()
+
+def _image(record: Dict[str, Any], name: str) -> Optional[Dict[str, Any]]:
+    image = record['dynamodb'].get(name)
+    if not image:
+        return None
+    return {k: deserializer.deserialize(v) for k, v in image.items()}
+
+def changes_from_records(records: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], int]]:
+    """(item, +1/-1) pairs for the stream records that change the counts.
+
+    Inserts count once. An overwrite of the same key replaces the old
+    item's contribution. Removes (archival, TTL) are ignored: the
+    conversation still happened.
+    """
+    changes = []
+    for record in records:
+        event_name = record.get('eventName')
+        if event_name == 'INSERT':
+            changes.append((_image(record, 'NewImage'), 1))
+        elif event_name == 'MODIFY':
+            old, new = _image(record, 'OldImage'), _image(record, 'NewImage')
+            if old:
+                changes.append((old, -1))
+            if new:
+                changes.append((new, 1))
+    return [(item, sign) for item, sign in changes if item and 'timestamp' in item]
+
+def lambda_handler(event, context):
+    """Fold a DynamoDB stream batch from the chat-history table into rollup buckets"""
+    records = event.get('Records', [])
+    if not records:
+        return {'applied': 0, 'duplicates': 0}
+
+    store = RollupStore(dynamodb.Table(ROLLUP_TABLE))
+    batch = batch_id([r['eventID'] for r in records])
+    buckets = fold(changes_from_records(records))
+
+    applied = duplicates = 0
+    for (pk, sk), counters in sorted(buckets.items()):
+        # Any exception fails the batch; the stream retries it and buckets
+        # already updated under this batch id are skipped
+        if store.apply(pk, sk, counters, batch):
+            applied += 1
+        else:
+            duplicates += 1
+
+    logger.info(json.dumps({
+        'records': len(records),
+        'batch': batch,
+        'buckets': len(buckets),
+        'applied': applied,
+        'duplicates': duplicates
+    }))
+    return {'applied': applied, 'duplicates': duplicates}
@@ -0,0 +1,212 @@
+import hashlib
+import logging
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Dict, Any, Iterable, Iterator, List, Tuple
+
+from botocore.exceptions import ClientError
+
+from history_codec import decode_metadata
+
+logger = logging.getLogger()
+
+# Rollup table layout
+#
+#   pk  "<granularity>#YYYY-MM-DD"   (S) minute and hour buckets, one partition per UTC day
+#       "day#YYYY-MM"                (S) day buckets, one partition per UTC month
+#   sk  bucket start, epoch seconds  (N)
+#
+# Each item holds flat counters, added to with UpdateItem ADD:
+#   total, faq, lang_<code>, sent_<SENTIMENT>, route_<route>, handler_<name>
+# plus "expiresAt" on minute buckets for TTL.
+#
+# A stream batch is folded into a bucket by one TransactWriteItems: a
+# conditional Put of a marker item
+#
+#   pk  "applied#<bucket pk>#<batch id>"   sk  bucket start
+#
+# and the counter ADD. A retried batch fails the marker's condition, so the
+# ADD is skipped. Markers expire once the stream can no longer redeliver the
+# batch, so bucket items stay the size of their counters. (Buckets written
+# before markers carry an "applied" set, removed on their next update.)
+
+GRANULARITIES = {'minute': 60, 'hour': 3600, 'day': 86400}
+MINUTE_RETENTION_SECONDS = 7 * 86400
+# Stream records are retained for 24 hours; keep markers twice as long
+MARKER_RETENTION_SECONDS = 2 * 86400
+ROLLUP_ATTRIBUTES = ('pk', 'sk', 'applied', 'expiresAt')
+# What counters_for reads, in both record formats
+METRIC_ATTRIBUTES = [
+    'timestamp', 'v', 'l', 's', 'r', 'f', 'h',
+    'metadata.detectedLanguage', 'metadata.sentiment.sentiment', 'metadata.usedFAQ',
+    'metadata.route', 'metadata.handler'
+]
+
+def bucket_start(timestamp, granularity: str) -> int:
+    width = GRANULARITIES[granularity]
+    return int(timestamp) // width * width
+
+def partition_key(granularity: str, start: int) -> str:
+    moment = datetime.fromtimestamp(start, timezone.utc)
+    if granularity == 'day':
+        return f"day#{moment.strftime('%Y-%m')}"
+    return f"{granularity}#{moment.strftime('%Y-%m-%d')}"
+
+def next_partition(granularity: str, start: int) -> int:
+    """Epoch seconds at which the partition holding start ends"""
+    if granularity != 'day':
+        return start - start % 86400 + 86400
+    moment = datetime.fromtimestamp(start, timezone.utc)
+    year, month = (moment.year + 1, 1) if moment.month == 12 else (moment.year, moment.month + 1)
+    return int(datetime(year, month, 1, tzinfo=timezone.utc).timestamp())
+
+def bucket_counters(item: Dict[str, Any]) -> Counter:
+    """The counters of one rollup item, as ints"""
+    return Counter({
+        name: int(value) if isinstance(value, Decimal) else value
+        for name, value in item.items() if name not in ROLLUP_ATTRIBUTES
+    })
+
+def counters_for(item: Dict[str, Any]) -> Counter:
+    """Counter increments contributed by one chat-history item (legacy or compact)"""
+    metadata = decode_metadata(item)
+    counters = Counter(total=1)
+    counters[f"lang_{metadata.get('detectedLanguage', 'en')}"] += 1
+    counters[f"sent_{metadata.get('sentiment', {}).get('sentiment', 'NEUTRAL')}"] += 1
+    if metadata.get('usedFAQ'):
+        counters['faq'] += 1
+    if metadata.get('route'):
+        counters[f"route_{metadata['route']}"] += 1
+    if metadata.get('handler'):
+        counters[f"handler_{metadata['handler']}"] += 1
+    return counters
+
+def fold(changes: Iterable[Tuple[Dict[str, Any], int]]) -> Dict[Tuple[str, int], Counter]:
+    """Sum (item, sign) pairs into per-bucket counters for every granularity"""
+    buckets: Dict[Tuple[str, int], Counter] = {}
+    for item, sign in changes:
+        increments = counters_for(item)
+        for granularity in GRANULARITIES:
+            start = bucket_start(item['timestamp'], granularity)
+            bucket = buckets.setdefault((partition_key(granularity, start), start), Counter())
+            for name, value in increments.items():
+                bucket[name] += sign * value
+    return buckets
+
+def batch_id(event_ids: List[str]) -> str:
+    return hashlib.sha1('|'.join(event_ids).encode('utf-8')).hexdigest()[:16]
+
+class RollupStore:
+    """Reads and idempotent writes of the rollup table"""
+
+    def __init__(self, table, clock=time.time):
+        self.table = table
+        self.clock = clock
+
+    def apply(self, pk: str, sk: int, counters: Counter, batch: str) -> bool:
+        """Add counters to one bucket; False when this batch was already applied"""
+        names = {'#applied': 'applied'}
+        values: Dict[str, Any] = {}
+        adds = []
+        for i, (name, value) in enumerate(sorted(counters.items())):
+            if value == 0:
+                continue
+            names[f'#c{i}'] = name
+            values[f':c{i}'] = value
+            adds.append(f'#c{i} :c{i}')
+        expression = 'REMOVE #applied'
+        if adds:
+            expression += ' ADD ' + ', '.join(adds)
+        if pk.startswith('minute#'):
+            names['#exp'] = 'expiresAt'
+            values[':exp'] = sk + MINUTE_RETENTION_SECONDS
+            expression += ' SET #exp = if_not_exists(#exp, :exp)'
+        update = {
+            'TableName': self.table.name,
+            'Key': {'pk': pk, 'sk': sk},
+            'UpdateExpression': expression,
+            'ExpressionAttributeNames': names
+        }
+        if values:
+            update['ExpressionAttributeValues'] = values
+        marker = {
+            'TableName': self.table.name,
+            'Item': {'pk': f"applied#{pk}#{batch}", 'sk': sk,
+                     'expiresAt': int(self.clock()) + MARKER_RETENTION_SECONDS},
+            'ConditionExpression': 'attribute_not_exists(pk)'
+        }
+
+        try:
+            self.table.meta.client.transact_write_items(TransactItems=[{'Put': marker}, {'Update': update}])
+            return True
+        except ClientError as e:
+            reasons = e.response.get('CancellationReasons') or []
+            if (e.response['Error']['Code'] == 'TransactionCanceledException'
+                    and reasons and reasons[0].get('Code') == 'ConditionalCheckFailed'):
+                return False
+            raise
+
+    def buckets(self, granularity: str, start: int, end: int) -> Iterator[Dict[str, Any]]:
+        """Rollup items whose bucket starts in [start, end], one query per partition"""
+        width = GRANULARITIES[granularity]
+        first, last = bucket_start(start, granularity), bucket_start(end, granularity)
+        partition = first
+        while partition <= last:
+            partition_end = next_partition(granularity, partition)
+            kwargs: Dict[str, Any] = {
+                'KeyConditionExpression': 'pk = :pk AND sk BETWEEN :start AND :end',
+                'ExpressionAttributeValues': {
+                    ':pk': partition_key(granularity, partition),
+                    ':start': partition,
+                    ':end': min(last, partition_end - width)
+                }
+            }
+            while True:
+                response = self.table.query(**kwargs)
+                yield from response['Items']
+                if 'LastEvaluatedKey' not in response:
+                    break
+                kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+            partition = partition_end
+
+    def totals(self, start: int, end: int) -> Counter:
+        """Counters summed over [start, end]: minute buckets up to the first whole hour, hour buckets after"""
+        first_hour = -(-start // 3600) * 3600
+        items = []
+        if start < first_hour:
+            items += self.buckets('minute', start, min(first_hour - 1, end))
+        if first_hour <= end:
+            items += self.buckets('hour', first_hour, end)
+
+        totals = Counter()
+        for item in items:
+            totals.update(bucket_counters(item))
+        return totals
+
+def metrics_from_counters(counters: Counter, hours: int) -> Dict[str, Any]:
+    """The get_chat_metrics response shape, built from rollup counters"""
+    total = counters.get('total', 0)
+    sentiment_counts = {'POSITIVE': 0, 'NEGATIVE': 0, 'NEUTRAL': 0, 'MIXED': 0}
+    language_counts = {}
+    route_counts = {}
+    handler_counts = {}
+    for name, value in counters.items():
+        if name.startswith('sent_'):
+            sentiment_counts[name[5:]] = sentiment_counts.get(name[5:], 0) + value
+        elif name.startswith('lang_') and value:
+            language_counts[name[5:]] = value
+        elif name.startswith('route_') and value:
+            route_counts[name[6:]] = value
+        elif name.startswith('handler_') and value:
+            handler_counts[name[8:]] = value
+    return {
+        'totalChats': total,
+        'sentimentDistribution': sentiment_counts,
+        'languageDistribution': language_counts,
+        'routeDistribution': route_counts,
+        'handlerDistribution': handler_counts,
+        'faqUsageRate': (counters.get('faq', 0) / total * 100) if total > 0 else 0,
+        'timeRange': f'{hours} hours'
+    }
@@ -0,0 +1,237 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Any, Callable, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger()
+
+# Cache file format written by build_sales_insights.py
+STATE_VERSION = 1
+TOP_K = 5
+
+_TRENDING_RE = re.compile(r"\b(trending|popular|best[\s-]?sell\w*|top[\s-]?sell\w*|most (?:bought|sold|purchased)|hot right now)\b")
+# "what do people buy with X", "what goes with X"; not "get help with X"
+_BOUGHT_WITH_RE = re.compile(r"\b(?:buy|buys|buying|bought|purchase[sd]?|purchasing)(?: \w+){0,3}? (?:with|together)\b"
+                             r"|\b(?:goes|go|pairs?|paired)(?: well)? with\b")
+_PAYMENT_RE = re.compile(r"\b(?:how do|how does) (?:most )?(?:people|customers|everyone) pay\b|\b(?:popular|common|preferred) (?:way to pay|payment)")
+_THIS_MONTH_RE = re.compile(r"\bthis month\b|\bright now\b|\blately\b|\brecently\b")
+_PRODUCT_ID_RE = re.compile(r"\bP\d{3,}\b", re.IGNORECASE)
+
+class SalesInsights:
+    """Sales aggregates for answering "what's trending?" style questions.
+
+    Holds units and revenue per month per product, revenue per payment
+    method and, for "bought with", how many customers bought each pair of
+    products. Everything is plain dicts and lists: the full build is
+    vectorized offline (build_sales_insights.py), the Lambda only loads
+    the JSON. add_sales() folds in new sales incrementally, and answers
+    are memoized until the next change. "This month" is the current UTC
+    month by clock, not the latest month in the data.
+    """
+
+    def __init__(self, state: Optional[Dict[str, Any]] = None, clock: Callable[[], float] = time.time):
+        state = state or {}
+        if state.get('version', STATE_VERSION) != STATE_VERSION:
+            raise ValueError(f"Sales insights version {state.get('version')}, expected {STATE_VERSION}")
+        self.products: Dict[str, Dict[str, str]] = state.get('products', {})
+        self.monthly: Dict[str, Dict[str, List[float]]] = state.get('monthly', {})
+        self.payments: Dict[str, List[float]] = state.get('payments', {})
+        self.baskets: Dict[str, List[str]] = state.get('baskets', {})
+        self.pairs: Dict[str, Dict[str, int]] = state.get('pairs', {})
+        self.sales = state.get('sales', 0)
+        self.clock = clock
+        self._memo: Dict[Tuple, Any] = {}
+        self._lock = threading.Lock()
+        self._index_names()
+
+    @classmethod
+    def load(cls, path: str) -> 'SalesInsights':
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def to_state(self) -> Dict[str, Any]:
+        return {
+            'version': STATE_VERSION,
+            'products': self.products,
+            'monthly': self.monthly,
+            'payments': self.payments,
+            'baskets': self.baskets,
+            'pairs': self.pairs,
+            'sales': self.sales
+        }
+
+    def save(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_state(), f, separators=(',', ':'))
+
+    def _index_names(self):
+        self._names = sorted(((info['name'].lower(), product_id) for product_id, info in self.products.items()
+                              if info.get('name')), key=lambda pair: -len(pair[0]))
+        categories = sorted({info['category'] for info in self.products.values() if info.get('category')})
+        subcategories = sorted({info['subcategory'] for info in self.products.values() if info.get('subcategory')})
+        self._categories = [(re.compile(rf"\b{re.escape(name.lower())}('?s)?\b"), name) for name in categories]
+        self._subcategories = [(re.compile(rf"\b{re.escape(name.lower())}\b"), name) for name in subcategories]
+
+    def add_products(self, products: Iterable[Dict[str, Any]]):
+        with self._lock:
+            for product in products:
+                self.products[product['ProductID']] = {
+                    'name': product.get('ProductName', ''),
+                    'category': product.get('Category', ''),
+                    'subcategory': product.get('Subcategory', '')
+                }
+            self._index_names()
+            self._memo.clear()
+
+    def add_sales(self, sales: Iterable[Dict[str, Any]]) -> int:
+        """Fold in new sales rows (Sales.json shape); returns how many were added"""
+        added = 0
+        with self._lock:
+            for sale in sales:
+                product_id, customer_id = sale['ProductID'], sale.get('CustomerID')
+                units, revenue = int(sale.get('QuantityPurchased', 1)), float(sale.get('TotalAmount', 0))
+                month = str(sale['Date'])[:7]
+                totals = self.monthly.setdefault(month, {}).setdefault(product_id, [0, 0.0])
+                totals[0] += units
+                totals[1] = round(totals[1] + revenue, 2)
+                payment = self.payments.setdefault(sale.get('PaymentMethod') or 'Unknown', [0, 0.0])
+                payment[0] += 1
+                payment[1] = round(payment[1] + revenue, 2)
+                if customer_id:
+                    basket = self.baskets.setdefault(customer_id, [])
+                    if product_id not in basket:
+                        for other in basket:
+                            for a, b in ((product_id, other), (other, product_id)):
+                                row = self.pairs.setdefault(a, {})
+                                row[b] = row.get(b, 0) + 1
+                        basket.append(product_id)
+                added += 1
+            self.sales += added
+            self._memo.clear()
+        return added
+
+    def months(self) -> List[str]:
+        return sorted(self.monthly)
+
+    def _memoized(self, key: Tuple, compute):
+        value = self._memo.get(key)
+        if value is None:
+            value = self._memo[key] = compute()
+        return value
+
+    def top_sellers(self, category: Optional[str] = None, month: Optional[str] = None,
+                    k: int = TOP_K) -> List[Tuple[str, int, float]]:
+        """(product_id, units, revenue) by units sold, for one month or all time"""
+        def compute():
+            totals: Dict[str, List[float]] = {}
+            for period in ([month] if month else self.monthly):
+                for product_id, (units, revenue) in self.monthly.get(period, {}).items():
+                    if category and self.products.get(product_id, {}).get('category') != category:
+                        continue
+                    entry = totals.setdefault(product_id, [0, 0.0])
+                    entry[0] += units
+                    entry[1] += revenue
+            ranked = sorted(totals.items(), key=lambda item: (-item[1][0], -item[1][1], item[0]))
+            return [(product_id, int(units), round(revenue, 2)) for product_id, (units, revenue) in ranked[:k]]
+        return self._memoized(('top', category, month, k), compute)
+
+    def bought_with(self, product_ids: List[str], k: int = TOP_K) -> List[Tuple[str, int]]:
+        """Products most often bought by the same customers, excluding product_ids"""
+        def compute():
+            counts: Dict[str, int] = {}
+            for product_id in product_ids:
+                for other, count in self.pairs.get(product_id, {}).items():
+                    if other not in product_ids:
+                        counts[other] = counts.get(other, 0) + count
+            return sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:k]
+        return self._memoized(('with', tuple(product_ids), k), compute)
+
+    def payment_mix(self) -> List[Tuple[str, int, float]]:
+        """(method, sales, revenue), most used first"""
+        return self._memoized(('payments',), lambda: sorted(
+            ((method, int(count), round(revenue, 2)) for method, (count, revenue) in self.payments.items()),
+            key=lambda item: (-item[1], -item[2], item[0])))
+
+    def _name(self, product_id: str) -> str:
+        return self.products.get(product_id, {}).get('name') or product_id
+
+    def _mentioned_category(self, text: str) -> Optional[str]:
+        for pattern, category in self._categories:
+            if pattern.search(text):
+                return category
+        return None
+
+    def _mentioned_products(self, text: str) -> List[str]:
+        ids = [match.upper() for match in _PRODUCT_ID_RE.findall(text) if match.upper() in self.products]
+        if ids:
+            return ids
+        for name, product_id in self._names:
+            if name in text:
+                return [product_id]
+        for pattern, subcategory in self._subcategories:
+            if pattern.search(text):
+                return sorted(product_id for product_id, info in self.products.items()
+                              if info.get('subcategory') == subcategory)
+        return []
+
+    def answer(self, message: str) -> Optional[str]:
+        """A reply for trending / bought-with / payment questions, or None"""
+        text = message.lower()
+        if _BOUGHT_WITH_RE.search(text):
+            products = self._mentioned_products(text)
+            if products:
+                return self._answer_bought_with(products)
+        if _PAYMENT_RE.search(text):
+            return self._answer_payments()
+        if _TRENDING_RE.search(text):
+            return self._answer_trending(self._mentioned_category(text), bool(_THIS_MONTH_RE.search(text)))
+        return None
+
+    def _answer_bought_with(self, products: List[str]) -> str:
+        subject = self._name(products[0]) if len(products) == 1 else \
+            (self.products[products[0]].get('subcategory') or 'those items').lower()
+        related = self.bought_with(products, k=3)
+        if not related:
+            return f"We don't have enough purchase history to suggest what goes with {subject} yet."
+        names = ', '.join(self._name(product_id) for product_id, _ in related)
+        return f"Customers who bought {subject} also bought: {names}."
+
+    def _answer_trending(self, category: Optional[str], this_month: bool) -> Optional[str]:
+        if not self.monthly:
+            return None
+        month = None
+        if this_month:
+            current = datetime.fromtimestamp(self.clock(), timezone.utc).strftime('%Y-%m')
+            month = current if current in self.monthly else None
+        top = self.top_sellers(category, month, k=3)
+        if not top and month:
+            top, month = self.top_sellers(category, None, k=3), None
+        if not top:
+            return None
+        scope = f"{category} " if category else ''
+        # Without sales this month yet, say the list is all-time
+        period = ' this month' if month else (' overall' if this_month else '')
+        names = ', '.join(f"{self._name(product_id)} ({units} sold)" for product_id, units, _ in top)
+        return f"Our best-selling {scope}items{period}: {names}."
+
+    def _answer_payments(self) -> Optional[str]:
+        mix = self.payment_mix()
+        if not mix:
+            return None
+        total = sum(count for _, count, _ in mix) or 1
+        parts = ', '.join(f"{method} ({count * 100 // total}%)" for method, count, _ in mix)
+        return f"Our customers pay with {parts}."
+
+def load_insights(path: Optional[str]) -> Optional[SalesInsights]:
+    """The insights cache at path, or None when it is not configured or cannot be read"""
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        return SalesInsights.load(path)
+    except Exception as e:
+        logger.error(f"Failed to load sales insights from {path}: {e}")
+        return None
@@ -0,0 +1,78 @@
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class SingleFlightTimeout(Exception):
+    """Raised when a waiter gives up on an in-flight call"""
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into one backend call.
+
+    The first caller for a key (the leader) runs the function; callers that
+    arrive while it is in flight wait for it and receive the same result or
+    exception. Nothing is cached: once the leader finishes the key is
+    forgotten and the next caller starts a fresh call.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.stats = {'calls': 0, 'shared': 0, 'timeouts': 0}
+
+    def do(self, key: Hashable, fn: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        """Run fn() once per key among concurrent callers and return its result"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                leader = True
+                self.stats['calls'] += 1
+            else:
+                call.waiters += 1
+                leader = False
+                self.stats['shared'] += 1
+
+        if leader:
+            try:
+                call.result = fn()
+            except BaseException as e:
+                call.error = e
+                raise
+            finally:
+                # Forget the key before waking waiters so a caller arriving
+                # after completion never picks up a finished call
+                with self._lock:
+                    if self._calls.get(key) is call:
+                        del self._calls[key]
+                call.done.set()
+            return call.result
+
+        if not call.done.wait(timeout):
+            with self._lock:
+                self.stats['timeouts'] += 1
+            raise SingleFlightTimeout(f"Timed out after {timeout}s waiting for in-flight call")
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def in_flight(self) -> int:
+        """Number of keys with an outstanding call"""
+        with self._lock:
+            return len(self._calls)
+
+
+def normalize_key(text: str, fold_case: bool = False) -> str:
+    """Collapse whitespace (and optionally case) so equivalent inputs share a key"""
+    normalized = ' '.join(text.split())
+    return normalized.casefold() if fold_case else normalized
@@ -0,0 +1,283 @@
+import logging
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Any, Callable, List, Optional
+
+from history_codec import hour_bucket
+
+logger = logging.getLogger()
+
+# Catalog items carry updatedAt (epoch seconds of the last stock change) and
+# stockHour, its UTC hour "yyyy-mm-dd-hh". stockHour is the partition key of
+# the stock-hour-index GSI (sort key updatedAt), so a delta refresh queries
+# only the hours since the last one instead of scanning the catalog.
+UPDATED_ATTRIBUTE = 'updatedAt'
+STOCK_HOUR_ATTRIBUTE = 'stockHour'
+SNAPSHOT_ATTRIBUTES = ['productId', 'name', 'stockQuantity', 'inStock', UPDATED_ATTRIBUTE]
+# GSIs are eventually consistent: re-read changes this far behind the watermark
+DELTA_OVERLAP_SECONDS = 5
+# Past this many hours without a refresh, reload everything instead
+MAX_DELTA_HOURS = 24
+# Deltas never see deleted items, so reload everything after this many
+FULL_RELOAD_EVERY = 20
+
+_STOCK_RE = re.compile(r"\b(?:in stock|out of stock|sold out|availability|have any left|any left|restock\w*|back in stock)\b")
+# "Is X available?" is as often about a service ("is yoga class available?"),
+# so it only counts as a stock question when X is a full product name
+_AVAILABLE_RE = re.compile(r"\bavailable\b")
+_PRODUCT_ID_RE = re.compile(r"\b[A-Z]+\d{3,}\b", re.IGNORECASE)
+_WORD_RE = re.compile(r"[a-z0-9]+")
+# Words that never identify a product on their own
+_NAME_STOPWORDS = {'the', 'a', 'an', 'of', 'and', 'for', 'with', 'in', 'on', 'to', 'is', 'are', 'it', 'any', 'you',
+                   'do', 'have', 'set', 'new', 'premium', 'deluxe', 'luxury', 'smart', 'casual', 'designer'}
+
+def _name_tokens(text: str) -> List[str]:
+    """Lowercase words with apostrophes and plural -s dropped, so "yoga mats" matches "Yoga Mat" """
+    tokens = []
+    for word in _WORD_RE.findall(re.sub(r"['’]", '', text.lower())):
+        if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        tokens.append(word)
+    return tokens
+
+def stock_update(quantity: int, now: Optional[float] = None) -> Dict[str, Any]:
+    """The attributes to write with a stock change so delta refreshes pick it up"""
+    updated = int(now if now is not None else time.time())
+    return {
+        'stockQuantity': quantity,
+        'inStock': quantity > 0,
+        UPDATED_ATTRIBUTE: updated,
+        STOCK_HOUR_ATTRIBUTE: hour_bucket(updated)
+    }
+
+def set_stock(table, product_id: str, quantity: int, now: Optional[float] = None) -> Dict[str, Any]:
+    """Record a stock level for an existing catalog item"""
+    attributes = stock_update(quantity, now)
+    names = {f"#a{i}": name for i, name in enumerate(attributes)}
+    values = {f":v{i}": value for i, value in enumerate(attributes.values())}
+    table.update_item(
+        Key={'productId': product_id},
+        UpdateExpression='SET ' + ', '.join(f"#a{i} = :v{i}" for i in range(len(attributes))),
+        ConditionExpression='attribute_exists(productId)',
+        ExpressionAttributeNames=names,
+        ExpressionAttributeValues=values
+    )
+    return attributes
+
+class StockAvailability:
+    """Per-container snapshot of catalog stock levels keyed by productId.
+
+    The first refresh scans the catalog; later ones fetch only the items
+    whose updatedAt is past the watermark, via stock-hour-index when
+    index_name is set, else with a filtered scan. Every full_reload_every
+    deltas the catalog is scanned again, which drops deleted products.
+    refresh_if_due() refreshes at most every refresh_seconds, and a failed
+    refresh keeps the previous snapshot. Lookups are answered from the snapshot along with the time it
+    was last refreshed. With strict=True, items at or below
+    low_stock_threshold are re-read with a consistent GetItem, since that
+    is where a stale count changes the answer.
+    """
+
+    def __init__(self, table, index_name: Optional[str] = None, refresh_seconds: float = 30.0,
+                 low_stock_threshold: int = 5, strict: bool = False, clock: Callable[[], float] = time.time,
+                 full_reload_every: int = FULL_RELOAD_EVERY):
+        self.table = table
+        self.index_name = index_name
+        self.refresh_seconds = refresh_seconds
+        self.low_stock_threshold = low_stock_threshold
+        self.strict = strict
+        self.clock = clock
+        self.full_reload_every = full_reload_every
+        self.items: Dict[str, Dict[str, Any]] = {}
+        self.watermark = 0
+        self.refreshed_at: Optional[float] = None
+        self._attempted_at: Optional[float] = None
+        self._names: Dict[str, set] = {}
+        self._name_tokens: Dict[str, set] = {}
+        self._lock = threading.Lock()
+        self.full_loads = 0
+        self.delta_loads = 0
+        self.strict_reads = 0
+        self._deltas_since_full = 0
+
+    def _projection(self):
+        names = {f"#p{i}": name for i, name in enumerate(SNAPSHOT_ATTRIBUTES)}
+        return ', '.join(names), names
+
+    def _pages(self, method, **kwargs):
+        while True:
+            response = method(**kwargs)
+            yield from response.get('Items', [])
+            if 'LastEvaluatedKey' not in response:
+                return
+            kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    def _full(self) -> List[Dict[str, Any]]:
+        projection, names = self._projection()
+        return list(self._pages(self.table.scan, ProjectionExpression=projection, ExpressionAttributeNames=names))
+
+    def _delta(self, since: int, now: float) -> List[Dict[str, Any]]:
+        projection, names = self._projection()
+        names['#u'] = UPDATED_ATTRIBUTE
+        if not self.index_name:
+            return list(self._pages(self.table.scan, FilterExpression='#u >= :since',
+                                    ProjectionExpression=projection, ExpressionAttributeNames=names,
+                                    ExpressionAttributeValues={':since': since}))
+        names['#h'] = STOCK_HOUR_ATTRIBUTE
+        items = []
+        hour = since - since % 3600
+        while hour <= now:
+            items.extend(self._pages(self.table.query, IndexName=self.index_name,
+                                     KeyConditionExpression='#h = :hour AND #u >= :since',
+                                     ProjectionExpression=projection, ExpressionAttributeNames=names,
+                                     ExpressionAttributeValues={':hour': hour_bucket(hour), ':since': since}))
+            hour += 3600
+        return items
+
+    def refresh(self) -> int:
+        """Fetch changes since the last refresh (everything on the first); returns items fetched"""
+        now = self.clock()
+        with self._lock:
+            self._attempted_at = now
+            since = self.watermark - DELTA_OVERLAP_SECONDS
+            full = (self.refreshed_at is None or now - since > MAX_DELTA_HOURS * 3600
+                    or self._deltas_since_full >= self.full_reload_every)
+        try:
+            items = self._full() if full else self._delta(since, now)
+        except Exception as e:
+            logger.error(f"Stock refresh failed: {e}")
+            return 0
+        with self._lock:
+            if full:
+                self.items = {}
+                self.full_loads += 1
+                self._deltas_since_full = 0
+            else:
+                self.delta_loads += 1
+                self._deltas_since_full += 1
+            for item in items:
+                self._store(item)
+            # Anything changed after this refresh started is stamped later
+            # than now, give or take the overlap
+            self.watermark = max(self.watermark, int(now))
+            self.refreshed_at = now
+            if items or full:
+                self._index_names()
+        return len(items)
+
+    def refresh_if_due(self) -> int:
+        with self._lock:
+            due = self._attempted_at is None or self.clock() - self._attempted_at >= self.refresh_seconds
+        return self.refresh() if due else 0
+
+    def _store(self, item: Dict[str, Any]):
+        quantity = int(item.get('stockQuantity', 0))
+        updated = int(item.get(UPDATED_ATTRIBUTE, 0))
+        current = self.items.get(item['productId'])
+        if current is not None and current['updatedAt'] > updated:
+            return
+        self.items[item['productId']] = {
+            'productId': item['productId'],
+            'name': item.get('name', current['name'] if current else item['productId']),
+            'quantity': quantity,
+            'inStock': bool(item.get('inStock', quantity > 0)),
+            'updatedAt': updated
+        }
+
+    def _index_names(self):
+        """Map each distinctive name word to the products whose name has it"""
+        names: Dict[str, set] = {}
+        name_tokens: Dict[str, set] = {}
+        for product_id, entry in self.items.items():
+            tokens = {token for token in _name_tokens(entry.get('name') or '') if token not in _NAME_STOPWORDS}
+            if not tokens:
+                continue
+            name_tokens[product_id] = tokens
+            for token in tokens:
+                names.setdefault(token, set()).add(product_id)
+        self._names, self._name_tokens = names, name_tokens
+
+    def lookup(self, product_id: str, strict: Optional[bool] = None) -> Optional[Dict[str, Any]]:
+        """Stock of one product with asOf, the time the answer reflects; None when unknown"""
+        with self._lock:
+            entry = self.items.get(product_id)
+            refreshed_at = self.refreshed_at
+        if entry is None:
+            return None
+        result = dict(entry, asOf=refreshed_at, source='snapshot')
+        strict = self.strict if strict is None else strict
+        if strict and entry['quantity'] <= self.low_stock_threshold:
+            fresh = self._read_through(product_id)
+            if fresh is not None:
+                result = dict(fresh, asOf=self.clock(), source='table')
+        return result
+
+    def _read_through(self, product_id: str) -> Optional[Dict[str, Any]]:
+        projection, names = self._projection()
+        try:
+            response = self.table.get_item(Key={'productId': product_id}, ConsistentRead=True,
+                                           ProjectionExpression=projection, ExpressionAttributeNames=names)
+        except Exception as e:
+            logger.error(f"Stock read for {product_id} failed: {e}")
+            return None
+        item = response.get('Item')
+        if item is None:
+            return None
+        with self._lock:
+            self.strict_reads += 1
+            self._store(item)
+            return self.items[product_id]
+
+    def _mentioned_product(self, message: str, full_name: bool = False) -> Optional[str]:
+        """The product a message names by ID, or by most of its name words.
+
+        A name of n distinctive words needs at least min(2, n) and at least
+        n - 1 of them in the message, all of them when full_name is set, so
+        one shared word ("yoga class", "table booking") names nothing. Of
+        the products that qualify the one with the most words matched wins;
+        a tie ("the wireless one") names no product.
+        """
+        for match in _PRODUCT_ID_RE.findall(message):
+            if match.upper() in self.items:
+                return match.upper()
+        with self._lock:
+            names, name_tokens = self._names, self._name_tokens
+        scores: Dict[str, int] = {}
+        for token in set(_name_tokens(message)):
+            for product_id in names.get(token, ()):
+                scores[product_id] = scores.get(product_id, 0) + 1
+        ranked = []
+        for product_id, matched in scores.items():
+            size = len(name_tokens[product_id])
+            required = size if full_name else max(min(2, size), size - 1)
+            if matched >= required:
+                ranked.append((-matched, size - matched, product_id))
+        if not ranked:
+            return None
+        ranked.sort()
+        if len(ranked) > 1 and ranked[0][:2] == ranked[1][:2]:
+            return None
+        return ranked[0][2]
+
+    def answer(self, message: str) -> Optional[str]:
+        """A reply for "is X in stock?" about a catalog product, or None"""
+        text = message.lower()
+        if _STOCK_RE.search(text):
+            full_name = False
+        elif _AVAILABLE_RE.search(text):
+            full_name = True
+        else:
+            return None
+        self.refresh_if_due()
+        product_id = self._mentioned_product(message, full_name)
+        if product_id is None:
+            return None
+        stock = self.lookup(product_id)
+        as_of = datetime.fromtimestamp(stock['asOf'], timezone.utc).strftime('%H:%M UTC')
+        if not stock['inStock'] or stock['quantity'] <= 0:
+            return f"Sorry, {stock['name']} is currently out of stock (as of {as_of})."
+        if stock['quantity'] <= self.low_stock_threshold:
+            return f"Yes, {stock['name']} is in stock, but only {stock['quantity']} left (as of {as_of})."
+        return f"Yes, {stock['name']} is in stock ({stock['quantity']} available, as of {as_of})."
@@ -0,0 +1,97 @@
+"""Archive old chat history into local segments, and export across both tiers.
+
+Rows older than --days whole UTC days are written to gzip NDJSON segments
+under --archive-dir (one directory per day, with a block index per segment)
+and then deleted from the table.
+
+    # Move everything older than 30 days out of the hot table
+    python scripts/archive_history.py archive --archive-dir ./history-archive --days 30
+
+    # Export one week, hot and archived, in the legacy record shape
+    python scripts/archive_history.py export --archive-dir ./history-archive \\
+        --start 2025-09-01 --end 2025-09-07 --resolve-faq --output week.ndjson
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import boto3
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'lambda'))
+
+from history_archive import HistoryArchive, HistoryReader, archive_history
+from history_codec import FAQResolver
+
+def parse_time(value: str, end: bool = False) -> int:
+    """Epoch seconds, or an ISO date/datetime in UTC; a bare end date includes that whole day"""
+    if value.isdigit():
+        return int(value)
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    timestamp = int(parsed.timestamp())
+    if end and len(value) == 10:
+        timestamp += 86399
+    return timestamp
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    raise TypeError(f"Cannot export {type(value).__name__}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Chat-history archival and export')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--table', default='prod-chatbot-history')
+    common.add_argument('--region', default=None)
+    common.add_argument('--archive-dir', required=True)
+
+    archive = sub.add_parser('archive', parents=[common], help='move old rows into segments')
+    archive.add_argument('--days', type=int, default=30, help='keep this many days in the table')
+    archive.add_argument('--keep', action='store_true', help='write segments but do not delete rows')
+
+    export = sub.add_parser('export', parents=[common], help='write decoded records as NDJSON')
+    export.add_argument('--start', default='0')
+    export.add_argument('--end', default=None)
+    export.add_argument('--session')
+    export.add_argument('--resolve-faq', action='store_true', help='replace FAQ references with answer text')
+    export.add_argument('--faq-table', default='prod-chatbot-faq')
+    export.add_argument('--output', help='file to write (default stdout)')
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    dynamodb = boto3.resource('dynamodb', region_name=args.region)
+    table = dynamodb.Table(args.table)
+    store = HistoryArchive(args.archive_dir)
+
+    if args.command == 'archive':
+        stats = archive_history(table, store, args.days, delete=not args.keep)
+        print(f"Archived {stats['items']} items over {stats['days']} days "
+              f"({stats['bytes'] / 1024:.1f} KiB compressed), deleted {stats['deleted']} from {args.table}")
+        return
+
+    start = parse_time(args.start)
+    end = parse_time(args.end, end=True) if args.end else int(datetime.now(timezone.utc).timestamp())
+    resolver = FAQResolver(dynamodb.Table(args.faq_table)) if args.resolve_faq else None
+    reader = HistoryReader(table, store)
+
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    count = 0
+    try:
+        for record in reader.records(start, end, args.session, resolver):
+            out.write(json.dumps(record, default=_json_default, ensure_ascii=False) + '\n')
+            count += 1
+    finally:
+        if args.output:
+            out.close()
+    print(f"Exported {count} records", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
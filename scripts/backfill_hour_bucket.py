@@ -0,0 +1,56 @@
+"""Add the hb (UTC hour bucket) attribute to chat-history rows written before it existed.
+
+Rows without hb are invisible to the hour-bucket-index GSI, so run this
+once after deploying the index:
+
+    python scripts/backfill_hour_bucket.py --table prod-chatbot-history --segments 8
+"""
+import argparse
+import os
+import sys
+import threading
+
+import boto3
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'lambda'))
+
+from history_codec import HOUR_BUCKET_ATTRIBUTE, hour_bucket
+from parallel_scan import parallel_scan
+
+def backfill(table, segments: int = 4) -> int:
+    updated = 0
+    lock = threading.Lock()
+
+    def update_page(items):
+        nonlocal updated
+        for item in items:
+            table.update_item(
+                Key={'sessionId': item['sessionId'], 'timestamp': item['timestamp']},
+                UpdateExpression='SET #hb = :hb',
+                ConditionExpression='attribute_exists(#ts)',
+                ExpressionAttributeNames={'#hb': HOUR_BUCKET_ATTRIBUTE, '#ts': 'timestamp'},
+                ExpressionAttributeValues={':hb': hour_bucket(item['timestamp'])}
+            )
+        with lock:
+            updated += len(items)
+
+    parallel_scan(
+        table, update_page, segments,
+        FilterExpression='attribute_not_exists(#hb)',
+        ProjectionExpression='sessionId, #ts',
+        ExpressionAttributeNames={'#hb': HOUR_BUCKET_ATTRIBUTE, '#ts': 'timestamp'}
+    )
+    return updated
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Backfill hour buckets on chat history')
+    parser.add_argument('--table', default='prod-chatbot-history')
+    parser.add_argument('--region', default=None)
+    parser.add_argument('--segments', type=int, default=4)
+    args = parser.parse_args(argv)
+
+    table = boto3.resource('dynamodb', region_name=args.region).Table(args.table)
+    print(f"Added {HOUR_BUCKET_ATTRIBUTE} to {backfill(table, args.segments)} items in {args.table}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Fold chat history written before the rollup stream existed into the rollup table.
+
+The stream only carries writes made after its event source mapping was
+created, so with ROLLUP_TABLE set any window reaching back before that
+undercounts. Run this once, with --before set to when the mapping was
+created (see LastModified in `aws lambda list-event-source-mappings`):
+
+    python scripts/backfill_rollups.py --history-table prod-chatbot-history \\
+        --rollup-table prod-chatbot-rollups --before 2025-09-01T08:00:00Z --segments 8
+
+Every item with a timestamp before --before goes through the same fold and
+RollupStore.apply as a stream batch. The batch id is derived from --before,
+so rerunning with the same value while its markers live (two days) changes
+nothing. Minute buckets past their 7-day retention are not written.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+import boto3
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'lambda'))
+
+from history_archive import HistoryArchive, HistoryReader
+from rollups import METRIC_ATTRIBUTES, MINUTE_RETENTION_SECONDS, RollupStore, batch_id, fold
+
+def parse_time(value: str) -> int:
+    """Epoch seconds, or an ISO 8601 time (UTC unless it carries an offset)"""
+    if value.isdigit():
+        return int(value)
+    moment = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp())
+
+def backfill(history: HistoryReader, store: RollupStore, before: int, segments: int = 4):
+    """Apply the rollup counters of every history item older than before; returns (applied, skipped) buckets"""
+    buckets = {}
+    lock = threading.Lock()
+
+    def fold_page(items):
+        page = fold((item, 1) for item in items)
+        with lock:
+            for key, counters in page.items():
+                buckets.setdefault(key, Counter()).update(counters)
+
+    history.for_each_page(0, before - 1, fold_page, projection=METRIC_ATTRIBUTES, segments=segments)
+
+    batch = batch_id([f'backfill-{before}'])
+    oldest_minute = int(store.clock()) - MINUTE_RETENTION_SECONDS
+    applied = skipped = 0
+    for (pk, sk), counters in sorted(buckets.items()):
+        if pk.startswith('minute#') and sk < oldest_minute:
+            continue
+        if store.apply(pk, sk, counters, batch):
+            applied += 1
+        else:
+            skipped += 1
+    return applied, skipped
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Backfill rollup buckets from chat history')
+    parser.add_argument('--history-table', default='prod-chatbot-history')
+    parser.add_argument('--rollup-table', default='prod-chatbot-rollups')
+    parser.add_argument('--before', required=True, type=parse_time,
+                        help='when the rollup stream mapping was created (epoch seconds or ISO 8601)')
+    parser.add_argument('--archive-dir', default=None, help='HISTORY_ARCHIVE_DIR, to include archived segments')
+    parser.add_argument('--region', default=None)
+    parser.add_argument('--segments', type=int, default=4)
+    args = parser.parse_args(argv)
+
+    dynamodb = boto3.resource('dynamodb', region_name=args.region)
+    archive = HistoryArchive(args.archive_dir) if args.archive_dir else None
+    history = HistoryReader(dynamodb.Table(args.history_table), archive)
+    store = RollupStore(dynamodb.Table(args.rollup_table), clock=time.time)
+
+    applied, skipped = backfill(history, store, args.before, args.segments)
+    print(f"Backfilled {applied} buckets in {args.rollup_table} ({skipped} already applied)")
+
+if __name__ == '__main__':
+    main()
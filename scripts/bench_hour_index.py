@@ -0,0 +1,114 @@
+"""Compare hour-bucket index queries with a full scan for windowed chat metrics.
+
+Loads a synthetic chat history into the in-process DynamoDB stand-in from
+scripts/fake_backends.py, then reads the last N hours both ways and reports
+items read, read units consumed and wall time. The stand-in charges 0.5 RCU
+per item examined, so the ratio is what matters, not the absolute figures.
+
+    python scripts/bench_hour_index.py --rows 2000000 --days 90 --windows 1 24 168
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, SCRIPTS_DIR)
+sys.path.insert(0, os.path.join(os.path.dirname(SCRIPTS_DIR), 'lambda'))
+
+import fake_backends
+from history_archive import HistoryReader
+from history_codec import encode_record
+from rollups import counters_for
+
+METRIC_ATTRIBUTES = ['timestamp', 'v', 'l', 's', 'r', 'f', 'h']
+
+def synthetic_rows(count: int, days: int, now: int, seed: int):
+    """Compact chat-history rows spread uniformly over the last ``days`` days"""
+    rng = random.Random(seed)
+    languages = ['en'] * 6 + ['ms'] * 3 + ['zh']
+    sentiments = ['POSITIVE', 'NEUTRAL', 'NEUTRAL', 'NEGATIVE', 'MIXED']
+    span = days * 86400
+    for i in range(count):
+        route = 'faq' if rng.random() < 0.4 else 'llm'
+        yield encode_record(
+            f'session-{i // 6}',
+            now - rng.randrange(span),
+            'hi',
+            'hello',
+            {
+                'detectedLanguage': rng.choice(languages),
+                'userLanguage': 'en',
+                'sentiment': {'sentiment': rng.choice(sentiments), 'confidence': {}},
+                'route': route,
+                'handler': 'llama'
+            }
+        )
+
+def load(table, count: int, days: int, now: int, seed: int, chunk: int = 100000):
+    rows = synthetic_rows(count, days, now, seed)
+    loaded = 0
+    while loaded < count:
+        batch = [row for _, row in zip(range(min(chunk, count - loaded)), rows)]
+        table.load(batch)
+        loaded += len(batch)
+        print(f"\rloaded {loaded:,} rows", end='', file=sys.stderr, flush=True)
+    print(file=sys.stderr)
+
+def measure(table, reader: HistoryReader, start: int, end: int, segments: int):
+    counters = Counter()
+    lock = threading.Lock()
+
+    def fold_page(items):
+        page = Counter()
+        for item in items:
+            page.update(counters_for(item))
+        with lock:
+            counters.update(page)
+
+    units = table.consumed_read_units
+    began = time.perf_counter()
+    stats = reader.for_each_page(start, end, fold_page, projection=METRIC_ATTRIBUTES, segments=segments)
+    elapsed = time.perf_counter() - began
+    return {
+        'total': counters['total'],
+        'examined': stats['scanned'],
+        'requests': stats['pages'],
+        'rcu': table.consumed_read_units - units,
+        'seconds': elapsed
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Hour-bucket index vs scan benchmark')
+    parser.add_argument('--rows', type=int, default=2000000)
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--windows', type=int, nargs='+', default=[1, 24, 168], help='window sizes in hours')
+    parser.add_argument('--segments', type=int, default=4, help='parallel scan segments')
+    parser.add_argument('--workers', type=int, default=8, help='parallel bucket queries')
+    parser.add_argument('--skip-scan', action='store_true', help='only run the index path')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args(argv)
+
+    fake_backends.prepare_environment()
+    backends = fake_backends.FakeAWS.from_profile('instant', seed=args.seed)
+    table = backends.dynamodb.Table(os.environ['CHAT_HISTORY_TABLE'])
+    now = int(time.time())
+    load(table, args.rows, args.days, now, args.seed)
+
+    indexed = HistoryReader(table, bucket_index='hour-bucket-index', query_workers=args.workers)
+    scanning = HistoryReader(table)
+
+    print(f"{'window':>8} {'path':<6} {'rows':>10} {'examined':>11} {'requests':>9} {'RCU':>11} {'seconds':>8}")
+    for hours in args.windows:
+        start = now - hours * 3600
+        paths = [('index', indexed)] + ([] if args.skip_scan else [('scan', scanning)])
+        for name, reader in paths:
+            result = measure(table, reader, start, now, args.segments)
+            print(f"{hours:>7}h {name:<6} {result['total']:>10,} {result['examined']:>11,} "
+                  f"{result['requests']:>9,} {result['rcu']:>11,.0f} {result['seconds']:>8.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,1273 @@
+"""In-process stand-ins for the AWS clients used by the chat and analytics handlers.
+
+Each fake mimics the request/response shapes of the boto3 call it replaces,
+and can inject latency, throttling and errors so pipelines can be load-tested
+and benchmarked without network access or AWS charges:
+
+    backends = FakeAWS.from_profile('realistic', seed=7)
+    backends.seed_faq()
+    install(chatbot_handler, backends)
+"""
+import ast
+import copy
+import io
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+import uuid
+import zlib
+from bisect import bisect_left, bisect_right, insort
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from botocore.exceptions import ClientError
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# ---------------------------------------------------------------------------
+# Latency and fault injection
+# ---------------------------------------------------------------------------
+
+class LatencyModel:
+    """Samples a simulated service latency in milliseconds.
+
+    Supported distributions: ``fixed`` (value), ``uniform`` (low, high),
+    ``normal`` (mean, stddev), ``lognormal`` (median, sigma) and
+    ``exponential`` (mean). Samples are clamped at zero.
+    """
+
+    def __init__(self, distribution: str = 'fixed', rng: Optional[random.Random] = None, **params):
+        self.distribution = distribution
+        self.params = params
+        self.rng = rng or random.Random()
+
+    def sample_ms(self) -> float:
+        p = self.params
+        if self.distribution == 'fixed':
+            value = p.get('value', 0.0)
+        elif self.distribution == 'uniform':
+            value = self.rng.uniform(p['low'], p['high'])
+        elif self.distribution == 'normal':
+            value = self.rng.gauss(p['mean'], p['stddev'])
+        elif self.distribution == 'lognormal':
+            value = self.rng.lognormvariate(math.log(p['median']), p['sigma'])
+        elif self.distribution == 'exponential':
+            value = self.rng.expovariate(1.0 / p['mean'])
+        else:
+            raise ValueError(f"Unknown latency distribution: {self.distribution}")
+        return max(0.0, value)
+
+    @classmethod
+    def parse(cls, spec: str, rng: Optional[random.Random] = None) -> 'LatencyModel':
+        """Build from a CLI spec such as ``fixed:5``, ``uniform:5,20`` or ``lognormal:40,0.5``"""
+        name, _, args = spec.partition(':')
+        values = [float(v) for v in args.split(',')] if args else []
+        names = {
+            'fixed': ['value'],
+            'uniform': ['low', 'high'],
+            'normal': ['mean', 'stddev'],
+            'lognormal': ['median', 'sigma'],
+            'exponential': ['mean'],
+        }[name]
+        return cls(name, rng=rng, **dict(zip(names, values)))
+
+NO_LATENCY = LatencyModel('fixed', value=0.0)
+
+class FakeBackend:
+    """Base class handling latency, throttling, error injection and call counts"""
+
+    service_name = 'fake'
+    throttle_code = 'ThrottlingException'
+    error_code = 'InternalServerException'
+
+    def __init__(self, latency: Optional[LatencyModel] = None, throttle_rate: float = 0.0,
+                 error_rate: float = 0.0, seed: Optional[int] = None,
+                 operation_latency: Optional[Dict[str, LatencyModel]] = None):
+        self.rng = random.Random(seed)
+        self.latency = latency or NO_LATENCY
+        self.operation_latency = operation_latency or {}
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self.calls: Dict[str, int] = {}
+        self.failures: Dict[str, int] = {}
+        self._stats_lock = threading.Lock()
+
+    def _simulate(self, operation: str):
+        """Apply the configured latency and possibly raise an injected fault"""
+        with self._stats_lock:
+            self.calls[operation] = self.calls.get(operation, 0) + 1
+            roll = self.rng.random()
+        delay = self.operation_latency.get(operation, self.latency).sample_ms()
+        if delay:
+            time.sleep(delay / 1000.0)
+        if roll < self.throttle_rate:
+            self._fail(operation, self.throttle_code, 'Rate exceeded')
+        if roll < self.throttle_rate + self.error_rate:
+            self._fail(operation, self.error_code, 'Injected service error')
+
+    def _fail(self, operation: str, code: str, message: str):
+        with self._stats_lock:
+            self.failures[code] = self.failures.get(code, 0) + 1
+        raise ClientError({'Error': {'Code': code, 'Message': message},
+                           'ResponseMetadata': {'HTTPStatusCode': 400}}, operation)
+
+# ---------------------------------------------------------------------------
+# Bedrock, Comprehend, Translate, EventBridge
+# ---------------------------------------------------------------------------
+
+class FakeBedrock(FakeBackend):
+    service_name = 'bedrock-runtime'
+
+    def __init__(self, reply: str = "Thanks for reaching out! I'd be glad to help with that.", **kwargs):
+        super().__init__(**kwargs)
+        self.reply = reply
+
+    def invoke_model(self, modelId: str, body: str, contentType: str = 'application/json', **kwargs):
+        self._simulate('InvokeModel')
+        request = json.loads(body)
+        if modelId.startswith('meta.'):
+            payload = {'generation': ' ' + self.reply, 'prompt_token_count': len(request.get('prompt', '')) // 4}
+        else:
+            payload = {'content': [{'type': 'text', 'text': self.reply}], 'stop_reason': 'end_turn'}
+        return {'body': io.BytesIO(json.dumps(payload).encode('utf-8')), 'contentType': 'application/json'}
+
+_LANGUAGE_HINTS = {
+    'ms': {'apakah', 'bagaimana', 'adakah', 'berapa', 'kedai', 'anda', 'saya', 'boleh', 'waktu'},
+    'es': {'cuáles', 'cuál', 'sus', 'tienda', 'cómo', 'gracias', 'dónde', 'horarios'},
+    'fr': {'quelles', 'vos', 'magasin', 'merci', 'bonjour', 'où', 'comment'},
+    'de': {'wann', 'ihre', 'geschäft', 'danke', 'wie', 'öffnungszeiten'},
+}
+
+_POSITIVE_WORDS = {'thank', 'thanks', 'great', 'excellent', 'love', 'good', 'amazing', 'happy', 'awesome'}
+_NEGATIVE_WORDS = {'frustrated', 'angry', 'bad', 'terrible', 'broken', 'late', 'worst', 'disappointed', 'never'}
+
+class FakeComprehend(FakeBackend):
+    service_name = 'comprehend'
+
+    def detect_dominant_language(self, Text: str, **kwargs):
+        self._simulate('DetectDominantLanguage')
+        words = set(re.findall(r'\w+', Text.lower()))
+        best, best_hits = 'en', 0
+        for code, hints in _LANGUAGE_HINTS.items():
+            hits = len(words & hints)
+            if hits > best_hits:
+                best, best_hits = code, hits
+        return {'Languages': [{'LanguageCode': best, 'Score': 0.99 if best_hits or best == 'en' else 0.5}]}
+
+    def detect_sentiment(self, Text: str, LanguageCode: str = 'en', **kwargs):
+        self._simulate('DetectSentiment')
+        words = set(re.findall(r'\w+', Text.lower()))
+        positive = len(words & _POSITIVE_WORDS)
+        negative = len(words & _NEGATIVE_WORDS)
+        if positive and negative:
+            sentiment = 'MIXED'
+        elif positive:
+            sentiment = 'POSITIVE'
+        elif negative:
+            sentiment = 'NEGATIVE'
+        else:
+            sentiment = 'NEUTRAL'
+        scores = {'Positive': 0.02, 'Negative': 0.02, 'Neutral': 0.02, 'Mixed': 0.02}
+        scores[sentiment.capitalize()] = 0.94
+        return {'Sentiment': sentiment, 'SentimentScore': scores}
+
+class FakeTranslate(FakeBackend):
+    service_name = 'translate'
+    throttle_code = 'TooManyRequestsException'
+
+    def translate_text(self, Text: str, SourceLanguageCode: str, TargetLanguageCode: str, **kwargs):
+        self._simulate('TranslateText')
+        translated = Text if TargetLanguageCode == 'en' else f"[{TargetLanguageCode}] {Text}"
+        return {
+            'TranslatedText': translated,
+            'SourceLanguageCode': SourceLanguageCode,
+            'TargetLanguageCode': TargetLanguageCode
+        }
+
+class FakeEvents(FakeBackend):
+    """EventBridge stand-in; entry_failure_rate fails individual entries like PutEvents does"""
+
+    service_name = 'events'
+
+    def __init__(self, entry_failure_rate: float = 0.0, **kwargs):
+        super().__init__(**kwargs)
+        self.entry_failure_rate = entry_failure_rate
+        self.published: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def put_events(self, Entries: List[Dict[str, Any]], **kwargs):
+        self._simulate('PutEvents')
+        if not 1 <= len(Entries) <= 10:
+            self._fail('PutEvents', 'ValidationException', 'Entries must contain 1 to 10 items')
+        results, failed = [], 0
+        with self._lock:
+            for entry in Entries:
+                if self.rng.random() < self.entry_failure_rate:
+                    failed += 1
+                    results.append({'ErrorCode': 'ThrottlingException', 'ErrorMessage': 'Rate exceeded'})
+                else:
+                    self.published.append(copy.deepcopy(entry))
+                    results.append({'EventId': str(uuid.uuid4())})
+        return {'FailedEntryCount': failed, 'Entries': results}
+
+class FakeCloudWatch(FakeBackend):
+    """CloudWatch stand-in that enforces the PutMetricData request limits"""
+
+    service_name = 'cloudwatch'
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.published: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def put_metric_data(self, Namespace: str, MetricData: List[Dict[str, Any]], **kwargs):
+        self._simulate('PutMetricData')
+        if not 1 <= len(MetricData) <= 1000:
+            self._fail('PutMetricData', 'InvalidParameterValue', 'MetricData must contain 1 to 1000 items')
+        for datum in MetricData:
+            if sum(key in datum for key in ('Value', 'Values', 'StatisticValues')) != 1:
+                self._fail('PutMetricData', 'InvalidParameterCombination',
+                           'Exactly one of Value, Values or StatisticValues is required')
+            if len(datum.get('Dimensions', [])) > 30:
+                self._fail('PutMetricData', 'InvalidParameterValue', 'At most 30 dimensions per metric')
+        with self._lock:
+            for datum in MetricData:
+                self.published.append({'Namespace': Namespace, **copy.deepcopy(datum)})
+        return {}
+
+# ---------------------------------------------------------------------------
+# DynamoDB expressions
+# ---------------------------------------------------------------------------
+
+_MISSING = object()
+
+_TOKEN_RE = re.compile(r"\s*(<>|<=|>=|=|<|>|\(|\)|,|\.|\+|-|\[\d+\]|#[A-Za-z0-9_]+|:[A-Za-z0-9_]+|[A-Za-z_][A-Za-z0-9_\-]*)")
+
+def _tokenize(expression: str) -> List[str]:
+    tokens, pos = [], 0
+    expression = expression.strip()
+    while pos < len(expression):
+        match = _TOKEN_RE.match(expression, pos)
+        if not match:
+            raise ValueError(f"Cannot parse expression near: {expression[pos:]!r}")
+        tokens.append(match.group(1))
+        pos = match.end()
+    return tokens
+
+class _Parser:
+    """Recursive-descent parser for condition, key-condition and filter expressions"""
+
+    def __init__(self, expression: str, names: Optional[Dict[str, str]]):
+        self.tokens = _tokenize(expression)
+        self.pos = 0
+        self.names = names or {}
+
+    def peek(self, offset: int = 0) -> Optional[str]:
+        index = self.pos + offset
+        return self.tokens[index] if index < len(self.tokens) else None
+
+    def take(self, expected: Optional[str] = None) -> str:
+        token = self.peek()
+        if token is None or (expected is not None and token.upper() != expected):
+            raise ValueError(f"Expected {expected!r}, got {token!r}")
+        self.pos += 1
+        return token
+
+    def parse(self):
+        node = self.parse_or()
+        if self.peek() is not None:
+            raise ValueError(f"Unexpected token {self.peek()!r}")
+        return node
+
+    def parse_or(self):
+        node = self.parse_and()
+        while self.peek() and self.peek().upper() == 'OR':
+            self.take()
+            node = ('or', node, self.parse_and())
+        return node
+
+    def parse_and(self):
+        node = self.parse_not()
+        while self.peek() and self.peek().upper() == 'AND':
+            self.take()
+            node = ('and', node, self.parse_not())
+        return node
+
+    def parse_not(self):
+        if self.peek() and self.peek().upper() == 'NOT':
+            self.take()
+            return ('not', self.parse_not())
+        return self.parse_primary()
+
+    def parse_primary(self):
+        if self.peek() == '(':
+            self.take()
+            node = self.parse_or()
+            self.take(')')
+            return node
+        if self.peek(1) == '(' and not self.peek().startswith((':', '#')):
+            name = self.take().lower()
+            self.take('(')
+            args = [self.parse_operand()]
+            while self.peek() == ',':
+                self.take()
+                args.append(self.parse_operand())
+            self.take(')')
+            node = ('call', name, args)
+            if self.peek() in ('=', '<>', '<', '<=', '>', '>='):
+                return (self.take(), node, self.parse_operand())
+            return node
+        left = self.parse_operand()
+        token = self.peek()
+        if token in ('=', '<>', '<', '<=', '>', '>='):
+            return (self.take(), left, self.parse_operand())
+        if token and token.upper() == 'BETWEEN':
+            self.take()
+            low = self.parse_operand()
+            self.take('AND')
+            return ('between', left, low, self.parse_operand())
+        if token and token.upper() == 'IN':
+            self.take()
+            self.take('(')
+            options = [self.parse_operand()]
+            while self.peek() == ',':
+                self.take()
+                options.append(self.parse_operand())
+            self.take(')')
+            return ('in', left, options)
+        raise ValueError(f"Expected comparison after operand, got {token!r}")
+
+    def parse_operand(self):
+        token = self.peek()
+        if token is None:
+            raise ValueError("Unexpected end of expression")
+        if token.startswith(':'):
+            return ('value', self.take())
+        if self.peek(1) == '(' and not token.startswith('#'):
+            name = self.take().lower()
+            self.take('(')
+            args = [self.parse_operand()]
+            while self.peek() == ',':
+                self.take()
+                args.append(self.parse_operand())
+            self.take(')')
+            return ('call', name, args)
+        return ('path', self.parse_path())
+
+    def parse_path(self) -> List[Any]:
+        parts = [self.name(self.take())]
+        while self.peek() is not None and (self.peek() == '.' or self.peek().startswith('[')):
+            token = self.take()
+            if token == '.':
+                parts.append(self.name(self.take()))
+            else:
+                parts.append(int(token[1:-1]))
+        return parts
+
+    def name(self, token: str) -> str:
+        return self.names[token] if token.startswith('#') else token
+
+def _resolve(item: Dict[str, Any], path: List[Any]):
+    value: Any = item
+    for part in path:
+        if isinstance(part, int):
+            if not isinstance(value, list) or part >= len(value):
+                return _MISSING
+            value = value[part]
+        else:
+            if not isinstance(value, dict) or part not in value:
+                return _MISSING
+            value = value[part]
+    return value
+
+def _evaluate(node, item: Dict[str, Any], values: Dict[str, Any]):
+    kind = node[0]
+    if kind == 'value':
+        return values[node[1]]
+    if kind == 'path':
+        return _resolve(item, node[1])
+    if kind == 'and':
+        return _evaluate(node[1], item, values) and _evaluate(node[2], item, values)
+    if kind == 'or':
+        return _evaluate(node[1], item, values) or _evaluate(node[2], item, values)
+    if kind == 'not':
+        return not _evaluate(node[1], item, values)
+    if kind == 'call':
+        name, args = node[1], node[2]
+        if name == 'attribute_exists':
+            return _evaluate(args[0], item, values) is not _MISSING
+        if name == 'attribute_not_exists':
+            return _evaluate(args[0], item, values) is _MISSING
+        operands = [_evaluate(arg, item, values) for arg in args]
+        if name == 'if_not_exists':
+            return operands[1] if operands[0] is _MISSING else operands[0]
+        if any(operand is _MISSING for operand in operands):
+            return _MISSING if name == 'size' else False
+        if name == 'begins_with':
+            return isinstance(operands[0], (str, bytes)) and operands[0].startswith(operands[1])
+        if name == 'contains':
+            return operands[1] in operands[0]
+        if name == 'size':
+            return len(operands[0])
+        if name == 'list_append':
+            return list(operands[0]) + list(operands[1])
+        raise ValueError(f"Unsupported function: {name}")
+    if kind == 'between':
+        value, low, high = (_evaluate(n, item, values) for n in node[1:])
+        return _MISSING not in (value, low, high) and _comparable(value, low) and low <= value <= high
+    if kind == 'in':
+        value = _evaluate(node[1], item, values)
+        return value is not _MISSING and value in [_evaluate(n, item, values) for n in node[2]]
+    left = _evaluate(node[1], item, values)
+    right = _evaluate(node[2], item, values)
+    if left is _MISSING or right is _MISSING:
+        return kind == '<>' and not (left is _MISSING and right is _MISSING)
+    if kind == '=':
+        return left == right
+    if kind == '<>':
+        return left != right
+    if not _comparable(left, right):
+        return False
+    return {'<': left < right, '<=': left <= right, '>': left > right, '>=': left >= right}[kind]
+
+def _comparable(a, b) -> bool:
+    numbers = (int, Decimal)
+    return (isinstance(a, numbers) and isinstance(b, numbers)) or type(a) is type(b)
+
+def compile_condition(expression: Optional[str], names: Optional[Dict[str, str]] = None,
+                      values: Optional[Dict[str, Any]] = None) -> Callable[[Dict[str, Any]], bool]:
+    """Compile a DynamoDB condition/filter expression into an item predicate"""
+    if not expression:
+        return lambda item: True
+    tree = _Parser(expression, names).parse()
+    values = values or {}
+    return lambda item: bool(_evaluate(tree, item, values))
+
+def _parse_update(expression: str, names: Optional[Dict[str, str]]) -> List[Tuple[str, List[Any], Any]]:
+    """Parse an UpdateExpression into (clause, path, value node) actions"""
+    parser = _Parser(expression, names)
+    actions = []
+    while parser.peek() is not None:
+        clause = parser.take().upper()
+        if clause not in ('SET', 'ADD', 'REMOVE', 'DELETE'):
+            raise ValueError(f"Unknown update clause {clause!r}")
+        while True:
+            path = parser.parse_path()
+            if clause == 'SET':
+                parser.take('=')
+                value = parser.parse_operand()
+                if parser.peek() in ('+', '-'):
+                    value = ('arith', parser.take(), value, parser.parse_operand())
+                actions.append((clause, path, value))
+            elif clause == 'REMOVE':
+                actions.append((clause, path, None))
+            else:
+                actions.append((clause, path, parser.parse_operand()))
+            if parser.peek() != ',':
+                break
+            parser.take()
+    return actions
+
+def _update_value(node, item: Dict[str, Any], values: Dict[str, Any]):
+    if node[0] == 'arith':
+        left, right = _evaluate(node[2], item, values), _evaluate(node[3], item, values)
+        if left is _MISSING or right is _MISSING:
+            raise ValueError('An operand in the update expression does not exist')
+        return left + right if node[1] == '+' else left - right
+    value = _evaluate(node, item, values)
+    if value is _MISSING:
+        raise ValueError('An operand in the update expression does not exist')
+    return value
+
+def _apply_update(item: Dict[str, Any], actions, values: Dict[str, Any]) -> Dict[str, Any]:
+    """Return a copy of item with the parsed update actions applied"""
+    new = copy.deepcopy(item)
+    for clause, path, node in actions:
+        parent = new
+        for part in path[:-1]:
+            parent = parent[part]
+        leaf = path[-1]
+        current = parent.get(leaf, _MISSING) if isinstance(parent, dict) else _MISSING
+        if clause == 'SET':
+            parent[leaf] = copy.deepcopy(_update_value(node, item, values))
+        elif clause == 'REMOVE':
+            if isinstance(parent, dict):
+                parent.pop(leaf, None)
+            elif leaf < len(parent):
+                parent.pop(leaf)
+        elif clause == 'ADD':
+            operand = _evaluate(node, item, values)
+            if isinstance(operand, set):
+                parent[leaf] = (set() if current is _MISSING else set(current)) | operand
+            else:
+                parent[leaf] = (Decimal(0) if current is _MISSING else current) + operand
+        else:
+            if current is not _MISSING:
+                remaining = set(current) - _evaluate(node, item, values)
+                if remaining:
+                    parent[leaf] = remaining
+                else:
+                    del parent[leaf]
+    return new
+
+def _split_key_condition(tree, hash_key: str):
+    """Return (hash value node, remaining range-key condition) from a key condition tree"""
+    if tree[0] == '=' and tree[1][0] == 'path' and tree[1][1] == [hash_key]:
+        return tree[2], None
+    if tree[0] == 'and':
+        for first, second in ((tree[1], tree[2]), (tree[2], tree[1])):
+            if first[0] == '=' and first[1][0] == 'path' and first[1][1] == [hash_key]:
+                return first[2], second
+    raise ValueError(f"Key condition must test {hash_key} for equality")
+
+_PROJECTIONS: Dict[Any, List[List[Any]]] = {}
+
+def _projection_paths(expression: str, names: Optional[Dict[str, str]]) -> List[List[Any]]:
+    """Parsed paths of a ProjectionExpression, cached since scans apply one per item"""
+    key = (expression, tuple(sorted((names or {}).items())))
+    paths = _PROJECTIONS.get(key)
+    if paths is None:
+        paths = [_Parser(raw, names).parse_path() for raw in expression.split(',')]
+        _PROJECTIONS[key] = paths
+    return paths
+
+def project(item: Dict[str, Any], expression: Optional[str], names: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """Apply a ProjectionExpression to an item"""
+    if not expression:
+        return item
+    result: Dict[str, Any] = {}
+    for path in _projection_paths(expression, names):
+        value = _resolve(item, path)
+        if value is _MISSING:
+            continue
+        target = result
+        for part in path[:-1]:
+            target = target.setdefault(part, {})
+        target[path[-1]] = value
+    return result
+
+def _check_types(value):
+    """Reject Python floats the way boto3's TypeSerializer does"""
+    if isinstance(value, float):
+        raise TypeError('Float types are not supported. Use Decimal types instead.')
+    if isinstance(value, dict):
+        for v in value.values():
+            _check_types(v)
+    elif isinstance(value, (list, set, tuple)):
+        for v in value:
+            _check_types(v)
+
+def _normalize_numbers(value):
+    """Return ints as Decimal, matching what the resource API reads back"""
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int):
+        return Decimal(value)
+    if isinstance(value, dict):
+        return {k: _normalize_numbers(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_normalize_numbers(v) for v in value]
+    if isinstance(value, set):
+        return {_normalize_numbers(v) for v in value}
+    return value
+
+# ---------------------------------------------------------------------------
+# DynamoDB tables
+# ---------------------------------------------------------------------------
+
+class _Partition:
+    __slots__ = ('keys', 'items')
+
+    def __init__(self):
+        self.keys: List[Any] = []
+        self.items: Dict[Any, Any] = {}
+
+class _KeyedStore:
+    """Items grouped by hash key with range keys kept sorted"""
+
+    def __init__(self, hash_key: str, range_key: Optional[str], projection: Optional[Tuple[str, ...]] = None):
+        self.hash_key = hash_key
+        self.range_key = range_key
+        # GSI INCLUDE projection: non-key attributes copied into the index; None projects ALL
+        self.projection = projection
+        self.partitions: Dict[Any, _Partition] = {}
+        self.order: List[Any] = []
+        self.position: Dict[Any, int] = {}
+
+    def put(self, hash_value, range_value, value):
+        partition = self.partitions.get(hash_value)
+        if partition is None:
+            partition = self.partitions[hash_value] = _Partition()
+            self.position[hash_value] = len(self.order)
+            self.order.append(hash_value)
+        if range_value not in partition.items:
+            insort(partition.keys, range_value)
+        partition.items[range_value] = value
+
+    def remove(self, hash_value, range_value):
+        partition = self.partitions.get(hash_value)
+        if partition is None or range_value not in partition.items:
+            return
+        del partition.items[range_value]
+        if range_value is None:
+            partition.keys.remove(None)  # hash-only table; None does not order
+        else:
+            del partition.keys[bisect_left(partition.keys, range_value)]
+
+class FakeTable:
+    """In-memory DynamoDB table exposing the resource-level Table API.
+
+    ``page_items`` plays the role of DynamoDB's 1 MB page limit so callers
+    exercise ``LastEvaluatedKey`` handling.
+    """
+
+    def __init__(self, name: str, hash_key: str, range_key: Optional[str] = None,
+                 indexes: Optional[Dict[str, Tuple]] = None,
+                 backend: Optional[FakeBackend] = None, page_items: int = 1000):
+        self.name = name
+        self.hash_key = hash_key
+        self.range_key = range_key
+        self.backend = backend or FakeBackend()
+        self.page_items = page_items
+        self._lock = threading.RLock()
+        self._store = _KeyedStore(hash_key, range_key)
+        self._indexes = {index: _KeyedStore(*schema) for index, schema in (indexes or {}).items()}
+        self.consumed_write_units = 0.0
+        self.consumed_read_units = 0.0
+
+    @property
+    def table_name(self) -> str:
+        return self.name
+
+    @property
+    def meta(self):
+        return _Meta(self.backend)
+
+    @property
+    def item_count(self) -> int:
+        return sum(len(p.items) for p in self._store.partitions.values())
+
+    def _key_of(self, item: Dict[str, Any]) -> Tuple[Any, Any]:
+        try:
+            hash_value = item[self.hash_key]
+            range_value = item[self.range_key] if self.range_key else None
+        except KeyError as e:
+            self.backend._fail('PutItem', 'ValidationException', f"Missing key attribute {e}")
+        return hash_value, range_value
+
+    def _primary_key(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        key = {self.hash_key: item[self.hash_key]}
+        if self.range_key:
+            key[self.range_key] = item[self.range_key]
+        return key
+
+    def _get(self, hash_value, range_value):
+        partition = self._store.partitions.get(hash_value)
+        return partition.items.get(range_value) if partition else None
+
+    def _write(self, item: Dict[str, Any]):
+        hash_value, range_value = self._key_of(item)
+        old = self._get(hash_value, range_value)
+        if old is not None:
+            self._unindex(old)
+        self._store.put(hash_value, range_value, item)
+        for index in self._indexes.values():
+            if index.hash_key in item and (index.range_key is None or index.range_key in item):
+                index_range = item[index.range_key] if index.range_key else None
+                index.put(item[index.hash_key], (index_range, hash_value, range_value), self._index_image(index, item))
+        self.consumed_write_units += max(1.0, math.ceil(len(repr(item)) / 1024))
+        return old
+
+    def _index_image(self, index: _KeyedStore, item: Dict[str, Any]) -> Dict[str, Any]:
+        """The copy of item a GSI holds: table and index keys plus the projected attributes"""
+        if index.projection is None:
+            return item
+        keep = {self.hash_key, self.range_key, index.hash_key, index.range_key, *index.projection}
+        return {name: value for name, value in item.items() if name in keep}
+
+    def _unindex(self, item: Dict[str, Any]):
+        hash_value, range_value = self._key_of(item)
+        for index in self._indexes.values():
+            if index.hash_key in item and (index.range_key is None or index.range_key in item):
+                index_range = item[index.range_key] if index.range_key else None
+                index.remove(item[index.hash_key], (index_range, hash_value, range_value))
+
+    def _check_condition(self, operation, current, ConditionExpression, names, values):
+        if ConditionExpression and not compile_condition(ConditionExpression, names, values)(current or {}):
+            self.backend._fail(operation, 'ConditionalCheckFailedException', 'The conditional request failed')
+
+    def put_item(self, Item: Dict[str, Any], ConditionExpression: Optional[str] = None,
+                 ExpressionAttributeNames=None, ExpressionAttributeValues=None, **kwargs):
+        self.backend._simulate('PutItem')
+        _check_types(Item)
+        item = _normalize_numbers(copy.deepcopy(Item))
+        with self._lock:
+            current = self._get(*self._key_of(item))
+            self._check_condition('PutItem', current, ConditionExpression,
+                                  ExpressionAttributeNames, ExpressionAttributeValues)
+            self._write(item)
+        return {}
+
+    def get_item(self, Key: Dict[str, Any], ProjectionExpression: Optional[str] = None,
+                 ExpressionAttributeNames=None, ConsistentRead: bool = False, **kwargs):
+        self.backend._simulate('GetItem')
+        with self._lock:
+            item = self._get(*self._key_of(_normalize_numbers(Key)))
+            self.consumed_read_units += 0.5 if not ConsistentRead else 1.0
+            if item is None:
+                return {}
+            return {'Item': copy.deepcopy(project(item, ProjectionExpression, ExpressionAttributeNames))}
+
+    def update_item(self, Key: Dict[str, Any], UpdateExpression: str,
+                    ConditionExpression: Optional[str] = None, ExpressionAttributeNames=None,
+                    ExpressionAttributeValues=None, ReturnValues: str = 'NONE', **kwargs):
+        self.backend._simulate('UpdateItem')
+        _check_types(ExpressionAttributeValues or {})
+        values = _normalize_numbers(copy.deepcopy(ExpressionAttributeValues or {}))
+        actions = _parse_update(UpdateExpression, ExpressionAttributeNames)
+        key = _normalize_numbers(copy.deepcopy(Key))
+        with self._lock:
+            current = self._get(*self._key_of(key))
+            self._check_condition('UpdateItem', current, ConditionExpression,
+                                  ExpressionAttributeNames, values)
+            try:
+                new = _apply_update(current or key, actions, values)
+            except (ValueError, TypeError, KeyError) as e:
+                self.backend._fail('UpdateItem', 'ValidationException', str(e))
+            if self._key_of(new) != self._key_of(key):
+                self.backend._fail('UpdateItem', 'ValidationException', 'Cannot update attribute of the key')
+            self._write(new)
+        if ReturnValues == 'ALL_NEW':
+            return {'Attributes': copy.deepcopy(new)}
+        if ReturnValues == 'ALL_OLD' and current is not None:
+            return {'Attributes': copy.deepcopy(current)}
+        if ReturnValues == 'UPDATED_NEW':
+            touched = {path[0] for _, path, _ in actions}
+            return {'Attributes': {k: copy.deepcopy(v) for k, v in new.items() if k in touched}}
+        return {}
+
+    def delete_item(self, Key: Dict[str, Any], ConditionExpression: Optional[str] = None,
+                    ExpressionAttributeNames=None, ExpressionAttributeValues=None, **kwargs):
+        self.backend._simulate('DeleteItem')
+        with self._lock:
+            hash_value, range_value = self._key_of(_normalize_numbers(Key))
+            current = self._get(hash_value, range_value)
+            self._check_condition('DeleteItem', current, ConditionExpression,
+                                  ExpressionAttributeNames, ExpressionAttributeValues)
+            if current is not None:
+                self._unindex(current)
+                self._store.remove(hash_value, range_value)
+                self.consumed_write_units += 1.0
+        return {}
+
+    def query(self, KeyConditionExpression: str, ExpressionAttributeValues: Optional[Dict[str, Any]] = None,
+              ExpressionAttributeNames: Optional[Dict[str, str]] = None, IndexName: Optional[str] = None,
+              FilterExpression: Optional[str] = None, ProjectionExpression: Optional[str] = None,
+              Limit: Optional[int] = None, ScanIndexForward: bool = True,
+              ExclusiveStartKey: Optional[Dict[str, Any]] = None, Select: Optional[str] = None, **kwargs):
+        self.backend._simulate('Query')
+        values = _normalize_numbers(ExpressionAttributeValues or {})
+        store = self._indexes[IndexName] if IndexName else self._store
+        tree = _Parser(KeyConditionExpression, ExpressionAttributeNames).parse()
+        hash_node, range_tree = _split_key_condition(tree, store.hash_key)
+        hash_value = _evaluate(hash_node, {}, values)
+        range_filter = (lambda item: bool(_evaluate(range_tree, item, values))) if range_tree else None
+        item_filter = compile_condition(FilterExpression, ExpressionAttributeNames, values)
+
+        with self._lock:
+            partition = store.partitions.get(hash_value)
+            keys = partition.keys if partition else []
+            if ExclusiveStartKey:
+                start = self._store_key(store, _normalize_numbers(ExclusiveStartKey))
+                keys = keys[bisect_right(keys, start):] if ScanIndexForward else keys[:bisect_left(keys, start)]
+            keys = list(keys) if ScanIndexForward else keys[::-1]
+            return self._page(store, partition, keys, range_filter, item_filter, Limit, Select,
+                              ProjectionExpression, ExpressionAttributeNames)
+
+    def _store_key(self, store: _KeyedStore, key: Dict[str, Any]):
+        if store is self._store:
+            return key[self.range_key] if self.range_key else None
+        index_range = key[store.range_key] if store.range_key else None
+        return (index_range, key[self.hash_key], key[self.range_key] if self.range_key else None)
+
+    def _page(self, store, partition, keys, range_filter, item_filter, limit, select,
+              projection, names):
+        items, scanned, last = [], 0, None
+        budget = min(limit or self.page_items, self.page_items)
+        for key in keys:
+            item = partition.items[key]
+            if range_filter and not range_filter(item):
+                continue
+            scanned += 1
+            if item_filter(item):
+                items.append(copy.deepcopy(project(item, projection, names)))
+            if scanned >= budget:
+                last = item
+                break
+        if last is not None and keys and partition.items[keys[-1]] is last:
+            last = None
+        self.consumed_read_units += max(0.5, scanned * 0.5)
+        return self._result(store, items, scanned, last, select)
+
+    def _result(self, store, items, scanned, last, select):
+        response: Dict[str, Any] = {'Count': len(items), 'ScannedCount': scanned}
+        if select != 'COUNT':
+            response['Items'] = items
+        if last is not None:
+            key = self._primary_key(last)
+            if store is not self._store:
+                key[store.hash_key] = last[store.hash_key]
+                if store.range_key:
+                    key[store.range_key] = last[store.range_key]
+            response['LastEvaluatedKey'] = copy.deepcopy(key)
+        return response
+
+    def scan(self, FilterExpression: Optional[str] = None, ExpressionAttributeNames: Optional[Dict[str, str]] = None,
+             ExpressionAttributeValues: Optional[Dict[str, Any]] = None, ProjectionExpression: Optional[str] = None,
+             IndexName: Optional[str] = None, Limit: Optional[int] = None,
+             ExclusiveStartKey: Optional[Dict[str, Any]] = None, Segment: Optional[int] = None,
+             TotalSegments: Optional[int] = None, Select: Optional[str] = None, **kwargs):
+        self.backend._simulate('Scan')
+        values = _normalize_numbers(ExpressionAttributeValues or {})
+        item_filter = compile_condition(FilterExpression, ExpressionAttributeNames, values)
+        store = self._indexes[IndexName] if IndexName else self._store
+        budget = min(Limit or self.page_items, self.page_items)
+
+        with self._lock:
+            order_index, start_key = 0, None
+            if ExclusiveStartKey:
+                start = _normalize_numbers(ExclusiveStartKey)
+                order_index = store.position[start[store.hash_key]]
+                start_key = self._store_key(store, start)
+            items, scanned, last = [], 0, None
+            while order_index < len(store.order) and last is None:
+                hash_value = store.order[order_index]
+                order_index += 1
+                if TotalSegments and zlib.crc32(repr(hash_value).encode()) % TotalSegments != Segment:
+                    continue
+                partition = store.partitions[hash_value]
+                keys = partition.keys
+                if start_key is not None:
+                    keys = keys[bisect_right(keys, start_key):]
+                    start_key = None
+                for key in keys:
+                    item = partition.items[key]
+                    scanned += 1
+                    if item_filter(item):
+                        items.append(copy.deepcopy(project(item, ProjectionExpression, ExpressionAttributeNames)))
+                    if scanned >= budget:
+                        last = item
+                        break
+            if last is not None and not self._has_more(store, order_index, last, Segment, TotalSegments):
+                last = None
+            self.consumed_read_units += max(0.5, scanned * 0.5)
+            return self._result(store, items, scanned, last, Select)
+
+    def _has_more(self, store, order_index, last, segment, total_segments) -> bool:
+        partition = store.partitions[last[store.hash_key]]
+        if partition.keys and partition.items[partition.keys[-1]] is not last:
+            return True
+        for hash_value in store.order[order_index:]:
+            if total_segments and zlib.crc32(repr(hash_value).encode()) % total_segments != segment:
+                continue
+            if store.partitions[hash_value].keys:
+                return True
+        return False
+
+    def batch_writer(self, overwrite_by_pkeys: Optional[List[str]] = None):
+        return _FakeBatchWriter(self)
+
+    def load(self, items: List[Dict[str, Any]]):
+        """Bulk-load fixture items without latency or fault injection"""
+        with self._lock:
+            for item in items:
+                _check_types(item)
+                self._write(_normalize_numbers(copy.deepcopy(item)))
+
+class _FakeBatchWriter:
+    def __init__(self, table: FakeTable):
+        self.table = table
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def put_item(self, Item: Dict[str, Any]):
+        self.table.put_item(Item=Item)
+
+    def delete_item(self, Key: Dict[str, Any]):
+        self.table.delete_item(Key=Key)
+
+# Key schemas of the tables defined in infrastructure.yaml and chatbot-infrastructure.yaml
+DEFAULT_SCHEMAS: Dict[str, Dict[str, Any]] = {
+    'chatbot-history': {'hash_key': 'sessionId', 'range_key': 'timestamp',
+                        'indexes': {'hour-bucket-index': ('hb', 'timestamp', ('v', 'l', 's', 'r', 'f', 'h', 'metadata'))}},
+    'chatbot-faq': {'hash_key': 'category', 'range_key': 'question'},
+    'chatbot-sessions': {'hash_key': 'session_id', 'range_key': 'timestamp'},
+    'chatbot-analytics': {'hash_key': 'id',
+                          'indexes': {'date-index': ('date', None),
+                                      'date-index-v2': ('date', None, ('sentiment', 'language', 'timestamp',
+                                                                       'session_id', 'latency_ms'))}},
+    'chatbot-analytics-daily': {'hash_key': 'scope', 'range_key': 'date'},
+    'shop-catalog': {'hash_key': 'productId',
+                     'indexes': {'stock-hour-index': ('stockHour', 'updatedAt', ('name', 'stockQuantity', 'inStock'))}},
+    'chatbot-rollups': {'hash_key': 'pk', 'range_key': 'sk'},
+}
+
+class _Meta:
+    def __init__(self, client):
+        self.client = client
+
+class FakeDynamoDB(FakeBackend):
+    """Stand-in for ``boto3.resource('dynamodb')``; tables are created on first use"""
+
+    service_name = 'dynamodb'
+    throttle_code = 'ProvisionedThroughputExceededException'
+
+    def __init__(self, schemas: Optional[Dict[str, Dict[str, Any]]] = None, page_items: int = 1000,
+                 write_capacity: Optional[float] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.schemas = dict(DEFAULT_SCHEMAS)
+        self.schemas.update(schemas or {})
+        self.page_items = page_items
+        self.tables: Dict[str, FakeTable] = {}
+        self._lock = threading.Lock()
+        # Provisioned write units per second per table, with one second of
+        # burst; only BatchWriteItem enforces it, by leaving items unprocessed
+        self.write_capacity = write_capacity
+        self._write_tokens: Dict[str, Tuple[float, float]] = {}
+
+    def take_write_units(self, table_name: str, units: float) -> bool:
+        if self.write_capacity is None:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            tokens, updated = self._write_tokens.get(table_name, (self.write_capacity, now))
+            tokens = min(self.write_capacity, tokens + (now - updated) * self.write_capacity)
+            allowed = tokens >= units
+            self._write_tokens[table_name] = (tokens - units if allowed else tokens, now)
+            return allowed
+
+    def create_table(self, name: str, hash_key: str, range_key: Optional[str] = None,
+                     indexes: Optional[Dict[str, Tuple]] = None) -> FakeTable:
+        with self._lock:
+            table = FakeTable(name, hash_key, range_key, indexes, backend=self, page_items=self.page_items)
+            self.tables[name] = table
+            return table
+
+    @property
+    def meta(self):
+        # boto3 resources expose their (Python-typed) client as meta.client
+        return _Meta(self)
+
+    def transact_write_items(self, TransactItems: List[Dict[str, Any]], **kwargs):
+        """All-or-nothing Put/Update/Delete/ConditionCheck across tables, with
+        CancellationReasons in the error when a condition fails"""
+        if not 1 <= len(TransactItems) <= 100:
+            self._fail('TransactWriteItems', 'ValidationException', 'TransactItems must contain 1 to 100 items')
+        self._simulate('TransactWriteItems')
+        operations = []
+        for entry in TransactItems:
+            (kind, params), = entry.items()
+            operations.append((kind, self.Table(params['TableName']), params))
+        tables = sorted({id(table): table for _, table, _ in operations}.values(), key=lambda table: table.name)
+        for table in tables:
+            table._lock.acquire()
+        try:
+            reasons, staged = [], []
+            for kind, table, params in operations:
+                names = params.get('ExpressionAttributeNames')
+                values = _normalize_numbers(copy.deepcopy(params.get('ExpressionAttributeValues') or {}))
+                _check_types(values)
+                if kind == 'Put':
+                    _check_types(params['Item'])
+                    item = _normalize_numbers(copy.deepcopy(params['Item']))
+                    key = table._key_of(item)
+                else:
+                    item = _normalize_numbers(copy.deepcopy(params['Key']))
+                    key = table._key_of(item)
+                current = table._get(*key)
+                condition = params.get('ConditionExpression')
+                passed = not condition or compile_condition(condition, names, values)(current or {})
+                reasons.append({'Code': 'None' if passed else 'ConditionalCheckFailed'})
+                staged.append((kind, table, params, item, key, current, names, values))
+            if any(reason['Code'] != 'None' for reason in reasons):
+                with self._stats_lock:
+                    self.failures['TransactionCanceledException'] = self.failures.get('TransactionCanceledException', 0) + 1
+                raise ClientError({'Error': {'Code': 'TransactionCanceledException',
+                                             'Message': 'Transaction cancelled, please refer cancellation reasons'},
+                                   'CancellationReasons': reasons,
+                                   'ResponseMetadata': {'HTTPStatusCode': 400}}, 'TransactWriteItems')
+            for kind, table, params, item, key, current, names, values in staged:
+                if kind == 'Put':
+                    table._write(item)
+                elif kind == 'Update':
+                    actions = _parse_update(params['UpdateExpression'], names)
+                    table._write(_apply_update(current or item, actions, values))
+                elif kind == 'Delete' and current is not None:
+                    table._unindex(current)
+                    table._store.remove(*key)
+        finally:
+            for table in reversed(tables):
+                table._lock.release()
+        return {}
+
+    def Table(self, name: str) -> FakeTable:
+        with self._lock:
+            table = self.tables.get(name)
+        if table is not None:
+            return table
+        schema = self._schema_for(name)
+        return self.create_table(name, schema['hash_key'], schema.get('range_key'), schema.get('indexes'))
+
+    def _schema_for(self, name: str) -> Dict[str, Any]:
+        if name in self.schemas:
+            return self.schemas[name]
+        # Stack tables carry an environment prefix, e.g. prod-chatbot-history
+        for suffix, schema in self.schemas.items():
+            if name.endswith('-' + suffix) or name.endswith(suffix):
+                return schema
+        raise ValueError(f"No key schema registered for table {name!r}")
+
+def deserialize_value(value: Dict[str, Any]):
+    """Convert one DynamoDB wire-format attribute value to its resource-API form"""
+    (kind, data), = value.items()
+    if kind == 'S' or kind == 'B':
+        return data
+    if kind == 'N':
+        return Decimal(data)
+    if kind == 'BOOL':
+        return data
+    if kind == 'NULL':
+        return None
+    if kind == 'M':
+        return {k: deserialize_value(v) for k, v in data.items()}
+    if kind == 'L':
+        return [deserialize_value(v) for v in data]
+    if kind == 'SS' or kind == 'BS':
+        return set(data)
+    if kind == 'NS':
+        return {Decimal(v) for v in data}
+    raise ValueError(f"Unknown attribute type {kind!r}")
+
+def deserialize_item(item: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    return {k: deserialize_value(v) for k, v in item.items()}
+
+class FakeDynamoDBClient:
+    """Stand-in for ``boto3.client('dynamodb')`` sharing tables with a FakeDynamoDB resource"""
+
+    def __init__(self, resource: FakeDynamoDB):
+        self.resource = resource
+
+    def put_item(self, TableName: str, Item: Dict[str, Dict[str, Any]], **kwargs):
+        for value in Item.values():
+            if not isinstance(value, dict) or len(value) != 1:
+                self.resource._fail('PutItem', 'ValidationException', 'Item values must be typed attribute values')
+        return self.resource.Table(TableName).put_item(Item=deserialize_item(Item), **kwargs)
+
+    def batch_write_item(self, RequestItems: Dict[str, List[Dict[str, Any]]], ReturnConsumedCapacity: str = 'NONE',
+                         **kwargs):
+        """Up to 25 puts/deletes. Requests over the table's write_capacity, or
+        picked at the throttle rate, come back in UnprocessedItems."""
+        requests = [(name, request) for name, table_requests in RequestItems.items() for request in table_requests]
+        if not 1 <= len(requests) <= 25:
+            self.resource._fail('BatchWriteItem', 'ValidationException', 'RequestItems must contain 1 to 25 requests')
+        self.resource._simulate('BatchWriteItem')
+        seen = set()
+        unprocessed: Dict[str, List[Dict[str, Any]]] = {}
+        consumed: Dict[str, float] = {}
+        for name, request in requests:
+            table = self.resource.Table(name)
+            if 'PutRequest' in request:
+                item = _normalize_numbers(deserialize_item(request['PutRequest']['Item']))
+                key = table._key_of(item)
+            else:
+                key = table._key_of(deserialize_item(request['DeleteRequest']['Key']))
+            if (name, key) in seen:
+                self.resource._fail('BatchWriteItem', 'ValidationException',
+                                    'Provided list of item keys contains duplicates')
+            seen.add((name, key))
+
+        for name, request in requests:
+            table = self.resource.Table(name)
+            units = max(1.0, math.ceil(len(repr(request)) / 1024))
+            with self.resource._stats_lock:
+                throttled = self.resource.rng.random() < self.resource.throttle_rate
+            if throttled or not self.resource.take_write_units(name, units):
+                unprocessed.setdefault(name, []).append(request)
+                continue
+            with table._lock:
+                before = table.consumed_write_units
+                if 'PutRequest' in request:
+                    table._write(_normalize_numbers(deserialize_item(request['PutRequest']['Item'])))
+                else:
+                    current = table._get(*table._key_of(deserialize_item(request['DeleteRequest']['Key'])))
+                    if current is not None:
+                        table._unindex(current)
+                        table._store.remove(*table._key_of(current))
+                    table.consumed_write_units += units
+                consumed[name] = consumed.get(name, 0.0) + table.consumed_write_units - before
+
+        response: Dict[str, Any] = {'UnprocessedItems': unprocessed}
+        if ReturnConsumedCapacity != 'NONE':
+            response['ConsumedCapacity'] = [{'TableName': name, 'CapacityUnits': units}
+                                            for name, units in consumed.items()]
+        return response
+
+    def get_item(self, TableName: str, Key: Dict[str, Dict[str, Any]], **kwargs):
+        from boto3.dynamodb.types import TypeSerializer
+        response = self.resource.Table(TableName).get_item(Key=deserialize_item(Key), **kwargs)
+        if 'Item' in response:
+            serializer = TypeSerializer()
+            response['Item'] = {k: serializer.serialize(v) for k, v in response['Item'].items()}
+        return response
+
+# ---------------------------------------------------------------------------
+# Wiring
+# ---------------------------------------------------------------------------
+
+def load_fixture(path: str, variable: str) -> List[Dict[str, Any]]:
+    """Read a list literal (e.g. faq_data) out of a seed script without running it"""
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), path)
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(getattr(t, 'id', None) == variable for t in node.targets):
+            return eval(compile(ast.Expression(node.value), path, 'eval'), {'Decimal': Decimal})
+    raise ValueError(f"{variable} not found in {path}")
+
+FAQ_FIXTURES = [
+    ('seed_faq.py', 'faq_data'),
+    ('seed_comprehensive_faq.py', 'comprehensive_faq'),
+    ('add_malay_faq.py', 'malay_faq'),
+]
+
+def faq_fixture() -> List[Dict[str, Any]]:
+    """All FAQ items from the seed scripts"""
+    items = []
+    for filename, variable in FAQ_FIXTURES:
+        items.extend(load_fixture(os.path.join(SCRIPTS_DIR, filename), variable))
+    return items
+
+# Typical per-call latencies observed from ap-southeast-1, in milliseconds
+PROFILES: Dict[str, Dict[str, Tuple[str, Dict[str, float]]]] = {
+    'instant': {},
+    'realistic': {
+        'bedrock': ('lognormal', {'median': 900, 'sigma': 0.45}),
+        'comprehend': ('lognormal', {'median': 45, 'sigma': 0.35}),
+        'translate': ('lognormal', {'median': 70, 'sigma': 0.35}),
+        'dynamodb': ('lognormal', {'median': 6, 'sigma': 0.4}),
+        'events': ('lognormal', {'median': 18, 'sigma': 0.4}),
+        'cloudwatch': ('lognormal', {'median': 20, 'sigma': 0.4}),
+    },
+    'fast': {
+        'bedrock': ('lognormal', {'median': 90, 'sigma': 0.45}),
+        'comprehend': ('lognormal', {'median': 4.5, 'sigma': 0.35}),
+        'translate': ('lognormal', {'median': 7, 'sigma': 0.35}),
+        'dynamodb': ('lognormal', {'median': 0.6, 'sigma': 0.4}),
+        'events': ('lognormal', {'median': 1.8, 'sigma': 0.4}),
+        'cloudwatch': ('lognormal', {'median': 2, 'sigma': 0.4}),
+    },
+}
+
+class FakeAWS:
+    """One set of fake clients, attribute-compatible with the handler modules"""
+
+    def __init__(self, bedrock: Optional[FakeBedrock] = None, comprehend: Optional[FakeComprehend] = None,
+                 translate: Optional[FakeTranslate] = None, dynamodb: Optional[FakeDynamoDB] = None,
+                 events: Optional[FakeEvents] = None, cloudwatch: Optional[FakeCloudWatch] = None):
+        self.bedrock = bedrock or FakeBedrock()
+        self.comprehend = comprehend or FakeComprehend()
+        self.translate = translate or FakeTranslate()
+        self.dynamodb = dynamodb or FakeDynamoDB()
+        self.dynamodb_client = FakeDynamoDBClient(self.dynamodb)
+        self.events = events or FakeEvents()
+        self.cloudwatch = cloudwatch or FakeCloudWatch()
+
+    @classmethod
+    def from_profile(cls, profile: str = 'instant', seed: Optional[int] = None,
+                     throttle_rate: float = 0.0, error_rate: float = 0.0) -> 'FakeAWS':
+        """Build fakes with a named latency profile and uniform fault rates"""
+        settings = PROFILES[profile]
+        rng = random.Random(seed)
+
+        def options(service: str) -> Dict[str, Any]:
+            latency = None
+            if service in settings:
+                distribution, params = settings[service]
+                latency = LatencyModel(distribution, rng=random.Random(rng.random()), **params)
+            return {'latency': latency, 'throttle_rate': throttle_rate, 'error_rate': error_rate,
+                    'seed': rng.randrange(2 ** 32)}
+
+        return cls(
+            bedrock=FakeBedrock(**options('bedrock')),
+            comprehend=FakeComprehend(**options('comprehend')),
+            translate=FakeTranslate(**options('translate')),
+            dynamodb=FakeDynamoDB(**options('dynamodb')),
+            events=FakeEvents(**options('events')),
+            cloudwatch=FakeCloudWatch(**options('cloudwatch')),
+        )
+
+    def seed_faq(self, table_name: str = 'prod-chatbot-faq') -> FakeTable:
+        table = self.dynamodb.Table(table_name)
+        table.load(faq_fixture())
+        return table
+
+    def seed_catalog(self, table_name: str = 'prod-shop-catalog', now: Optional[float] = None) -> FakeTable:
+        """The sample catalog from scripts/seed_products.py, stamped as changed at now"""
+        from seed_products import products
+        from stock_availability import stock_update
+        table = self.dynamodb.Table(table_name)
+        table.load([dict(product, **stock_update(product['stockQuantity'], now)) for product in products])
+        return table
+
+    def clients(self) -> Dict[str, Any]:
+        return {
+            'bedrock': self.bedrock,
+            'comprehend': self.comprehend,
+            'translate': self.translate,
+            'dynamodb': self.dynamodb,
+            'dynamodb_client': self.dynamodb_client,
+            'events': self.events,
+            'cloudwatch': self.cloudwatch,
+        }
+
+    def call_counts(self) -> Dict[str, Dict[str, int]]:
+        return {name: dict(client.calls) for name, client in self.clients().items() if hasattr(client, 'calls')}
+
+def install(module, backends: FakeAWS) -> Dict[str, Any]:
+    """Point a handler module's client globals at the fakes; returns the originals"""
+    originals = {}
+    for name, client in backends.clients().items():
+        if hasattr(module, name):
+            originals[name] = getattr(module, name)
+            setattr(module, name, client)
+    # Container-level publishers and snapshots hold the clients they were built with
+    publisher = getattr(module, 'event_publisher', None)
+    if publisher is not None:
+        originals['event_publisher.events'] = publisher.events
+        publisher.events = backends.events
+    stock = getattr(module, 'stock', None)
+    if stock is not None:
+        originals['stock.table'] = stock.table
+        stock.table = backends.dynamodb.Table(stock.table.name)
+    return originals
+
+HANDLER_ENVIRONMENT = {
+    'CHAT_HISTORY_TABLE': 'prod-chatbot-history',
+    'FAQ_TABLE': 'prod-chatbot-faq',
+    'EVENT_BUS_NAME': 'prod-chatbot-events',
+    'ROLLUP_TABLE': 'prod-chatbot-rollups',
+    'CATALOG_TABLE': 'prod-shop-catalog',
+    'AWS_DEFAULT_REGION': 'ap-southeast-1',
+}
+
+def prepare_environment():
+    """Set the environment the handler modules read at import time"""
+    for key, value in HANDLER_ENVIRONMENT.items():
+        os.environ.setdefault(key, value)
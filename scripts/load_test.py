@@ -0,0 +1,447 @@
+"""Concurrent load generator for the chatbot.
+
+Drives either a deployed API Gateway endpoint over HTTP or a handler's
+``lambda_handler`` in-process (backed by scripts/fake_backends.py), and
+reports latency percentiles from an HDR-style histogram.
+
+    # 20 users, each sending its next message as soon as the last one returns
+    python scripts/load_test.py inprocess --handler chatbot_handler --concurrency 20 --duration 30
+
+    # Open loop: 50 requests/second regardless of how fast replies come back
+    python scripts/load_test.py http --url https://abc.execute-api.ap-southeast-1.amazonaws.com/prod \\
+        --rate 50 --duration 60 --output run.json
+
+    # Compare two runs
+    python scripts/load_test.py compare baseline.json run.json
+"""
+import argparse
+import importlib
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(SCRIPTS_DIR)
+LAMBDA_DIR = os.path.join(REPO_DIR, 'lambda')
+
+# ---------------------------------------------------------------------------
+# Histogram
+# ---------------------------------------------------------------------------
+
+class LatencyHistogram:
+    """Log-linear histogram of latencies in microseconds.
+
+    Values below 256us are exact; above that each power of two is split into
+    128 sub-buckets, so any reported value is within 0.8% of the true one.
+    Recording is O(1) and histograms from different threads or runs merge
+    by adding counts.
+    """
+
+    SUB_BUCKET_BITS = 8
+    HALF = 1 << (SUB_BUCKET_BITS - 1)
+
+    def __init__(self):
+        self.counts: Dict[int, int] = {}
+        self.total = 0
+        self.sum_us = 0
+        self.min_us: Optional[int] = None
+        self.max_us = 0
+
+    @classmethod
+    def _index(cls, value: int) -> int:
+        magnitude = max(0, value.bit_length() - cls.SUB_BUCKET_BITS)
+        return magnitude * cls.HALF + (value >> magnitude)
+
+    @classmethod
+    def _highest_equivalent(cls, index: int) -> int:
+        if index < 2 * cls.HALF:
+            return index
+        magnitude = index // cls.HALF - 1
+        sub = index - magnitude * cls.HALF
+        return ((sub + 1) << magnitude) - 1
+
+    def record(self, seconds: float):
+        value = max(0, int(seconds * 1_000_000))
+        index = self._index(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.total += 1
+        self.sum_us += value
+        self.min_us = value if self.min_us is None else min(self.min_us, value)
+        self.max_us = max(self.max_us, value)
+
+    def merge(self, other: 'LatencyHistogram'):
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.total += other.total
+        self.sum_us += other.sum_us
+        if other.min_us is not None:
+            self.min_us = other.min_us if self.min_us is None else min(self.min_us, other.min_us)
+        self.max_us = max(self.max_us, other.max_us)
+
+    def percentile(self, pct: float) -> float:
+        """Latency in milliseconds at the given percentile (0-100)"""
+        if not self.total:
+            return 0.0
+        rank = max(1, int(round(pct / 100.0 * self.total + 0.4999999)))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(self._highest_equivalent(index), self.max_us) / 1000.0
+        return self.max_us / 1000.0
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            'count': self.total,
+            'min_ms': (self.min_us or 0) / 1000.0,
+            'mean_ms': (self.sum_us / self.total / 1000.0) if self.total else 0.0,
+            'p50_ms': self.percentile(50),
+            'p90_ms': self.percentile(90),
+            'p99_ms': self.percentile(99),
+            'p99_9_ms': self.percentile(99.9),
+            'max_ms': self.max_us / 1000.0,
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'counts': {str(k): v for k, v in sorted(self.counts.items())},
+                'sum_us': self.sum_us, 'min_us': self.min_us, 'max_us': self.max_us}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'LatencyHistogram':
+        histogram = cls()
+        histogram.counts = {int(k): v for k, v in data['counts'].items()}
+        histogram.total = sum(histogram.counts.values())
+        histogram.sum_us = data['sum_us']
+        histogram.min_us = data['min_us']
+        histogram.max_us = data['max_us']
+        return histogram
+
+# ---------------------------------------------------------------------------
+# Message mix
+# ---------------------------------------------------------------------------
+
+# The scenarios test_client.py used to send one at a time
+SCENARIO_MESSAGES = [
+    ("Hello, what are your store hours?", "en"),
+    ("¿Cuáles son sus horarios de tienda?", "es"),
+    ("How do I return an item?", "en"),
+    ("I'm very frustrated with my order!", "en"),
+    ("Thank you for your excellent service!", "en"),
+]
+
+def _load_json(path: str):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def build_message_mix(faq_weight: float = 0.6, product_weight: float = 0.2,
+                      extra_files: Optional[List[str]] = None) -> List[Tuple[str, str, float]]:
+    """Weighted (message, language, weight) entries from the FAQ and fixture files"""
+    sys.path.insert(0, SCRIPTS_DIR)
+    from fake_backends import faq_fixture
+
+    mix: List[Tuple[str, str, float]] = []
+    faqs = faq_fixture()
+    malay = {'apakah', 'bagaimana', 'adakah', 'berapa', 'di'}
+    for item in faqs:
+        language = 'ms' if malay & set(item['question'].lower().split()) else 'en'
+        mix.append((item['question'], language, faq_weight / len(faqs)))
+
+    products = _load_json(os.path.join(REPO_DIR, 'json_files', 'Products.json'))
+    templates = ["Do you have {name} in {color}?", "Is {name} available in size {size}?",
+                 "How much is the {brand} {sub}?"]
+    for i, product in enumerate(products):
+        message = templates[i % len(templates)].format(
+            name=product['ProductName'], color=product['Color'].lower(), size=product['Size'],
+            brand=product['Brand'], sub=product['Subcategory'].lower())
+        mix.append((message, 'en', product_weight / len(products)))
+
+    other = [(message, language) for message, language in SCENARIO_MESSAGES]
+    payload = _load_json(os.path.join(REPO_DIR, 'test_payload.json'))
+    body = json.loads(payload['body'])
+    other.append((body['message'], body.get('language', 'en')))
+    for path in extra_files or []:
+        for entry in _load_json(path):
+            if isinstance(entry, str):
+                other.append((entry, 'en'))
+            else:
+                other.append((entry['message'], entry.get('language', 'en')))
+    rest = max(0.0, 1.0 - faq_weight - product_weight)
+    for message, language in other:
+        mix.append((message, language, rest / len(other)))
+    return mix
+
+class MessagePicker:
+    def __init__(self, mix: List[Tuple[str, str, float]], seed: Optional[int] = None):
+        self.messages = [(m, lang) for m, lang, _ in mix]
+        self.weights = [w for _, _, w in mix]
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def pick(self) -> Tuple[str, str]:
+        with self.lock:
+            return self.rng.choices(self.messages, self.weights)[0]
+
+# ---------------------------------------------------------------------------
+# Targets
+# ---------------------------------------------------------------------------
+
+class HttpTarget:
+    """POSTs to {url}/chat, reusing one keep-alive connection pool per worker thread"""
+
+    def __init__(self, url: str, timeout: float = 30.0):
+        import requests
+        self.requests = requests
+        self.url = url.rstrip('/') + '/chat'
+        self.timeout = timeout
+        self.local = threading.local()
+
+    def _session(self):
+        session = getattr(self.local, 'session', None)
+        if session is None:
+            session = self.local.session = self.requests.Session()
+            session.headers['Content-Type'] = 'application/json'
+        return session
+
+    def send(self, message: str, session_id: str, language: str) -> Optional[str]:
+        response = self._session().post(
+            self.url, json={'message': message, 'sessionId': session_id, 'language': language},
+            timeout=self.timeout)
+        if response.status_code != 200:
+            return f'HTTP {response.status_code}'
+        return None
+
+    def describe(self) -> Dict[str, Any]:
+        return {'type': 'http', 'url': self.url}
+
+class _LambdaContext:
+    def __init__(self):
+        self.aws_request_id = str(uuid.uuid4())
+        self.function_name = 'load-test'
+
+class InProcessTarget:
+    """Calls a handler module's lambda_handler directly against the fake backends"""
+
+    def __init__(self, handler: str, profile: str = 'realistic', seed: Optional[int] = None,
+                 throttle_rate: float = 0.0, error_rate: float = 0.0, quiet: bool = False):
+        sys.path[:0] = [SCRIPTS_DIR, LAMBDA_DIR]
+        import fake_backends
+        fake_backends.prepare_environment()
+        self.module = importlib.import_module(handler)
+        if quiet:
+            # Injected faults make the handlers log an error per failed call
+            logging.getLogger().setLevel(logging.CRITICAL)
+        self.backends = fake_backends.FakeAWS.from_profile(profile, seed=seed, throttle_rate=throttle_rate,
+                                                           error_rate=error_rate)
+        self.backends.seed_faq()
+        self.backends.seed_catalog()
+        fake_backends.install(self.module, self.backends)
+        self.handler = handler
+        self.profile = profile
+
+    def send(self, message: str, session_id: str, language: str) -> Optional[str]:
+        event = {'body': json.dumps({'message': message, 'sessionId': session_id, 'language': language})}
+        response = self.module.lambda_handler(event, _LambdaContext())
+        if response.get('statusCode') != 200:
+            return f"HTTP {response.get('statusCode')}"
+        return None
+
+    def describe(self) -> Dict[str, Any]:
+        return {'type': 'inprocess', 'handler': self.handler, 'profile': self.profile,
+                'backend_calls': self.backends.call_counts()}
+
+# ---------------------------------------------------------------------------
+# Load generation
+# ---------------------------------------------------------------------------
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histogram = LatencyHistogram()
+        self.service_histogram = LatencyHistogram()
+        self.errors: Dict[str, int] = {}
+        self.timeline: Dict[int, int] = {}
+        self.started = time.monotonic()
+
+    def record(self, latency: float, service_time: float, error: Optional[str]):
+        second = int(time.monotonic() - self.started)
+        with self.lock:
+            if error:
+                self.errors[error] = self.errors.get(error, 0) + 1
+            else:
+                self.histogram.record(latency)
+                self.service_histogram.record(service_time)
+            self.timeline[second] = self.timeline.get(second, 0) + 1
+
+def _timed_send(target, picker: MessagePicker, session_id: str, recorder: Recorder,
+                scheduled: Optional[float] = None):
+    message, language = picker.pick()
+    start = time.monotonic()
+    try:
+        error = target.send(message, session_id, language)
+    except Exception as e:
+        error = type(e).__name__
+    end = time.monotonic()
+    # Open loop measures from the intended send time so queueing delay is not hidden
+    recorder.record(end - (scheduled if scheduled is not None else start), end - start, error)
+
+def run_closed_loop(target, picker: MessagePicker, concurrency: int, duration: Optional[float],
+                    requests_per_user: Optional[int], think_time: float) -> Recorder:
+    """Each simulated user sends its next message only after the previous reply"""
+    recorder = Recorder()
+    deadline = time.monotonic() + duration if duration else None
+
+    def user(index: int):
+        session_id = f'load-{uuid.uuid4()}'
+        sent = 0
+        while (deadline is None or time.monotonic() < deadline) and \
+                (requests_per_user is None or sent < requests_per_user):
+            _timed_send(target, picker, session_id, recorder)
+            sent += 1
+            if think_time:
+                time.sleep(think_time)
+
+    threads = [threading.Thread(target=user, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return recorder
+
+def run_open_loop(target, picker: MessagePicker, rate: float, duration: float, max_concurrency: int,
+                  sessions: int, poisson: bool, seed: Optional[int]) -> Recorder:
+    """Send at a fixed arrival rate whether or not earlier requests have finished"""
+    recorder = Recorder()
+    rng = random.Random(seed)
+    session_ids = [f'load-{uuid.uuid4()}' for _ in range(max(1, sessions))]
+    start = time.monotonic()
+    next_send = start
+    with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+        while next_send < start + duration:
+            delay = next_send - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(_timed_send, target, picker, rng.choice(session_ids), recorder, next_send)
+            next_send += rng.expovariate(rate) if poisson else 1.0 / rate
+    return recorder
+
+# ---------------------------------------------------------------------------
+# Reporting
+# ---------------------------------------------------------------------------
+
+def build_report(args: argparse.Namespace, target, recorder: Recorder, elapsed: float) -> Dict[str, Any]:
+    completed = recorder.histogram.total
+    failed = sum(recorder.errors.values())
+    return {
+        'started_at': datetime.utcnow().isoformat() + 'Z',
+        'config': {key: value for key, value in vars(args).items() if key not in ('func',)},
+        'target': target.describe(),
+        'elapsed_s': elapsed,
+        'requests': completed + failed,
+        'errors': recorder.errors,
+        'error_rate': failed / (completed + failed) if completed + failed else 0.0,
+        'throughput_rps': (completed + failed) / elapsed if elapsed else 0.0,
+        'latency': recorder.histogram.summary(),
+        'service_time': recorder.service_histogram.summary(),
+        'histogram': recorder.histogram.to_dict(),
+        'timeline': {str(k): v for k, v in sorted(recorder.timeline.items())},
+    }
+
+def print_report(report: Dict[str, Any]):
+    latency = report['latency']
+    print(f"Target:      {json.dumps({k: v for k, v in report['target'].items() if k != 'backend_calls'})}")
+    print(f"Requests:    {report['requests']} in {report['elapsed_s']:.1f}s "
+          f"({report['throughput_rps']:.1f} req/s), error rate {report['error_rate'] * 100:.2f}%")
+    for error, count in sorted(report['errors'].items()):
+        print(f"  {error}: {count}")
+    print("Latency (ms):")
+    for label, key in [('min', 'min_ms'), ('mean', 'mean_ms'), ('p50', 'p50_ms'), ('p90', 'p90_ms'),
+                       ('p99', 'p99_ms'), ('p99.9', 'p99_9_ms'), ('max', 'max_ms')]:
+        print(f"  {label:>6}: {latency[key]:10.2f}")
+
+def compare_reports(baseline_path: str, candidate_path: str):
+    baseline, candidate = _load_json(baseline_path), _load_json(candidate_path)
+    print(f"{'metric':>14} {'baseline':>12} {'candidate':>12} {'change':>9}")
+    rows = [('throughput_rps', baseline['throughput_rps'], candidate['throughput_rps']),
+            ('error_rate', baseline['error_rate'], candidate['error_rate'])]
+    rows += [(key, baseline['latency'][key], candidate['latency'][key])
+             for key in ('p50_ms', 'p90_ms', 'p99_ms', 'p99_9_ms', 'max_ms')]
+    for name, old, new in rows:
+        change = ((new - old) / old * 100) if old else 0.0
+        print(f"{name:>14} {old:12.2f} {new:12.2f} {change:+8.1f}%")
+
+def run(args: argparse.Namespace):
+    if args.mode == 'http':
+        target = HttpTarget(args.url, timeout=args.timeout)
+    else:
+        target = InProcessTarget(args.handler, profile=args.profile, seed=args.seed,
+                                 throttle_rate=args.throttle_rate, error_rate=args.error_rate,
+                                 quiet=args.quiet)
+    picker = MessagePicker(build_message_mix(args.faq_weight, args.product_weight, args.messages), seed=args.seed)
+
+    started = time.monotonic()
+    if args.rate:
+        recorder = run_open_loop(target, picker, args.rate, args.duration or 10.0, args.concurrency,
+                                 args.sessions, args.arrivals == 'poisson', args.seed)
+    else:
+        recorder = run_closed_loop(target, picker, args.concurrency, args.duration, args.requests,
+                                   args.think_time)
+    report = build_report(args, target, recorder, time.monotonic() - started)
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Chatbot load generator')
+    sub = parser.add_subparsers(dest='mode', required=True)
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--concurrency', type=int, default=10,
+                        help='simulated users (closed loop) or max in-flight requests (open loop)')
+    common.add_argument('--duration', type=float, help='seconds to run')
+    common.add_argument('--requests', type=int, help='requests per user in closed loop (default 5 without --duration)')
+    common.add_argument('--rate', type=float, help='open loop: arrivals per second')
+    common.add_argument('--arrivals', choices=['poisson', 'uniform'], default='poisson')
+    common.add_argument('--sessions', type=int, default=100, help='open loop: distinct session ids')
+    common.add_argument('--think-time', type=float, default=0.0, help='closed loop: pause between messages')
+    common.add_argument('--faq-weight', type=float, default=0.6)
+    common.add_argument('--product-weight', type=float, default=0.2)
+    common.add_argument('--messages', nargs='*', help='extra JSON files with messages')
+    common.add_argument('--seed', type=int)
+    common.add_argument('--output', help='write JSON results here')
+
+    http = sub.add_parser('http', parents=[common], help='drive a deployed endpoint')
+    http.add_argument('--url', required=True, help='API base URL, e.g. https://<id>.execute-api.<region>.amazonaws.com/prod')
+    http.add_argument('--timeout', type=float, default=30.0)
+
+    inprocess = sub.add_parser('inprocess', parents=[common], help='call lambda_handler against fake backends')
+    inprocess.add_argument('--handler', default='chatbot_handler',
+                           choices=['chatbot_handler', 'chatbot_handler_bedrock', 'chatbot_handler_fallback'])
+    inprocess.add_argument('--profile', default='realistic', choices=['instant', 'fast', 'realistic'])
+    inprocess.add_argument('--throttle-rate', type=float, default=0.0)
+    inprocess.add_argument('--error-rate', type=float, default=0.0)
+    inprocess.add_argument('--quiet', action='store_true', help='silence handler error logs')
+
+    compare = sub.add_parser('compare', help='compare two JSON result files')
+    compare.add_argument('baseline')
+    compare.add_argument('candidate')
+
+    args = parser.parse_args(argv)
+    if args.mode == 'compare':
+        compare_reports(args.baseline, args.candidate)
+        return
+    if args.duration is None and args.requests is None and not args.rate:
+        args.requests = 5
+    run(args)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,420 @@
+"""Microbenchmarks for the handler hot paths.
+
+Runs each benchmark against the in-process fake backends, reports ops/sec
+and peak memory allocated per call, and compares against stored baselines
+so large regressions are caught before deploy:
+
+    python scripts/microbench.py                  # run and print
+    python scripts/microbench.py --check          # fail if slower than baseline
+    python scripts/microbench.py --save           # record new baselines
+    python scripts/microbench.py -k search_faq    # only matching benchmarks
+
+Baselines are normalized by a pure-Python calibration loop, so a baseline
+recorded on a laptop can be checked on a slower CI runner.
+"""
+import argparse
+import gc
+import importlib
+import importlib.util
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+import types
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(SCRIPTS_DIR)
+LAMBDA_DIR = os.path.join(REPO_DIR, 'lambda')
+BASELINE_FILE = os.path.join(SCRIPTS_DIR, 'bench_baselines.json')
+
+sys.path[:0] = [SCRIPTS_DIR, LAMBDA_DIR, REPO_DIR]
+
+import fake_backends  # noqa: E402
+
+fake_backends.prepare_environment()
+
+BENCHMARKS: Dict[str, Callable[[], Callable[[], Any]]] = {}
+
+def benchmark(name: str):
+    """Register a setup function that returns the callable to time"""
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+def load_script_module(name: str, filename: str):
+    """Import a hyphenated top-level script such as analytics-lambda.py"""
+    spec = importlib.util.spec_from_file_location(name, os.path.join(REPO_DIR, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+# ---------------------------------------------------------------------------
+# Fixtures
+# ---------------------------------------------------------------------------
+
+SENTIMENTS = ['POSITIVE', 'NEGATIVE', 'NEUTRAL', 'MIXED']
+LANGUAGES = ['en', 'en', 'en', 'ms', 'es', 'zh']
+
+def sample_metadata(rng: random.Random) -> Dict[str, Any]:
+    """Metadata shaped like what the chat handlers persist per message"""
+    scores = [rng.random() for _ in range(4)]
+    total = sum(scores)
+    return {
+        'detectedLanguage': rng.choice(LANGUAGES),
+        'userLanguage': 'en',
+        'sentiment': {
+            'sentiment': rng.choice(SENTIMENTS),
+            'confidence': {
+                'Positive': scores[0] / total,
+                'Negative': scores[1] / total,
+                'Neutral': scores[2] / total,
+                'Mixed': scores[3] / total,
+            }
+        },
+        'usedFAQ': rng.random() < 0.6,
+        'usedBedrock': rng.random() < 0.4,
+        'route': rng.choice(['faq', 'llm']),
+        'handler': 'llama',
+        'model': 'meta.llama3-8b-instruct-v1:0',
+        'region': 'us-east-1',
+        'timestamp': '2025-09-20T18:39:16.098830'
+    }
+
+def synthetic_analytics_items(count: int, seed: int = 1) -> List[Dict[str, Any]]:
+    """Rows shaped like the chatbot-analytics table"""
+    rng = random.Random(seed)
+    items = []
+    for i in range(count):
+        day = 14 + i % 7
+        hour = rng.randrange(24)
+        items.append({
+            'id': f'id-{i}',
+            'session_id': f'session-{rng.randrange(count // 4 + 1)}',
+            'timestamp': f'2025-09-{day:02d}T{hour:02d}:{rng.randrange(60):02d}:00.000000',
+            'sentiment': rng.choice(SENTIMENTS),
+            'language': rng.choice(LANGUAGES),
+            'date': f'2025-09-{day:02d}',
+            'latency_ms': Decimal(str(round(rng.lognormvariate(7, 0.5), 1))),
+        })
+    return items
+
+def chat_handler(name: str = 'chatbot_handler', profile: str = 'instant'):
+    module = importlib.import_module(name)
+    backends = fake_backends.FakeAWS.from_profile(profile, seed=1)
+    backends.seed_faq()
+    fake_backends.install(module, backends)
+    return module, backends
+
+# ---------------------------------------------------------------------------
+# Benchmarks
+# ---------------------------------------------------------------------------
+
+@benchmark('search_faq.hit')
+def bench_search_faq_hit():
+    module, _ = chat_handler()
+    service = module.ChatbotService()
+    return lambda: service.search_faq('How long does shipping take?', 'en')
+
+@benchmark('search_faq.miss')
+def bench_search_faq_miss():
+    module, _ = chat_handler()
+    service = module.ChatbotService()
+    return lambda: service.search_faq('Tell me a joke about penguins', 'en')
+
+@benchmark('search_faq.malay')
+def bench_search_faq_malay():
+    module, _ = chat_handler()
+    service = module.ChatbotService()
+    return lambda: service.search_faq('Berapa lama masa penghantaran?', 'ms')
+
+@benchmark('generate_smart_response')
+def bench_smart_response():
+    module, _ = chat_handler('chatbot_handler_fallback')
+    service = module.ChatbotService()
+    messages = ['hello there', 'thanks a lot', 'I want to buy a product', 'where is my parcel']
+    state = {'i': 0}
+
+    def run():
+        state['i'] += 1
+        return service.generate_smart_response(messages[state['i'] % len(messages)], 'NEUTRAL')
+    return run
+
+@benchmark('convert_floats_to_decimal')
+def bench_convert_floats():
+    from chatbot_core import convert_floats_to_decimal
+    metadata = sample_metadata(random.Random(3))
+    return lambda: convert_floats_to_decimal(metadata)
+
+def sample_chat_item() -> Dict[str, Any]:
+    return {
+        'sessionId': 'bench-session',
+        'timestamp': 1758393556,
+        'userMessage': 'What are your store hours?',
+        'botResponse': 'Our store is open Monday-Saturday 9AM-9PM, Sunday 10AM-6PM.',
+        'metadata': sample_metadata(random.Random(3)),
+    }
+
+@benchmark('persist.convert_and_type_serializer')
+def bench_persist_before():
+    """Item encoding as boto3's Table.put_item did it: convert, then TypeSerializer"""
+    from boto3.dynamodb.types import TypeSerializer
+    from chatbot_core import convert_floats_to_decimal
+    serializer = TypeSerializer()
+    item = sample_chat_item()
+    return lambda: {k: serializer.serialize(v) for k, v in convert_floats_to_decimal(item).items()}
+
+@benchmark('persist.serialize_item')
+def bench_persist_after():
+    from chatbot_core import serialize_item
+    item = sample_chat_item()
+    return lambda: serialize_item(item)
+
+@benchmark('lambda_handler.json')
+def bench_handler_json():
+    """Request body parse and response serialization around the pipeline"""
+    from chat_pipeline import ChatContext, ParseRequest, Respond
+    event = {'body': json.dumps({'message': 'What are your store hours?', 'sessionId': 'bench-1', 'language': 'en'})}
+    aws_context = types.SimpleNamespace(aws_request_id='bench')
+    metadata = sample_metadata(random.Random(5))
+    parse, respond = ParseRequest(), Respond()
+
+    def run():
+        ctx = ChatContext(event, aws_context, None, 'bench')
+        parse(ctx)
+        ctx.final_response = 'Our store is open Monday-Saturday 9AM-9PM, Sunday 10AM-6PM.'
+        ctx.metadata = metadata
+        respond(ctx)
+        return ctx.response
+    return run
+
+@benchmark('lambda_handler.faq_end_to_end')
+def bench_handler_end_to_end():
+    module, _ = chat_handler()
+    module.response_cache.max_entries = 0
+    event = {'body': json.dumps({'message': 'What is your return policy?', 'sessionId': 'bench-2'})}
+    aws_context = types.SimpleNamespace(aws_request_id='bench')
+    return lambda: module.lambda_handler(event, aws_context)
+
+@benchmark('analytics_lambda.aggregations')
+def bench_analytics_aggregations():
+    """Decode 5,000 items into columns once, then every dashboard distribution"""
+    from analytics_engine import AnalyticsFrame
+    items = synthetic_analytics_items(5000)
+    return lambda: AnalyticsFrame.from_items(items).insights()
+
+@benchmark('analytics_lambda.get_analytics_data')
+def bench_analytics_query():
+    """A week of date-index queries folded into the dashboard aggregator"""
+    module = load_script_module('analytics_lambda', 'analytics-lambda.py')
+    backends = fake_backends.FakeAWS.from_profile('instant')
+    module.analytics_table = backends.dynamodb.Table('chatbot-analytics')
+    module.analytics_table.load(synthetic_analytics_items(5000))
+
+    def run():
+        aggregator = module.ColumnBuilder()
+        module.get_analytics_data(datetime(2025, 9, 14), datetime(2025, 9, 20), aggregator.add_page)
+        return aggregator.insights()
+    return run
+
+@benchmark('analytics_lambda.get_dashboard.cached')
+def bench_analytics_dashboard_cached():
+    """A 90-day dashboard with every closed day already in the daily aggregate cache"""
+    module = load_script_module('analytics_lambda', 'analytics-lambda.py')
+    backends = fake_backends.FakeAWS.from_profile('instant')
+    module.analytics_table = backends.dynamodb.Table('chatbot-analytics')
+    module.analytics_table.load(synthetic_analytics_items(5000))
+    module.daily_cache = module.DailyAggregateCache(backends.dynamodb.Table('chatbot-analytics-daily'))
+    now = datetime(2025, 9, 20, 12, 0)
+    module.get_dashboard(90, now)
+    return lambda: module.get_dashboard(90, now)
+
+@benchmark('AnalyticsService.get_chat_metrics')
+def bench_get_chat_metrics():
+    import analytics_handler
+    backends = fake_backends.FakeAWS.from_profile('instant')
+    fake_backends.install(analytics_handler, backends)
+    table = backends.dynamodb.Table(os.environ['CHAT_HISTORY_TABLE'])
+    rng = random.Random(9)
+    now = int(time.time())
+    from chatbot_core import convert_floats_to_decimal
+    table.load([{
+        'sessionId': f'session-{i // 4}',
+        'timestamp': now - rng.randrange(48 * 3600),
+        'userMessage': 'What are your store hours?',
+        'botResponse': 'Our store is open Monday-Saturday 9AM-9PM, Sunday 10AM-6PM.',
+        'metadata': convert_floats_to_decimal(sample_metadata(rng)),
+    } for i in range(2000)])
+    service = analytics_handler.AnalyticsService()
+    service.rollups = None
+    return lambda: service.get_chat_metrics(24)
+
+@benchmark('AnalyticsService.get_chat_metrics.rollup')
+def bench_get_chat_metrics_rollup():
+    """The same 2,000 messages, read back as minute/hour rollup buckets"""
+    import analytics_handler
+    from chatbot_core import convert_floats_to_decimal
+    from rollups import RollupStore, fold
+    backends = fake_backends.FakeAWS.from_profile('instant')
+    fake_backends.install(analytics_handler, backends)
+    rng = random.Random(9)
+    now = int(time.time())
+    items = [{
+        'sessionId': f'session-{i // 4}',
+        'timestamp': now - rng.randrange(48 * 3600),
+        'metadata': convert_floats_to_decimal(sample_metadata(rng)),
+    } for i in range(2000)]
+    store = RollupStore(backends.dynamodb.Table(os.environ['ROLLUP_TABLE']))
+    for (pk, sk), counters in fold((item, 1) for item in items).items():
+        store.apply(pk, sk, counters, 'bench')
+    service = analytics_handler.AnalyticsService()
+    service.rollups = store
+    return lambda: service.get_chat_metrics(24)
+
+# ---------------------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------------------
+
+def calibrate() -> float:
+    """Ops/sec of a fixed pure-Python workload, used to normalize across machines"""
+    def work():
+        total = 0
+        for i in range(1000):
+            total += i * i % 7
+        return {'total': total, 'items': [str(i) for i in range(20)]}
+    return measure(work, min_time=0.2, repeat=5)['ops_per_sec']
+
+def measure(fn: Callable[[], Any], min_time: float = 0.2, repeat: int = 5) -> Dict[str, float]:
+    """Best-of-repeat ops/sec with the iteration count calibrated to min_time"""
+    fn()
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time / 4 or number >= 1 << 22:
+            break
+        number *= 4
+    number = max(1, int(number * (min_time / max(elapsed, 1e-9))))
+
+    rates = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                fn()
+            rates.append(number / (time.perf_counter() - start))
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return {'ops_per_sec': max(rates), 'median_ops_per_sec': statistics.median(rates), 'iterations': number}
+
+def measure_allocations(fn: Callable[[], Any], calls: int = 20) -> Dict[str, float]:
+    """Median peak bytes allocated while one call runs"""
+    fn()
+    tracemalloc.start()
+    try:
+        peaks = []
+        for _ in range(calls):
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            fn()
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+    finally:
+        tracemalloc.stop()
+    return {'peak_bytes_per_call': statistics.median(peaks)}
+
+def run_benchmarks(pattern: Optional[str], min_time: float, repeat: int) -> Dict[str, Dict[str, float]]:
+    results = {}
+    for name, setup in BENCHMARKS.items():
+        if pattern and pattern not in name:
+            continue
+        fn = setup()
+        result = measure(fn, min_time=min_time, repeat=repeat)
+        result.update(measure_allocations(fn))
+        results[name] = result
+        print(f"{name:<36} {result['ops_per_sec']:>14,.0f} ops/s "
+              f"{1e6 / result['ops_per_sec']:>10.2f} us/op {result['peak_bytes_per_call'] / 1024:>9.1f} KiB/op")
+    return results
+
+def load_baselines() -> Dict[str, Any]:
+    if not os.path.exists(BASELINE_FILE):
+        return {'calibration_ops_per_sec': None, 'benchmarks': {}}
+    with open(BASELINE_FILE, encoding='utf-8') as f:
+        return json.load(f)
+
+def check(results: Dict[str, Dict[str, float]], baselines: Dict[str, Any], calibration: float,
+          tolerance: float) -> List[str]:
+    """Names of benchmarks slower than baseline by more than the tolerance factor"""
+    scale = calibration / baselines['calibration_ops_per_sec'] if baselines.get('calibration_ops_per_sec') else 1.0
+    regressions = []
+    print(f"\nmachine speed vs baseline: {scale:.2f}x, failing below 1/{tolerance:g} of baseline")
+    for name, result in results.items():
+        baseline = baselines['benchmarks'].get(name)
+        if not baseline:
+            print(f"{name:<36} no baseline")
+            continue
+        expected = baseline['ops_per_sec'] * scale
+        ratio = result['ops_per_sec'] / expected
+        status = 'ok' if ratio * tolerance >= 1 else 'REGRESSION'
+        print(f"{name:<36} {ratio:>6.2f}x of baseline  {status}")
+        if status != 'ok':
+            regressions.append(name)
+    return regressions
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Handler hot-path microbenchmarks')
+    parser.add_argument('-k', dest='pattern', help='only run benchmarks whose name contains this')
+    parser.add_argument('--min-time', type=float, default=0.2, help='seconds per repeat')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--save', action='store_true', help='write results as the new baselines')
+    parser.add_argument('--check', action='store_true', help='exit non-zero on regressions')
+    parser.add_argument('--tolerance', type=float, default=2.0,
+                        help='allowed slowdown factor before --check fails (default 2.0)')
+    parser.add_argument('--output', help='write JSON results here')
+    args = parser.parse_args(argv)
+
+    # The handlers log at INFO on every call; keep benchmark output readable
+    logging.getLogger().setLevel(logging.CRITICAL)
+    calibration = calibrate()
+    results = run_benchmarks(args.pattern, args.min_time, args.repeat)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'calibration_ops_per_sec': calibration, 'benchmarks': results}, f, indent=2)
+
+    baselines = load_baselines()
+    if args.save:
+        baselines['calibration_ops_per_sec'] = calibration
+        baselines['python'] = sys.version.split()[0]
+        for name, result in results.items():
+            baselines['benchmarks'][name] = {
+                'ops_per_sec': round(result['ops_per_sec'], 1),
+                'peak_bytes_per_call': result['peak_bytes_per_call'],
+            }
+        with open(BASELINE_FILE, 'w', encoding='utf-8') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"Baselines written to {BASELINE_FILE}")
+        return 0
+
+    if args.check:
+        regressions = check(results, baselines, calibration, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) regressed: {', '.join(regressions)}")
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,65 @@
+"""Re-publish chat.interaction events for stored chat history.
+
+Useful after adding an EventBridge rule or target that should see past
+conversations. Rows are read a page at a time (by hour-bucket queries when
+--bucket-index is given, else a parallel scan) and published ten to a
+PutEvents call; entries EventBridge rejects are retried individually.
+
+    python scripts/replay_events.py --start 2025-09-01 --end 2025-09-07 \\
+        --event-bus prod-chatbot-events --bucket-index hour-bucket-index
+"""
+import argparse
+import os
+import sys
+
+import boto3
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, SCRIPTS_DIR)
+sys.path.insert(0, os.path.join(os.path.dirname(SCRIPTS_DIR), 'lambda'))
+
+from archive_history import parse_time
+from event_publisher import EventPublisher
+from history_archive import HistoryReader
+from history_codec import decode_metadata
+
+def interaction_detail(item):
+    """The chat.interaction detail the chat pipeline publishes for this row"""
+    metadata = decode_metadata(item)
+    return {
+        'sessionId': item['sessionId'],
+        'sentiment': metadata.get('sentiment', {}).get('sentiment', 'NEUTRAL'),
+        'language': metadata.get('detectedLanguage', 'en'),
+        'usedFAQ': metadata.get('usedFAQ', False),
+        'usedBedrock': metadata.get('usedBedrock', False),
+        'replayed': True
+    }
+
+def replay(reader: HistoryReader, publisher: EventPublisher, start: int, end: int, segments: int = 4) -> int:
+    def publish_page(items):
+        for item in items:
+            publisher.add('chat.interaction', interaction_detail(item))
+
+    with publisher:
+        reader.for_each_page(start, end, publish_page, segments=segments)
+    return publisher.published
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Replay chat.interaction events from chat history')
+    parser.add_argument('--start', required=True, help='epoch seconds or ISO date/datetime (UTC)')
+    parser.add_argument('--end', required=True, help='epoch seconds or ISO date/datetime (UTC)')
+    parser.add_argument('--table', default='prod-chatbot-history')
+    parser.add_argument('--event-bus', default='prod-chatbot-events')
+    parser.add_argument('--bucket-index', default=None, help='hour-bucket GSI to query instead of scanning')
+    parser.add_argument('--segments', type=int, default=4)
+    parser.add_argument('--region', default=None)
+    args = parser.parse_args(argv)
+
+    table = boto3.resource('dynamodb', region_name=args.region).Table(args.table)
+    reader = HistoryReader(table, bucket_index=args.bucket_index)
+    publisher = EventPublisher(boto3.client('events', region_name=args.region), args.event_bus)
+    published = replay(reader, publisher, parse_time(args.start), parse_time(args.end, end=True), args.segments)
+    print(f"Published {published} events in {publisher.requests} requests; {publisher.failed} failed")
+
+if __name__ == '__main__':
+    main()
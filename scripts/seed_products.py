@@ -1,9 +1,14 @@
 import boto3
 import json
+import os
+import sys
 from decimal import Decimal
 
-dynamodb = boto3.resource('dynamodb')
-table = dynamodb.Table('prod-shop-catalog')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'lambda'))
+
+from stock_availability import stock_update
+
+TABLE_NAME = 'prod-shop-catalog'
 
 # Sample product catalog for retail store
 products = [
@@ -131,10 +136,12 @@ products = [
 
 def seed_products():
     """Seed product catalog into DynamoDB"""
+    table = boto3.resource('dynamodb').Table(TABLE_NAME)
     try:
         with table.batch_writer() as batch:
             for product in products:
-                batch.put_item(Item=product)
+                # Stamped so the chat handlers' stock snapshots see the change
+                batch.put_item(Item=dict(product, **stock_update(product['stockQuantity'])))
         
         print(f"Successfully seeded {len(products)} products into catalog")
         
@@ -0,0 +1,202 @@
+"""Stream the StyleCo CSV exports into DynamoDB.
+
+Rows are read lazily from each CSV (or from a JSON array produced by
+csv_to_json.py), coerced to typed attributes and written through a batch
+writer, so memory use does not grow with file size. Passing --json-dir also
+tees every source row into <Dataset>.json on the way, replacing the
+separate conversion step.
+
+    python styleco_import.py --source "StyleCo Data" --json-dir json_files
+    python styleco_import.py --source json_files --datasets Products Sales
+"""
+import argparse
+import csv
+import json
+import os
+import uuid
+from decimal import Decimal, InvalidOperation
+
+import boto3
+
+# dataset -> source files, target table and its key, and typed columns.
+# key_from names the source column holding the key; datasets without one
+# get a key derived from key_fields, so re-imports overwrite, not duplicate.
+DATASETS = {
+    'Customers': {
+        'csv': 'Customers.csv', 'json': 'Customers.json',
+        'table': 'Customers', 'key': 'CustomerID',
+        'types': {'Age': int}
+    },
+    'Products': {
+        'csv': 'Products.csv', 'json': 'Products.json',
+        'table': 'StyleCoProducts', 'key': 'product_id', 'key_from': 'ProductID',
+        'types': {'Price': Decimal, 'StockQuantity': int}
+    },
+    'Sales': {
+        'csv': 'Sales.csv', 'json': 'Sales.json',
+        'table': 'Sales', 'key': 'SaleID', 'key_from': 'TransactionID',
+        'types': {'QuantityPurchased': int, 'TotalAmount': Decimal}
+    },
+    'Shops': {
+        'csv': 'ShopInfo.csv', 'json': 'Shops.json',
+        'table': 'Shops', 'key': 'ShopID', 'key_fields': ['ShopName', 'Location']
+    },
+    'Suppliers': {
+        'csv': 'Suppliers.csv', 'json': 'Suppliers.json',
+        'table': 'Suppliers', 'key': 'SupplierID'
+    }
+}
+
+JSON_CHUNK_BYTES = 64 * 1024
+KEY_NAMESPACE = uuid.UUID('6f1c1d52-3a4e-4c55-9a53-0b8f5e2d9c41')
+
+class RowError(ValueError):
+    """A source row that cannot be imported"""
+
+def read_csv(path):
+    """Yield CSV rows as dicts, one at a time"""
+    with open(path, mode='r', encoding='utf-8-sig', newline='') as f:
+        yield from csv.DictReader(f)
+
+def read_json(path, chunk_bytes=JSON_CHUNK_BYTES):
+    """Yield the objects of a top-level JSON array without loading the whole file"""
+    decoder = json.JSONDecoder()
+    with open(path, mode='r', encoding='utf-8-sig') as f:
+        buffer = f.read(chunk_bytes).lstrip()
+        if not buffer.startswith('['):
+            raise ValueError(f"{path} is not a JSON array")
+        buffer = buffer[1:]
+        while True:
+            buffer = buffer.lstrip().lstrip(',').lstrip()
+            if buffer.startswith(']'):
+                return
+            try:
+                value, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                chunk = f.read(chunk_bytes)
+                if not chunk:
+                    raise ValueError(f"{path} is truncated or not valid JSON")
+                buffer += chunk
+                continue
+            yield value
+            buffer = buffer[end:]
+            if len(buffer) < chunk_bytes:
+                buffer += f.read(chunk_bytes)
+
+def source_rows(source_dir, dataset):
+    """Rows of a dataset from its CSV in source_dir, else from its JSON; None when neither exists"""
+    spec = DATASETS[dataset]
+    csv_path = os.path.join(source_dir, spec['csv'])
+    if os.path.exists(csv_path):
+        return read_csv(csv_path)
+    json_path = os.path.join(source_dir, spec['json'])
+    if os.path.exists(json_path):
+        return read_json(json_path)
+    return None
+
+def tee_json(rows, path):
+    """Pass rows through while writing them to path as a JSON array, one object per line"""
+    with open(path, mode='w', encoding='utf-8') as f:
+        f.write('[')
+        for i, row in enumerate(rows):
+            f.write(',\n' if i else '\n')
+            f.write(json.dumps(row, ensure_ascii=False))
+            yield row
+        f.write('\n]\n')
+
+def coerce(row, dataset):
+    """Typed DynamoDB item for one source row.
+
+    Empty cells are dropped rather than stored as empty strings, numeric
+    columns become int or Decimal, and the table key is filled in.
+    """
+    spec = DATASETS[dataset]
+    types = spec.get('types', {})
+    item = {}
+    for column, value in row.items():
+        if column is None:
+            raise RowError(f"more cells than header columns: {value!r}")
+        if isinstance(value, str):
+            value = value.strip()
+        if value == '' or value is None:
+            continue
+        kind = types.get(column)
+        if kind is not None and not isinstance(value, kind):
+            try:
+                value = kind(str(value))
+            except (ValueError, InvalidOperation):
+                raise RowError(f"{column} is not a valid {kind.__name__}: {value!r}")
+            if kind is Decimal and not value.is_finite():
+                raise RowError(f"{column} is not a finite number: {value!r}")
+        item[column] = value
+
+    key = spec['key']
+    if spec.get('key_from'):
+        if spec['key_from'] not in item:
+            raise RowError(f"missing {spec['key_from']}")
+        item[key] = str(item[spec['key_from']])
+    elif spec.get('key_fields'):
+        identity = '|'.join(str(item.get(field, '')) for field in spec['key_fields'])
+        item[key] = str(uuid.uuid5(KEY_NAMESPACE, identity))
+    elif key not in item:
+        raise RowError(f"missing {key}")
+    return item
+
+def typed_items(rows, dataset, stats):
+    """Coerce rows, skipping (and counting) the ones that cannot be imported"""
+    for number, row in enumerate(rows, start=1):
+        stats['read'] += 1
+        try:
+            yield coerce(row, dataset)
+        except RowError as e:
+            stats['skipped'] += 1
+            print(f"⚠️ Skipping {dataset} row {number}: {e}")
+
+def import_dataset(table, rows, dataset):
+    """Write every importable row through one batch writer; returns read/written/skipped counts"""
+    stats = {'read': 0, 'written': 0, 'skipped': 0}
+    with table.batch_writer(overwrite_by_pkeys=[DATASETS[dataset]['key']]) as batch:
+        for item in typed_items(rows, dataset, stats):
+            batch.put_item(Item=item)
+            stats['written'] += 1
+    return stats
+
+def run(source_dir, datasets, dynamodb=None, json_dir=None, table_prefix=''):
+    results = {}
+    if json_dir:
+        os.makedirs(json_dir, exist_ok=True)
+    for dataset in datasets:
+        spec = DATASETS[dataset]
+        rows = source_rows(source_dir, dataset)
+        if rows is None:
+            print(f"⚠️ Warning: neither {spec['csv']} nor {spec['json']} found in {source_dir}, skipping...")
+            continue
+        if json_dir:
+            rows = tee_json(rows, os.path.join(json_dir, spec['json']))
+        if dynamodb is None:
+            stats = {'read': 0, 'written': 0, 'skipped': 0}
+            for _ in typed_items(rows, dataset, stats):
+                pass
+        else:
+            table_name = table_prefix + spec['table']
+            print(f"📥 Importing {dataset} into {table_name}...")
+            stats = import_dataset(dynamodb.Table(table_name), rows, dataset)
+        print(f"✅ {dataset}: {stats['read']} read, {stats['written']} written, {stats['skipped']} skipped")
+        results[dataset] = stats
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Stream StyleCo CSV/JSON exports into DynamoDB')
+    parser.add_argument('--source', required=True, help='directory with the CSV exports, or JSON from csv_to_json.py')
+    parser.add_argument('--datasets', nargs='+', choices=list(DATASETS), default=list(DATASETS))
+    parser.add_argument('--json-dir', default=None, help='also write each dataset as JSON here')
+    parser.add_argument('--table-prefix', default='')
+    parser.add_argument('--region', default='ap-southeast-1')
+    parser.add_argument('--dry-run', action='store_true', help='validate rows (and write JSON) without importing')
+    args = parser.parse_args(argv)
+
+    dynamodb = None if args.dry_run else boto3.resource('dynamodb', region_name=args.region)
+    run(args.source, args.datasets, dynamodb, args.json_dir, args.table_prefix)
+
+if __name__ == '__main__':
+    main()
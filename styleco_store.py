@@ -0,0 +1,335 @@
+"""Columnar, memory-mapped copy of the StyleCo retail dataset.
+
+Each dataset becomes a directory of .npy column files:
+
+- Every string column is dictionary-encoded as int32 codes (-1 for empty
+  cells), with a sorted fixed-width vocabulary next to it.
+- Typed numeric columns (see styleco_import.DATASETS) are float64 or
+  int64; ints with empty cells fall back to float64 with NaN.
+- Dates are datetime64[D].
+
+Key columns also get a hash index. It is an open-addressing table from
+vocabulary value to code, with postings from code to rows, so key lookups
+and joins run without DynamoDB and without building Python dicts at load
+time. Everything opens with mmap, so only the columns a query touches are
+paged in.
+
+    python styleco_store.py build --source json_files --out styleco_store
+    python styleco_store.py stats --store styleco_store
+"""
+import argparse
+import json
+import os
+import shutil
+import time
+from decimal import Decimal
+
+import numpy as np
+
+from sketches import hash64
+from styleco_import import DATASETS, coerce, source_rows
+
+FORMAT_VERSION = 1
+DATE_COLUMNS = {'Sales': ['Date'], 'Shops': ['EstablishedDate']}
+# Columns that get a hash index; the first of each dataset is its unique key
+INDEXED_COLUMNS = {
+    'Customers': ['CustomerID'],
+    'Products': ['ProductID', 'Category'],
+    'Sales': ['TransactionID', 'ProductID', 'CustomerID'],
+    'Suppliers': ['SupplierID'],
+}
+
+class HashIndex:
+    """Open-addressing hash table from vocabulary value to code, plus code -> rows postings.
+
+    ``slots`` holds a code or -1 and has a power-of-two size of at least
+    twice the vocabulary; collisions probe linearly. Rows for a code are
+    ``order[offsets[code]:offsets[code + 1]]``.
+    """
+
+    def __init__(self, vocabulary, slots, order, offsets):
+        self.vocabulary = vocabulary
+        self.slots = slots
+        self.order = order
+        self.offsets = offsets
+
+    @classmethod
+    def build(cls, vocabulary, codes):
+        size = 8
+        while size < 2 * len(vocabulary):
+            size *= 2
+        mask = np.uint64(size - 1)
+        slots = np.full(size, -1, dtype=np.int32)
+        position = (hash64(vocabulary.tolist()) & mask).astype(np.int64)
+        pending = np.arange(len(vocabulary))
+        while pending.size:
+            candidates = position[pending]
+            free = slots[candidates] == -1
+            # Of several codes wanting the same free slot, the first takes it
+            taken, first = np.unique(candidates[free], return_index=True)
+            winners = pending[free][first]
+            slots[taken] = winners
+            pending = np.setdiff1d(pending, winners, assume_unique=True)
+            position[pending] = (position[pending] + 1) % size
+
+        missing = int(np.count_nonzero(codes < 0))
+        order = np.argsort(codes, kind='stable').astype(np.int32)
+        counts = np.bincount(codes[codes >= 0], minlength=len(vocabulary))
+        offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64) + missing
+        return cls(vocabulary, slots, order, offsets)
+
+    def codes_for(self, values):
+        """Codes of values, -1 for values not in the vocabulary"""
+        values = np.asarray(list(values), dtype=str)
+        codes = np.full(len(values), -1, dtype=np.int32)
+        if not len(values) or not len(self.vocabulary):
+            return codes
+        size = len(self.slots)
+        position = (hash64(values.tolist()) & np.uint64(size - 1)).astype(np.int64)
+        active = np.arange(len(values))
+        for _ in range(size):
+            slot = self.slots[position[active]]
+            occupied = slot >= 0
+            match = occupied.copy()
+            match[occupied] = self.vocabulary[slot[occupied]] == values[active[occupied]]
+            codes[active[match]] = slot[match]
+            active = active[occupied & ~match]
+            if not active.size:
+                break
+            position[active] = (position[active] + 1) % size
+        return codes
+
+    def rows_for_code(self, code):
+        return self.order[self.offsets[code]:self.offsets[code + 1]]
+
+    def first_rows(self, codes):
+        """The first row holding each code (-1 where the code is -1 or unused), for unique keys"""
+        codes = np.asarray(codes)
+        rows = np.full(len(codes), -1, dtype=np.int64)
+        valid = codes >= 0
+        starts = self.offsets[codes[valid]]
+        present = starts < self.offsets[codes[valid] + 1]
+        found = np.flatnonzero(valid)[present]
+        rows[found] = self.order[starts[present]]
+        return rows
+
+class ColumnTable:
+    """One dataset's columns, as loaded (memory-mapped) from its directory"""
+
+    def __init__(self, name, rows, kinds, columns, vocabularies, indexes):
+        self.name = name
+        self.rows = rows
+        self.kinds = kinds
+        self.columns = columns
+        self.vocabularies = vocabularies
+        self.indexes = indexes
+
+    def __len__(self):
+        return self.rows
+
+    def column(self, name):
+        """Raw column: codes for categories, numbers or datetime64 otherwise"""
+        return self.columns[name]
+
+    def decode(self, name, rows=None):
+        """Values of a category column as a string array ('' for empty cells)"""
+        codes = self.columns[name] if rows is None else self.columns[name][rows]
+        vocabulary = self.vocabularies[name]
+        if not len(vocabulary):
+            return np.full(len(codes), '', dtype='<U1')
+        values = vocabulary[np.maximum(codes, 0)]
+        return np.where(codes >= 0, values, '')
+
+    def rows_for(self, column, values):
+        """Row numbers whose column equals any of values, via the hash index"""
+        index = self.indexes[column]
+        codes = index.codes_for(values)
+        parts = [index.rows_for_code(code) for code in codes if code >= 0]
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.int32)
+
+    def row(self, i):
+        record = {}
+        for name, kind in self.kinds.items():
+            value = self.columns[name][i]
+            if kind == 'category':
+                if value >= 0:
+                    record[name] = str(self.vocabularies[name][value])
+            elif kind == 'date':
+                if not np.isnat(value):
+                    record[name] = str(value)
+            elif kind == 'float':
+                if not np.isnan(value):
+                    record[name] = float(value)
+            else:
+                record[name] = int(value)
+        return record
+
+    def lookup(self, column, value):
+        """The first row with column == value as a dict, or None"""
+        rows = self.rows_for(column, [value])
+        return self.row(int(rows[0])) if len(rows) else None
+
+class RetailStore:
+    """The StyleCo datasets as ColumnTables, with joins through the hash indexes"""
+
+    def __init__(self, root, tables):
+        self.root = root
+        self.tables = tables
+
+    def __getitem__(self, name):
+        return self.tables[name]
+
+    def join(self, left, column, right, right_column=None):
+        """For each row of left, the row of right whose right_column (default: column) matches, or -1.
+
+        The right column must be unique (a key). Only the distinct values of
+        the left column are looked up; the row mapping is then one gather.
+        """
+        left_table, right_table = self.tables[left], self.tables[right]
+        index = right_table.indexes[right_column or column]
+        distinct_rows = index.first_rows(index.codes_for(left_table.vocabularies[column]))
+        codes = left_table.columns[column]
+        if not len(distinct_rows):
+            return np.full(len(codes), -1, dtype=np.int64)
+        return np.where(codes >= 0, distinct_rows[np.maximum(codes, 0)], -1)
+
+    @classmethod
+    def open(cls, root, mmap_mode='r'):
+        with open(os.path.join(root, 'meta.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta['version'] != FORMAT_VERSION:
+            raise ValueError(f"{root} has store format {meta['version']}, expected {FORMAT_VERSION}; rebuild it")
+        tables = {}
+        for name, table_meta in meta['datasets'].items():
+            directory = os.path.join(root, name)
+
+            def load(filename):
+                return np.load(os.path.join(directory, filename), mmap_mode=mmap_mode)
+
+            columns, vocabularies, indexes = {}, {}, {}
+            for i, (column, kind) in enumerate(table_meta['columns'].items()):
+                columns[column] = load(f'{i}.npy')
+                if kind == 'category':
+                    vocabularies[column] = load(f'{i}.vocab.npy')
+            for column in table_meta['indexes']:
+                i = list(table_meta['columns']).index(column)
+                indexes[column] = HashIndex(vocabularies[column], load(f'{i}.slots.npy'),
+                                            load(f'{i}.order.npy'), load(f'{i}.offsets.npy'))
+            tables[name] = ColumnTable(name, table_meta['rows'], table_meta['columns'], columns, vocabularies, indexes)
+        return cls(root, tables)
+
+def _encode_column(values, kind):
+    """One source column (list with None for empty cells) -> (kind, array, vocabulary or None)"""
+    if kind == 'date':
+        return kind, np.array([value or 'NaT' for value in values], dtype='datetime64[D]'), None
+    if kind in (Decimal, int):
+        if kind is int and all(value is not None for value in values):
+            return 'int', np.array(values, dtype=np.int64), None
+        return 'float', np.array([np.nan if value is None else float(value) for value in values]), None
+    present = [str(value) for value in values if value is not None]
+    vocabulary = np.array(sorted(set(present)), dtype=str)
+    if not len(vocabulary):
+        vocabulary = np.empty(0, dtype='<U1')
+    codes = np.full(len(values), -1, dtype=np.int32)
+    filled = np.array([value is not None for value in values], dtype=bool)
+    codes[filled] = np.searchsorted(vocabulary, np.array(present, dtype=str))
+    return 'category', codes, vocabulary
+
+def build_dataset(rows, dataset, directory):
+    """Write one dataset's columns and indexes; returns its metadata"""
+    spec = DATASETS[dataset]
+    kinds = dict(spec.get('types', {}))
+    kinds.update({column: 'date' for column in DATE_COLUMNS.get(dataset, [])})
+    # The table key is a copy of key_from where there is one; keep just the source column
+    duplicate_key = spec['key'] if spec.get('key_from') else None
+    values = {}
+    count = 0
+    for row in rows:
+        item = coerce(row, dataset)
+        for column in item:
+            if column not in values and column != duplicate_key:
+                values[column] = [None] * count
+        for column, cells in values.items():
+            cells.append(item.get(column))
+        count += 1
+
+    os.makedirs(directory)
+    meta = {'rows': count, 'columns': {}, 'indexes': []}
+    for i, (column, cells) in enumerate(values.items()):
+        kind, array, vocabulary = _encode_column(cells, kinds.get(column))
+        meta['columns'][column] = kind
+        np.save(os.path.join(directory, f'{i}.npy'), array)
+        if vocabulary is not None:
+            np.save(os.path.join(directory, f'{i}.vocab.npy'), vocabulary)
+        if column in INDEXED_COLUMNS.get(dataset, []):
+            index = HashIndex.build(vocabulary, array)
+            np.save(os.path.join(directory, f'{i}.slots.npy'), index.slots)
+            np.save(os.path.join(directory, f'{i}.order.npy'), index.order)
+            np.save(os.path.join(directory, f'{i}.offsets.npy'), index.offsets)
+            meta['indexes'].append(column)
+    return meta
+
+def build(source_dir, root, datasets=None):
+    """Convert the StyleCo CSV/JSON files in source_dir into a store at root.
+
+    The store is written beside root and swapped in at the end, so readers
+    never see a half-built one.
+    """
+    staging = f'{root}.building-{os.getpid()}'
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    meta = {'version': FORMAT_VERSION, 'built': int(time.time()), 'datasets': {}}
+    for dataset in datasets or list(DATASETS):
+        rows = source_rows(source_dir, dataset)
+        if rows is None:
+            print(f"⚠️ Warning: no source for {dataset} in {source_dir}, skipping...")
+            continue
+        meta['datasets'][dataset] = build_dataset(rows, dataset, os.path.join(staging, dataset))
+    with open(os.path.join(staging, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+
+    previous = f'{root}.previous-{os.getpid()}'
+    if os.path.exists(root):
+        os.rename(root, previous)
+    os.rename(staging, root)
+    shutil.rmtree(previous, ignore_errors=True)
+    return RetailStore.open(root)
+
+def revenue_by_category(store):
+    """Example join: Sales -> Products, summed by product category"""
+    sales, products = store['Sales'], store['Products']
+    product_rows = store.join('Sales', 'ProductID', 'Products')
+    matched = product_rows >= 0
+    categories = products.column('Category')[product_rows[matched]]
+    totals = np.bincount(categories, weights=sales.column('TotalAmount')[matched],
+                         minlength=len(products.vocabularies['Category']))
+    return {str(name): round(float(total), 2) for name, total in zip(products.vocabularies['Category'], totals)}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Columnar StyleCo store')
+    commands = parser.add_subparsers(dest='command', required=True)
+    build_parser = commands.add_parser('build', help='convert CSV/JSON exports into a store')
+    build_parser.add_argument('--source', default='json_files')
+    build_parser.add_argument('--out', default='styleco_store')
+    stats_parser = commands.add_parser('stats', help='row counts and a sample join with timings')
+    stats_parser.add_argument('--store', default='styleco_store')
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        store = build(args.source, args.out)
+        for name, table in store.tables.items():
+            print(f"✅ {name}: {len(table)} rows, {len(table.kinds)} columns, indexes on {', '.join(table.indexes) or 'none'}")
+        return
+
+    started = time.perf_counter()
+    store = RetailStore.open(args.store)
+    opened = time.perf_counter()
+    revenue = revenue_by_category(store)
+    joined = time.perf_counter()
+    for name, table in store.tables.items():
+        print(f"{name}: {len(table)} rows")
+    print(f"Revenue by category: {json.dumps(revenue)}")
+    print(f"open {(opened - started) * 1000:.2f} ms, join + group-by {(joined - opened) * 1000:.2f} ms")
+
+if __name__ == '__main__':
+    main()
@@ -2,10 +2,16 @@ import requests
 import json
 import uuid
 
+# For capacity and latency testing use scripts/load_test.py, which drives an
+# endpoint (or lambda_handler in-process) concurrently and reports percentiles.
+
 class ChatbotClient:
     def __init__(self, api_endpoint):
         self.api_endpoint = api_endpoint
         self.session_id = str(uuid.uuid4())
+        # Reuse one keep-alive connection across messages
+        self.http = requests.Session()
+        self.http.headers['Content-Type'] = 'application/json'
     
     def send_message(self, message, language='en'):
         """Send message to chatbot"""
@@ -16,10 +22,10 @@ class ChatbotClient:
         }
         
         try:
-            response = requests.post(
+            response = self.http.post(
                 f"{self.api_endpoint}/chat",
                 json=payload,
-                headers={'Content-Type': 'application/json'}
+                timeout=30
             )
             
             if response.status_code == 200:
@@ -31,7 +37,7 @@ class ChatbotClient:
             return {'error': str(e)}
 
 def test_chatbot():
-    """Test the chatbot with various scenarios"""
+    """Smoke-test the chatbot with various scenarios"""
     # Replace with your actual API Gateway endpoint
     api_endpoint = "https://your-api-id.execute-api.ap-southeast-1.amazonaws.com/prod"
     
@@ -0,0 +1,17 @@
+import importlib.util
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'lambda'), os.path.join(ROOT, 'scripts')]
+
+import fake_backends
+
+fake_backends.prepare_environment()
+
+def load_script(filename, module_name):
+    """Import a top-level script whose file name is not a valid module name"""
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(ROOT, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
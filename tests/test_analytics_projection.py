@@ -0,0 +1,49 @@
+import os
+
+import yaml
+
+from conftest import ROOT, load_script
+from fake_backends import FakeDynamoDB
+
+class _TemplateLoader(yaml.SafeLoader):
+    """Reads CloudFormation templates, ignoring intrinsic-function tags"""
+
+_TemplateLoader.add_multi_constructor('!', lambda loader, suffix, node: None)
+
+def _analytics_indexes():
+    with open(os.path.join(ROOT, 'chatbot-infrastructure.yaml')) as f:
+        template = yaml.load(f, Loader=_TemplateLoader)
+    table = template['Resources']['AnalyticsTable']['Properties']
+    return {index['IndexName']: index['Projection'] for index in table['GlobalSecondaryIndexes']}
+
+def test_live_date_index_projection_is_unchanged():
+    # CloudFormation cannot change a GSI's projection in place
+    assert _analytics_indexes()['date-index'] == {'ProjectionType': 'ALL'}
+
+def test_date_index_projects_what_dashboards_read():
+    analytics = load_script('analytics-lambda.py', 'analytics_lambda')
+    index = _analytics_indexes()[analytics.ANALYTICS_DATE_INDEX]
+    assert analytics.ANALYTICS_DATE_INDEX == 'date-index-v2'
+    assert index['ProjectionType'] == 'INCLUDE'
+    projection = tuple(index['NonKeyAttributes'])
+    assert {'session_id', 'latency_ms'} <= set(projection)
+    dynamodb = FakeDynamoDB(schemas={'chatbot-analytics': {
+        'hash_key': 'id', 'indexes': {'date-index-v2': ('date', None, projection)}}})
+    table = dynamodb.Table('chatbot-analytics')
+    table.load([
+        {'id': f'row-{i}', 'date': '2025-09-01', 'timestamp': f'2025-09-01T10:{i:02d}:00',
+         'session_id': f'session-{i % 3}', 'sentiment': 'POSITIVE', 'language': 'en',
+         'latency_ms': 100 + i, 'userMessage': 'not projected'}
+        for i in range(12)
+    ])
+
+    analytics.analytics_table = table
+    items = []
+    analytics.query_day('2025-09-01', items.extend)
+    assert len(items) == 12
+    assert all('session_id' in item and 'latency_ms' in item for item in items)
+    assert all('userMessage' not in item for item in items)
+
+    aggregate = analytics.aggregate_day('2025-09-01')
+    assert round(aggregate.sessions.count()) == 3
+    assert aggregate.latency.count == 12
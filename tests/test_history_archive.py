@@ -0,0 +1,56 @@
+from datetime import datetime, timezone
+
+import pytest
+
+import history_archive
+from fake_backends import FakeDynamoDB
+from history_archive import HistoryArchive, archive_history, day_start
+
+NOW = datetime(2025, 9, 10, 8, tzinfo=timezone.utc)
+DAYS = ['2025-09-01', '2025-09-02', '2025-09-03']
+
+def _table():
+    table = FakeDynamoDB(page_items=7).Table('prod-chatbot-history')
+    table.load([{'sessionId': f'session-{i % 4}', 'timestamp': day_start(day) + 60 * i, 'm': f'message {i}'}
+                for day in DAYS for i in range(20)])
+    return table
+
+def _remaining(table):
+    days, kwargs = set(), {}
+    while True:
+        response = table.scan(**kwargs)
+        days.update(history_archive.partition_of(item['timestamp']) for item in response['Items'])
+        if 'LastEvaluatedKey' not in response:
+            return sorted(days)
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def test_archives_every_day_and_deletes_rows(tmp_path):
+    table, archive = _table(), HistoryArchive(str(tmp_path / 'archive'))
+    stats = archive_history(table, archive, days=3, now=NOW, spill_dir=str(tmp_path))
+
+    assert (stats['days'], stats['items'], stats['deleted']) == (3, 60, 60)
+    assert _remaining(table) == []
+    assert archive.watermark() == day_start('2025-09-07')
+    assert len(list(archive.items(day_start(DAYS[0]), day_start('2025-09-04')))) == 60
+    assert [p.name for p in tmp_path.iterdir()] == ['archive']
+
+def test_failed_run_keeps_finished_days(tmp_path, monkeypatch):
+    table, archive = _table(), HistoryArchive(str(tmp_path / 'archive'))
+    write = history_archive.SegmentWriter.write
+
+    def failing_write(self, day, items):
+        if day == DAYS[1]:
+            raise OSError('No space left on device')
+        return write(self, day, items)
+
+    monkeypatch.setattr(history_archive.SegmentWriter, 'write', failing_write)
+    with pytest.raises(OSError):
+        archive_history(table, archive, days=3, now=NOW, spill_dir=str(tmp_path))
+    assert _remaining(table) == DAYS[1:]
+    assert archive.watermark() == day_start(DAYS[1])
+
+    monkeypatch.setattr(history_archive.SegmentWriter, 'write', write)
+    stats = archive_history(table, archive, days=3, now=NOW, spill_dir=str(tmp_path))
+    assert (stats['days'], stats['items']) == (2, 40)
+    assert _remaining(table) == []
+    assert len(list(archive.items(day_start(DAYS[0]), day_start('2025-09-04')))) == 60
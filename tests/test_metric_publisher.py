@@ -0,0 +1,51 @@
+import threading
+
+from fake_backends import FakeCloudWatch
+from metric_publisher import MetricPublisher
+
+def _published_total(cloudwatch, name):
+    total = 0
+    for datum in cloudwatch.published:
+        if datum['MetricName'] != name:
+            continue
+        total += datum['StatisticValues']['SampleCount'] if 'StatisticValues' in datum else 1
+    return total
+
+def test_concurrent_observe_and_flush_lose_nothing():
+    cloudwatch = FakeCloudWatch()
+    publisher = MetricPublisher(cloudwatch)
+    threads, per_thread = 8, 2000
+    done = threading.Event()
+
+    def record():
+        for i in range(per_thread):
+            publisher.observe('Chatbot', 'Latency', i, dimensions={'Stage': str(i % 50)})
+            publisher.count('Chatbot', 'Requests')
+
+    def flush():
+        while not done.is_set():
+            publisher.flush()
+
+    flusher = threading.Thread(target=flush)
+    flusher.start()
+    workers = [threading.Thread(target=record) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    done.set()
+    flusher.join()
+    publisher.flush()
+
+    assert publisher.pending() == 0
+    assert _published_total(cloudwatch, 'Latency') == threads * per_thread
+    assert sum(d['Value'] for d in cloudwatch.published if d['MetricName'] == 'Requests') == threads * per_thread
+
+def test_emf_flush_clears_buffers():
+    lines = []
+    publisher = MetricPublisher(mode='emf', emit=lines.append)
+    publisher.observe('Chatbot', 'Latency', 12)
+    publisher.count('Chatbot', 'Requests', 3)
+    assert publisher.flush() == 0
+    assert publisher.pending() == 0
+    assert len(lines) == 1 and '"Requests": 3' in lines[0]
@@ -0,0 +1,20 @@
+import os
+import re
+
+from conftest import ROOT
+
+_ZIP_RE = re.compile(r'^zip -r \.\./build/(\S+\.zip) (.+)$', re.MULTILINE)
+
+def _zip_lists(name):
+    with open(os.path.join(ROOT, name)) as f:
+        return {archive: files.split() for archive, files in _ZIP_RE.findall(f.read())}
+
+def test_readme_packages_the_same_modules_as_deploy():
+    deployed = _zip_lists('deploy.sh')
+    assert set(deployed) == {'chatbot-handler.zip', 'analytics-handler.zip', 'rollup-handler.zip'}
+    assert _zip_lists('README.md') == deployed
+
+def test_packaged_modules_exist():
+    for files in _zip_lists('deploy.sh').values():
+        for module in files:
+            assert os.path.exists(os.path.join(ROOT, 'lambda', module)), module
@@ -0,0 +1,90 @@
+import importlib
+import json
+import os
+
+import pytest
+
+import fake_backends
+from chat_pipeline import Pipeline, standard_stages
+from conftest import ROOT
+from product_search import ProductSearch, from_catalog, from_styleco
+from seed_products import products as catalog
+
+FAQ_QUESTIONS = [
+    "Do you have gift cards?",
+    "I need to return a shirt",
+    "I want a refund for my dress",
+    "Any warranty on the coffee maker?",
+    "Do you have any discounts on shoes?",
+    "Do you have a size chart for women?",
+    "Do you have gift wrapping for kids items?",
+    "I need a receipt for my kids shoes purchase",
+]
+
+class _LambdaContext:
+    aws_request_id = 'test'
+    function_name = 'test'
+
+@pytest.fixture(scope='module')
+def search():
+    with open(os.path.join(ROOT, 'json_files', 'Products.json')) as f:
+        records = [from_styleco(row) for row in json.load(f)]
+    return ProductSearch(records + [from_catalog(item) for item in catalog])
+
+@pytest.fixture(scope='module', params=['chatbot_handler', 'chatbot_handler_fallback'])
+def chat(request, search):
+    handler = importlib.import_module(request.param)
+    backends = fake_backends.FakeAWS.from_profile('instant', seed=1)
+    backends.seed_faq()
+    fake_backends.install(handler, backends)
+    pipeline = Pipeline(standard_stages(
+        default_route='smart',
+        generators={'smart': lambda ctx: ctx.service.generate_smart_response(ctx.english_message, ctx.sentiment['sentiment'])},
+        search=search
+    ), handler=request.param)
+
+    def send(message):
+        event = {'body': json.dumps({'message': message, 'sessionId': 'test-session', 'language': 'en'})}
+        body = json.loads(pipeline.handle(event, _LambdaContext(), handler.ChatbotService())['body'])
+        return body['metadata']['route'], body['response']
+    return send
+
+@pytest.mark.parametrize('message', FAQ_QUESTIONS)
+def test_faq_questions_are_not_product_searches(search, chat, message):
+    assert search.answer(message) is None
+    route, _ = chat(message)
+    assert route != 'search'
+
+@pytest.mark.parametrize('message', [
+    "Do you have any black shirts?",
+    "show me women's dresses under $100",
+    "any cotton t-shirts?",
+    "Nike shoes under $100",
+])
+def test_product_searches_are_answered(chat, message):
+    route, response = chat(message)
+    assert route == 'search'
+
+def test_search_runs_after_faq_retrieval():
+    stages = [stage.name for stage in standard_stages('smart', {}, search=object())]
+    assert stages.index('search') == stages.index('retrieve') + 1
+
+def test_relaxed_reply_lists_the_options(search):
+    reply = search.answer("looking for red silk jackets")
+    assert reply.startswith("We don't have an exact match. Without the Red filter there are 3 options: ")
+    names = reply.split(': ', 1)[1].rstrip('.').split(', ')
+    assert len(names) == 3 and all('Jackets' in name for name in names)
+    assert search.answer("black cotton kids shirt size M").startswith("We don't have an exact match")
+
+def test_conjunctive_filters_and_price_range(search):
+    query = search.parse("red silk men's jackets between $50 and $150")
+    assert query.facets == {'subcategory': ['jackets'], 'material': ['silk'], 'category': ['men'], 'color': ['red']}
+    assert (query.min_price, query.max_price) == (50.0, 150.0)
+    result = search.search(search.parse("women's dresses under $100"))
+    for product_id in result.product_ids:
+        record = search.records[search.ids[product_id]]
+        assert record['category'] == 'Women' and record['subcategory'] == 'Dresses' and record['price'] <= 100
+
+def test_facet_counts_cover_the_matches(search):
+    result = search.search(search.parse('show me watches'))
+    assert sum(count for _, count in result.facet_counts['brand']) == result.total
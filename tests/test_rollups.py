@@ -0,0 +1,89 @@
+from collections import Counter
+
+from botocore.exceptions import ClientError
+import pytest
+
+from fake_backends import FakeDynamoDB
+from rollups import MARKER_RETENTION_SECONDS, RollupStore, bucket_counters, fold
+
+NOW = 1756713600  # 2025-09-01T08:00:00Z
+
+def _history_item(i, timestamp):
+    return {'sessionId': f'session-{i}', 'timestamp': timestamp, 'v': 2, 'l': 'en', 's': 'P', 'r': 'faq', 'h': 'llama'}
+
+def _store():
+    return RollupStore(FakeDynamoDB().Table('prod-chatbot-rollups'), clock=lambda: NOW)
+
+def _apply_batch(store, batch, items):
+    results = []
+    for (pk, sk), counters in sorted(fold((item, 1) for item in items).items()):
+        results.append(store.apply(pk, sk, counters, batch))
+    return results
+
+def test_retried_batch_is_applied_once():
+    store = _store()
+    items = [_history_item(i, NOW + i) for i in range(5)]
+    assert all(_apply_batch(store, 'batch-1', items))
+    assert not any(_apply_batch(store, 'batch-1', items))
+
+    hour, = store.buckets('hour', NOW, NOW + 3599)
+    assert bucket_counters(hour)['total'] == 5
+
+def test_bucket_items_do_not_grow_with_batches():
+    store = _store()
+    for batch in range(200):
+        _apply_batch(store, f'batch-{batch}', [_history_item(batch, NOW + batch)])
+
+    hour, = store.buckets('hour', NOW, NOW + 3599)
+    assert set(hour) == {'pk', 'sk', 'total', 'lang_en', 'sent_POSITIVE', 'faq', 'route_faq', 'handler_llama'}
+    assert bucket_counters(hour)['total'] == 200
+
+    marker = store.table.get_item(Key={'pk': f"applied#{hour['pk']}#batch-0", 'sk': hour['sk']})['Item']
+    assert marker['expiresAt'] == NOW + MARKER_RETENTION_SECONDS
+
+def test_legacy_applied_set_is_dropped_on_update():
+    store = _store()
+    store.table.load([{'pk': 'hour#2025-09-01', 'sk': NOW, 'total': 3, 'applied': {'old-1', 'old-2'}}])
+    assert store.apply('hour#2025-09-01', NOW, Counter(total=2), 'batch-1')
+
+    item = store.table.get_item(Key={'pk': 'hour#2025-09-01', 'sk': NOW})['Item']
+    assert 'applied' not in item
+    assert item['total'] == 5
+
+def test_other_transaction_failures_propagate():
+    dynamodb = FakeDynamoDB(error_rate=1.0, seed=1)
+    store = RollupStore(dynamodb.Table('prod-chatbot-rollups'), clock=lambda: NOW)
+    with pytest.raises(ClientError):
+        store.apply('hour#2025-09-01', NOW, Counter(total=1), 'batch-1')
+
+def test_day_bucket_stays_bounded_across_a_day_of_batches():
+    store = _store()
+    day_start = NOW - NOW % 86400
+    # Two shards, a batch every five minutes each, for a whole day
+    for shard in range(2):
+        for minute in range(0, 1440, 5):
+            _apply_batch(store, f'shard-{shard}-{minute}', [_history_item(shard, day_start + minute * 60)])
+
+    day, = store.buckets('day', day_start, day_start + 86399)
+    assert day['pk'] == 'day#2025-09'
+    assert bucket_counters(day)['total'] == 2 * 288
+    assert 'applied' not in day
+    assert len(repr(day)) < 400
+
+def test_backfill_counts_history_from_before_the_stream_once():
+    from backfill_rollups import backfill, parse_time
+    from history_archive import HistoryReader
+
+    history = FakeDynamoDB().Table('prod-chatbot-history')
+    old = [_history_item(i, NOW - 86400 + i) for i in range(3)]
+    history.load(old + [_history_item(9, NOW + 10)])
+    store = _store()
+    # The stream already folded the item written after it started
+    _apply_batch(store, 'stream-1', [_history_item(9, NOW + 10)])
+
+    applied, skipped = backfill(HistoryReader(history), store, parse_time('2025-09-01T08:00:00Z'))
+    assert (applied, skipped) == (3, 0)  # one minute, hour and day bucket
+    assert store.totals(NOW - 2 * 86400, NOW + 3599)['total'] == 4
+
+    assert backfill(HistoryReader(history), store, NOW) == (0, 3)
+    assert store.totals(NOW - 2 * 86400, NOW + 3599)['total'] == 4
@@ -0,0 +1,69 @@
+import os
+
+import numpy as np
+import pytest
+
+import styleco_store
+from build_sales_insights import compute_state
+from conftest import ROOT
+
+@pytest.fixture(scope='module')
+def store(tmp_path_factory):
+    root = str(tmp_path_factory.mktemp('store'))
+    styleco_store.build(os.path.join(ROOT, 'json_files'), root)
+    return styleco_store.RetailStore.open(root)
+
+def _dense_pairs(store):
+    sales, products = store['Sales'], store['Products']
+    rows = store.join('Sales', 'ProductID', 'Products')
+    customers = sales.column('CustomerID')
+    keep = (rows >= 0) & (customers >= 0)
+    incidence = np.zeros((len(sales.vocabularies['CustomerID']), len(products)), dtype=np.int32)
+    incidence[customers[keep], rows[keep]] = 1
+    together = incidence.T @ incidence
+    np.fill_diagonal(together, 0)
+    ids = products.decode('ProductID')
+    return {str(ids[p]): {str(ids[o]): int(together[p, o]) for o in np.flatnonzero(together[p])}
+            for p in np.flatnonzero(together.any(axis=1))}
+
+def test_pairs_match_the_incidence_product(store):
+    state = compute_state(store)
+    assert state['pairs'] == _dense_pairs(store)
+    assert state['pairs']
+    for customer, basket in state['baskets'].items():
+        for product in basket:
+            others = state['pairs'].get(product, {})
+            assert all(other in others for other in basket if other != product)
+
+def _insights(store, when):
+    from datetime import datetime, timezone
+    from sales_insights import SalesInsights
+    return SalesInsights(compute_state(store), clock=lambda: datetime(*when, tzinfo=timezone.utc).timestamp())
+
+@pytest.mark.parametrize('message', [
+    'Can I get help with my shoes?',
+    'I need to get in touch with someone about my dress',
+])
+def test_help_with_is_not_bought_with(store, message):
+    assert _insights(store, (2025, 9, 15)).answer(message) is None
+
+@pytest.mark.parametrize('message', [
+    'What do people buy with shoes?',
+    'What do customers usually buy together with jackets?',
+    'What goes with dresses?',
+])
+def test_bought_with_questions(store, message):
+    assert _insights(store, (2025, 9, 15)).answer(message).startswith('Customers who bought ')
+
+def test_this_month_is_the_current_month(store):
+    reply = _insights(store, (2025, 9, 15)).answer('What is trending this month?')
+    assert reply.startswith('Our best-selling items this month: ')
+
+    stale = _insights(store, (2026, 10, 19)).answer('What is trending this month?')
+    assert stale.startswith('Our best-selling items overall: ')
+    assert '2025-09' not in stale
+
+def test_insights_run_after_faq_retrieval():
+    from chat_pipeline import standard_stages
+    stages = [stage.name for stage in standard_stages('smart', {}, insights=object(), search=object())]
+    assert stages.index('retrieve') < stages.index('insight') < stages.index('search')
@@ -0,0 +1,71 @@
+import pytest
+from conftest import load_script
+
+from fake_backends import FakeDynamoDB
+
+chatbot = load_script('chatbot-lambda.py', 'chatbot_lambda')
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def cache():
+    return chatbot.SessionCache(tokenless_ttl_seconds=30, clock=_Clock())
+
+def test_tokenless_requests_reload_old_entries(cache):
+    cache.fill('s1', ['turn 1'])
+    assert cache.get('s1') == ['turn 1']
+
+    cache.clock.now += 31
+    assert cache.get('s1') is None
+    assert cache.stats()['stale'] == 1
+
+def test_matching_token_serves_entry_until_ttl(cache):
+    cache.fill('s1', ['turn 1'])
+    token = cache.token('s1')
+    cache.clock.now += 600
+    assert cache.get('s1', token) == ['turn 1']
+    assert cache.get('s1', 'other-container.1') is None
+
+def test_history_reload_is_consistent(monkeypatch):
+    table = FakeDynamoDB().Table('chatbot-sessions')
+    table.load([{'session_id': 's1', 'timestamp': f'2025-09-01T08:00:0{i}', 'conversation': f'turn {i}'}
+                for i in range(3)])
+    queries = []
+    query = table.query
+
+    def recording_query(**kwargs):
+        queries.append(kwargs)
+        return query(**kwargs)
+
+    monkeypatch.setattr(table, 'query', recording_query)
+    monkeypatch.setattr(chatbot, 'sessions_table', table)
+    monkeypatch.setattr(chatbot, 'session_cache', chatbot.SessionCache())
+
+    assert chatbot.get_session_history('s1') == ['turn 2', 'turn 1', 'turn 0']
+    assert queries[0]['ConsistentRead'] is True
+
+def test_latency_excludes_history_write(monkeypatch):
+    clock = _Clock()
+    recorded = {}
+
+    def slow_store(*args):
+        clock.now += 2.0
+
+    def generate(*args):
+        clock.now += 0.25
+        return 'Hello!'
+
+    monkeypatch.setattr(chatbot.time, 'perf_counter', clock)
+    monkeypatch.setattr(chatbot, 'detect_sentiment', lambda text: 'NEUTRAL')
+    monkeypatch.setattr(chatbot, 'get_bedrock_response', generate)
+    monkeypatch.setattr(chatbot, 'store_session', slow_store)
+    monkeypatch.setattr(chatbot, 'store_analytics', lambda *args: recorded.setdefault('latency_ms', args[3]))
+
+    response = chatbot.lambda_handler({'body': '{"message": "hi", "session_id": "s1"}'}, None)
+    assert response['statusCode'] == 200
+    assert recorded['latency_ms'] == pytest.approx(250.0)
@@ -0,0 +1,77 @@
+import pytest
+
+from fake_backends import FakeAWS
+from stock_availability import StockAvailability, set_stock
+
+NOW = 1756713600  # 2025-09-01T08:00:00Z
+
+def _stock(clock=lambda: NOW, **kwargs):
+    table = FakeAWS().seed_catalog(now=NOW - 3600)
+    return table, StockAvailability(table, 'stock-hour-index', clock=clock, **kwargs)
+
+@pytest.mark.parametrize('message, product_id', [
+    ('Is the yoga mat in stock?', 'SPORT001'),
+    ('Are yoga mats available?', 'SPORT001'),
+    ('do you have the bluetooth headphones in stock', 'TECH001'),
+    ('Is the wireless charger in stock?', 'TECH002'),
+    ('any coffee makers left in stock?', 'HOME002'),
+    ('Is the table lamp sold out?', 'HOME001'),
+    ('Is the leather handbag in stock?', 'FASH001'),
+    ('Is the Yoga Mat Premium in stock?', 'SPORT001'),
+    ('is sport001 available', 'SPORT001'),
+])
+def test_partial_names_resolve_to_the_product(message, product_id):
+    _, stock = _stock()
+    stock.refresh()
+    assert stock.items[product_id]['name'] in stock.answer(message)
+
+@pytest.mark.parametrize('message', [
+    'Is the wireless one in stock?',
+    'Is the premium one available?',
+    'Is shipping available to Malaysia?',
+    'Is yoga class available?',
+    'Is photo printing available?',
+    'Is table booking available?',
+    'Is the coffee bar available in your store?',
+    'Is the wireless charger available?',
+    'Is the yoga class in stock?',
+])
+def test_ambiguous_or_unknown_names_are_not_answered(message):
+    _, stock = _stock()
+    assert stock.answer(message) is None
+
+def test_delta_refresh_picks_up_stock_changes():
+    now = [NOW]
+    table, stock = _stock(clock=lambda: now[0], refresh_seconds=30)
+    assert 'in stock' in stock.answer('Is the yoga mat in stock?')
+
+    set_stock(table, 'SPORT001', 0, now=NOW + 10)
+    now[0] = NOW + 60
+    assert stock.answer('Is the yoga mat in stock?').startswith('Sorry, Yoga Mat Premium is currently out of stock')
+    assert (stock.full_loads, stock.delta_loads) == (1, 1)
+
+def test_strict_lookup_rereads_low_stock():
+    table, stock = _stock(strict=True, refresh_seconds=3600)
+    set_stock(table, 'SPORT001', 2, now=NOW - 60)
+    stock.refresh()
+    set_stock(table, 'SPORT001', 0, now=NOW)
+    assert stock.lookup('SPORT001')['quantity'] == 0
+    assert stock.lookup('TECH001')['source'] == 'snapshot'
+    assert stock.strict_reads == 1
+
+def test_periodic_full_reload_drops_deleted_products():
+    now = [NOW]
+    table, stock = _stock(clock=lambda: now[0], refresh_seconds=30, full_reload_every=3)
+    stock.refresh()
+    table.delete_item(Key={'productId': 'SPORT001'})
+    for _ in range(3):
+        now[0] += 30
+        stock.refresh()
+    assert 'SPORT001' in stock.items
+    assert (stock.full_loads, stock.delta_loads) == (1, 3)
+
+    now[0] += 30
+    stock.refresh()
+    assert 'SPORT001' not in stock.items
+    assert stock.full_loads == 2
+    assert stock.answer('Is the yoga mat in stock?') is None